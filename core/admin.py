@@ -159,4 +159,12 @@ class BlogPostAdmin(admin.ModelAdmin):
         ('Categorization', {'fields': ('category', 'tags')}),
         ('Publishing', {'fields': ('author', 'is_published', 'is_ai_generated')}),
         ('Stats', {'fields': ('views', 'created_at', 'updated_at'), 'classes': ('collapse',)}),
-    )
\ No newline at end of file
+    )
+
+# --- Background Tool Jobs (PDF to Word/PowerPoint/Excel) ---
+from .models import ToolJob
+@admin.register(ToolJob)
+class ToolJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tool', 'status', 'progress', 'total', 'created_at', 'finished_at')
+    list_filter = ('tool', 'status', 'created_at')
+    readonly_fields = ('id', 'created_at', 'started_at', 'finished_at')
@@ -0,0 +1,233 @@
+"""
+Admission control for the free tools.
+
+All tools share gunicorn's few threads, so a burst of large jobs could
+otherwise run the worker out of memory or leave no thread for pages,
+dashboards and chat. `ToolAdmissionMiddleware` admits each tool POST against:
+
+- the tool's concurrency limit and memory budget (TOOL_ADMISSION_CONCURRENCY,
+  TOOL_ADMISSION_MEMORY_MB, overridden per tool by TOOL_ADMISSION_LIMITS);
+- a memory budget shared by all tools (TOOL_ADMISSION_TOTAL_MEMORY_MB);
+- TOOL_ADMISSION_MAX_THREADS, the tool requests running or waiting at once.
+
+A request weighs TOOL_ADMISSION_BASE_MB plus its Content-Length times
+TOOL_ADMISSION_UPLOAD_FACTOR, so it is weighed before its body is read. One
+request on its own is always let in, however heavy, so an oversized upload
+still runs when nothing else is.
+
+A request that doesn't fit waits in its tool's FIFO queue, which holds up to
+TOOL_ADMISSION_QUEUE_SIZE, for at most TOOL_ADMISSION_WAIT_SECONDS. If the
+queue is full or the wait runs out, the answer is an immediate 429 with a
+Retry-After estimated from the tool's recent run times. The body is never
+parsed, so a rejection costs next to nothing.
+
+Whether or not admission is enabled, every tool POST also runs under a fresh
+job budget (see `core.budgets` and `tool_pool.new_budget`).
+"""
+import math
+import threading
+import time
+import weakref
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.urls import Resolver404, resolve
+
+from . import budgets, tool_metrics, tool_pool
+
+MB = 1024 * 1024
+DEFAULT_RUN_SECONDS = 5.0  # Retry-After basis before a tool has run
+MAX_RETRY_AFTER = 120
+
+_condition = threading.Condition()
+_running = defaultdict(int)  # tool -> requests running
+_memory = defaultdict(int)  # tool -> bytes admitted
+_queues = defaultdict(deque)  # tool -> waiting tokens, oldest first
+_run_seconds = {}  # tool -> moving average of how long its requests hold their slot
+_total_memory = 0
+
+
+class Ticket:
+    """An admitted request's slot; `release()` gives it back (once)."""
+
+    def __init__(self, tool, cost):
+        self.tool = tool
+        self.cost = cost
+        self.started = time.monotonic()
+        self.released = False
+
+    def release(self):
+        global _total_memory
+        with _condition:
+            if self.released:
+                return
+            self.released = True
+            _running[self.tool] -= 1
+            _memory[self.tool] -= self.cost
+            _total_memory -= self.cost
+            held = time.monotonic() - self.started
+            previous = _run_seconds.get(self.tool)
+            _run_seconds[self.tool] = held if previous is None else 0.8 * previous + 0.2 * held
+            _condition.notify_all()
+
+
+def limits(tool):
+    """(concurrency, memory budget in bytes) for `tool`."""
+    override = getattr(settings, 'TOOL_ADMISSION_LIMITS', {}).get(tool, {})
+    concurrency = override.get('concurrency', getattr(settings, 'TOOL_ADMISSION_CONCURRENCY', 2))
+    memory_mb = override.get('memory_mb', getattr(settings, 'TOOL_ADMISSION_MEMORY_MB', 512))
+    return concurrency, memory_mb * MB
+
+
+def request_cost(content_length):
+    """Bytes a request is expected to need, from its Content-Length header."""
+    try:
+        upload = max(int(content_length or 0), 0)
+    except ValueError:
+        upload = 0
+    base = getattr(settings, 'TOOL_ADMISSION_BASE_MB', 16) * MB
+    return base + int(upload * getattr(settings, 'TOOL_ADMISSION_UPLOAD_FACTOR', 3))
+
+
+def _fits(tool, cost):
+    concurrency, budget = limits(tool)
+    total_budget = getattr(settings, 'TOOL_ADMISSION_TOTAL_MEMORY_MB', 1024) * MB
+    return (
+        _running[tool] < concurrency
+        and (_running[tool] == 0 or _memory[tool] + cost <= budget)
+        and (not any(_running.values()) or _total_memory + cost <= total_budget)
+    )
+
+
+def _busy():
+    return sum(_running.values()) + sum(len(queue) for queue in _queues.values())
+
+
+def retry_after(tool):
+    """Seconds a rejected client should wait before trying `tool` again."""
+    with _condition:
+        concurrency, _ = limits(tool)
+        ahead = _running[tool] + len(_queues[tool])
+        seconds = _run_seconds.get(tool, DEFAULT_RUN_SECONDS) * max(ahead, 1) / max(concurrency, 1)
+    return min(max(math.ceil(seconds), 1), MAX_RETRY_AFTER)
+
+
+def acquire(tool, cost):
+    """
+    Admit a request of `cost` bytes for `tool`, waiting in its queue if need
+    be. Returns a Ticket, or None if the request is turned away.
+    """
+    global _total_memory
+    queue_size = getattr(settings, 'TOOL_ADMISSION_QUEUE_SIZE', 4)
+    max_threads = getattr(settings, 'TOOL_ADMISSION_MAX_THREADS', 5)
+    with _condition:
+        if _busy() >= max_threads:
+            tool_metrics.incr('admission.rejected.busy')
+            return None
+        queue = _queues[tool]
+        if queue or not _fits(tool, cost):
+            if len(queue) >= queue_size:
+                tool_metrics.incr('admission.rejected.queue_full')
+                return None
+            token = object()
+            queue.append(token)
+            tool_metrics.incr('admission.queued')
+            deadline = time.monotonic() + getattr(settings, 'TOOL_ADMISSION_WAIT_SECONDS', 10)
+            try:
+                while queue[0] is not token or not _fits(tool, cost):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        tool_metrics.incr('admission.rejected.timeout')
+                        return None
+                    _condition.wait(remaining)
+            finally:
+                queue.remove(token)
+                _condition.notify_all()  # the next in line may fit now
+        _running[tool] += 1
+        _memory[tool] += cost
+        _total_memory += cost
+    tool_metrics.incr('admission.admitted')
+    return Ticket(tool, cost)
+
+
+def stats():
+    """Running and waiting requests and admitted megabytes, per tool that has any."""
+    with _condition:
+        return {
+            tool: {'running': _running[tool], 'waiting': len(_queues[tool]), 'memory_mb': round(_memory[tool] / MB, 1)}
+            for tool in sorted(set(_running) | set(_queues))
+            if _running[tool] or _queues[tool]
+        }
+
+
+def reset():
+    global _total_memory
+    with _condition:
+        _running.clear()
+        _memory.clear()
+        _queues.clear()
+        _run_seconds.clear()
+        _total_memory = 0
+
+
+def tool_for(path):
+    """The URL name of the tool at `path`, or None for every other page."""
+    try:
+        name = resolve(path).url_name
+    except Resolver404:
+        return None
+    return name if name and name.endswith('_tool') else None
+
+
+class ToolAdmissionMiddleware:
+    """
+    Admits tool POSTs (see the module docstring). It must come before any
+    middleware that reads the request body, such as CsrfViewMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        tool = tool_for(request.path_info) if request.method == 'POST' else None
+        if tool is None:
+            return self.get_response(request)
+        with budgets.applied(tool_pool.new_budget()):
+            if not getattr(settings, 'TOOL_ADMISSION_ENABLED', True):
+                return self.get_response(request)
+            return self.admit(request, tool)
+
+    def admit(self, request, tool):
+        ticket = acquire(tool, request_cost(request.META.get('CONTENT_LENGTH')))
+        if ticket is None:
+            return self.busy_response(request, tool)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            ticket.release()
+            raise
+        # Streamed results (ZIPs, files) keep working until the server closes
+        # the response; a response that is never closed frees its slot when
+        # it is garbage-collected
+        close = response.close
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                ticket.release()
+
+        response.close = close_and_release
+        weakref.finalize(response, ticket.release)
+        return response
+
+    def busy_response(self, request, tool):
+        seconds = retry_after(tool)
+        message = f"This tool is busy right now. Please try again in {seconds} seconds."
+        if 'application/json' in request.headers.get('Accept', ''):
+            response = JsonResponse({'error': message, 'retry_after': seconds}, status=429)
+        else:
+            response = HttpResponse(message, status=429, content_type='text/plain; charset=utf-8')
+        response['Retry-After'] = str(seconds)
+        return response
@@ -0,0 +1,138 @@
+"""
+Per-job resource budgets for the free tools.
+
+A job (one tool request, or one background `ToolJob`) gets a `Budget`: at
+most so many pages, rendered pixels and decoded pixels per image, and a wall
+clock deadline. `applied(budget)` makes it the active budget of the current
+context; `core.tool_pool` passes it along to the worker that runs each task
+through `call`, where the `check_*` functions used by `core.pdf_tasks` see it.
+A task that goes over raises `BudgetExceeded`, whose message is shown to the
+user, and counts it in `tool_metrics` as budget.exceeded.<kind>.
+
+Deadlines are checked between pages, and in a pool worker an interval timer
+also interrupts Python code at the deadline; the parent kills a worker stuck
+in C code for longer than that (see `tool_pool.result`).
+
+Runs in pool workers too, so it must stay importable without Django.
+"""
+import contextvars
+import signal
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from . import tool_metrics
+
+# Limits of None are not enforced; `deadline` is a time.time() value
+Budget = namedtuple('Budget', 'max_pages max_render_pixels max_image_pixels deadline')
+
+_active = contextvars.ContextVar('tool_budget', default=None)
+
+
+class BudgetExceeded(Exception):
+    """A job went over one of its limits; `kind` names which one."""
+
+    def __init__(self, kind, message):
+        super().__init__(message)
+        self.kind = kind
+
+    def __reduce__(self):
+        return BudgetExceeded, (self.kind, str(self))
+
+
+def exceeded(kind, message):
+    """A BudgetExceeded to raise, counted."""
+    tool_metrics.incr(f'budget.exceeded.{kind}')
+    return BudgetExceeded(kind, message)
+
+
+def active():
+    return _active.get()
+
+
+@contextmanager
+def applied(budget):
+    """Make `budget` the active budget for the duration of the block."""
+    token = _active.set(budget)
+    try:
+        yield budget
+    finally:
+        _active.reset(token)
+
+
+def time_left(budget=None):
+    """Seconds until the deadline of `budget` (default: the active one), or None."""
+    budget = budget or active()
+    if budget is None or budget.deadline is None:
+        return None
+    return budget.deadline - time.time()
+
+
+TOO_LONG = "Processing took too long and was stopped."
+
+
+def _over_time(signum, frame):
+    raise exceeded('wall_time', TOO_LONG)
+
+
+@contextmanager
+def _alarm(budget):
+    """Interrupt the block at the deadline; only possible on the main thread."""
+    remaining = time_left(budget)
+    if remaining is None or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    if remaining <= 0:
+        _over_time(None, None)
+    previous = signal.signal(signal.SIGALRM, _over_time)
+    signal.setitimer(signal.ITIMER_REAL, remaining)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def call(budget, fn, *args, **kwargs):
+    """Run `fn(*args, **kwargs)` under `budget`. This is what pool workers run."""
+    with applied(budget), _alarm(budget):
+        return fn(*args, **kwargs)
+
+
+def check_time():
+    remaining = time_left()
+    if remaining is not None and remaining <= 0:
+        _over_time(None, None)
+
+
+def check_pages(count):
+    budget = active()
+    if budget and budget.max_pages is not None and count > budget.max_pages:
+        raise exceeded(
+            'pages', f"The document has {count:,} pages; the limit is {budget.max_pages:,}.",
+        )
+    check_time()
+
+
+def check_render_pixels(pixels):
+    """`pixels`: everything the job is about to render."""
+    budget = active()
+    if budget and budget.max_render_pixels is not None and pixels > budget.max_render_pixels:
+        raise exceeded(
+            'render_pixels',
+            f"The pages are too large to render ({pixels / 1e6:,.0f} megapixels; "
+            f"the limit is {budget.max_render_pixels / 1e6:,.0f}). Try a lower resolution.",
+        )
+
+
+def check_image(width, height):
+    """A `width` x `height` image is about to be decoded."""
+    budget = active()
+    pixels = width * height
+    if budget and budget.max_image_pixels is not None and pixels > budget.max_image_pixels:
+        raise exceeded(
+            'image_pixels',
+            f"An image is too large ({width:,} x {height:,} pixels; "
+            f"the limit is {budget.max_image_pixels / 1e6:,.0f} megapixels).",
+        )
@@ -1,7 +1,15 @@
 import os
 
+from django.conf import settings
+
 def google_analytics(request):
     """Add Google Analytics ID to all templates"""
     return {
         'google_analytics_id': os.environ.get('GOOGLE_ANALYTICS_ID', '')
     }
+
+def tool_jobs(request):
+    """Whether background job mode can be offered (a job worker runs)"""
+    return {
+        'tool_job_worker': getattr(settings, 'TOOL_JOB_WORKER', False)
+    }
@@ -0,0 +1,292 @@
+"""
+Word (DOCX) to PDF without an office suite.
+
+The document body is walked with python-docx: paragraphs with their runs
+(bold, italic, underline, size, colour, inline images), headings, bullet and
+numbered lists, and tables. Each block becomes a small piece of HTML, and the
+pieces are laid out by MuPDF's HTML engine (fitz.Story) onto PDF pages.
+
+Blocks are laid out in batches of BLOCKS_PER_STORY, each batch continuing on
+the page where the previous one stopped, so only one batch's HTML, layout
+tree and images are held at a time. Finished pages go straight to the output
+file through `core.pdf_writer.PageSink`, each distinct image and font stored
+once, so the output adds no memory per page. (python-docx itself does load
+the whole input package, images included.) Explicit page breaks start a new
+page.
+"""
+from html import escape
+
+import fitz  # PyMuPDF
+
+from . import budgets
+from .pdf_writer import PageSink
+
+BLOCKS_PER_STORY = 200
+MAX_PAGES = 3000
+EMU_PER_POINT = 12700
+USER_CSS = (
+    'body { margin: 0; font-family: sans-serif; font-size: 11pt; } '
+    'p { margin: 0 0 6pt 0; } '
+    'table { border-collapse: collapse; margin: 0 0 6pt 0; } '
+    'td { border: 0.5pt solid black; padding: 2pt 4pt; vertical-align: top; } '
+)
+
+PAGE_BREAK = object()
+
+_ALIGNMENTS = {1: 'center', 2: 'right', 3: 'justify'}
+
+
+def _qn(tag):
+    from docx.oxml.ns import qn
+    return qn(tag)
+
+
+class _PageFlow:
+    """Places consecutive stories on shared pages, top to bottom, into `sink` (a PageSink)."""
+
+    def __init__(self, sink, where):
+        self.sink = sink
+        self.where = where
+        self.device = None
+        self.top = where.y0
+        self.pages = 0
+
+    def place(self, story):
+        more = True
+        while more:
+            if self.device is None:
+                if self.pages == MAX_PAGES:
+                    raise ValueError(f"The document is too long to convert (over {MAX_PAGES} pages).")
+                budgets.check_pages(self.pages + 1)
+                self.device = fitz.DeviceWrapper(self.sink.begin_page())
+                self.pages += 1
+                self.top = self.where.y0
+            rect = fitz.Rect(self.where.x0, self.top, self.where.x1, self.where.y1)
+            more, filled = story.place(rect)
+            story.draw(self.device)
+            if more:
+                self.end_page()
+            else:
+                self.top = filled[3]  # bottom of what was placed
+
+    def end_page(self):
+        if self.device is not None:
+            self.sink.end_page()
+            self.device = None
+
+    def close(self):
+        if self.pages == 0:
+            # An empty document still gets one blank page
+            self.device = self.sink.begin_page()
+            self.pages = 1
+        self.end_page()
+        return self.sink.close()
+
+
+class _Renderer:
+    def __init__(self, document):
+        self.document = document
+        self.images = {}  # archive name -> bytes, for the current batch
+        self.styles = {}  # style id -> (lowercase name, alignment)
+
+    def style(self, style_id):
+        # paragraph.style scans every style in the document; look each id up once
+        if style_id not in self.styles:
+            from docx.enum.style import WD_STYLE_TYPE
+            style = self.document.styles.get_by_id(style_id, WD_STYLE_TYPE.PARAGRAPH)
+            self.styles[style_id] = (
+                (style.name or '').lower() if style is not None else '',
+                style.paragraph_format.alignment if style is not None else None,
+            )
+        return self.styles[style_id]
+
+    def image(self, drawing):
+        blip = drawing.find('.//' + _qn('a:blip'))
+        extent = drawing.find('.//' + _qn('wp:extent'))
+        if blip is None:
+            return ''
+        rel_id = blip.get(_qn('r:embed'))
+        part = self.document.part.related_parts.get(rel_id)
+        if part is None:
+            return ''
+        name = f'image-{rel_id}'
+        self.images[name] = part.blob
+        style = ''
+        if extent is not None:
+            width = int(extent.get('cx', 0)) / EMU_PER_POINT
+            height = int(extent.get('cy', 0)) / EMU_PER_POINT
+            style = f' style="width:{width:.1f}pt;height:{height:.1f}pt"'
+        return f'<img src="{name}"{style}/>'
+
+    def run(self, run, parts):
+        """Append the run's HTML to parts[-1]; a page break starts a new part."""
+        pieces = []
+        for child in run._r.iterchildren():
+            if child.tag == _qn('w:t'):
+                pieces.append(escape(child.text or ''))
+            elif child.tag == _qn('w:tab'):
+                pieces.append('&#160;' * 4)
+            elif child.tag in (_qn('w:br'), _qn('w:cr')):
+                if child.get(_qn('w:type')) == 'page':
+                    parts[-1].append(self.format(run, ''.join(pieces)))
+                    parts.append([])
+                    pieces = []
+                else:
+                    pieces.append('<br/>')
+            elif child.tag == _qn('w:drawing'):
+                pieces.append(self.image(child))
+        parts[-1].append(self.format(run, ''.join(pieces)))
+
+    def format(self, run, html):
+        if not html:
+            return ''
+        font = run.font
+        if run.bold:
+            html = f'<b>{html}</b>'
+        if run.italic:
+            html = f'<i>{html}</i>'
+        if run.underline:
+            html = f'<u>{html}</u>'
+        if font.strike:
+            html = f'<s>{html}</s>'
+        if font.superscript:
+            html = f'<sup>{html}</sup>'
+        elif font.subscript:
+            html = f'<sub>{html}</sub>'
+        styles = []
+        if font.size is not None:
+            styles.append(f'font-size:{font.size.pt:g}pt')
+        try:
+            color = font.color.rgb if font.color.type is not None else None
+        except (AttributeError, ValueError):
+            color = None
+        if color is not None:
+            styles.append(f'color:#{color}')
+        if styles:
+            html = f'<span style="{";".join(styles)}">{html}</span>'
+        return html
+
+    def paragraph(self, paragraph):
+        """
+        Yields (kind, html) for the paragraph, with PAGE_BREAK between the
+        pieces on either side of a page break. `kind` is the list tag ('ul' or
+        'ol') for list items, else None.
+        """
+        style_name, style_alignment = self.style(paragraph._p.style)
+        if paragraph.paragraph_format.page_break_before:
+            yield PAGE_BREAK
+
+        parts = [[]]
+        for item in paragraph.iter_inner_content():
+            for run in getattr(item, 'runs', [item]):
+                self.run(run, parts)
+
+        tag, kind = 'p', None
+        if style_name == 'title':
+            tag = 'h1'
+        elif style_name.startswith('heading '):
+            level = style_name[len('heading '):]
+            tag = f'h{min(int(level), 6)}' if level.isdigit() else 'p'
+        elif style_name.startswith('list number'):
+            tag, kind = 'li', 'ol'
+        elif style_name.startswith('list') or paragraph._p.pPr is not None and paragraph._p.pPr.numPr is not None:
+            tag, kind = 'li', 'ul'
+
+        alignment = paragraph.alignment
+        if alignment is None:
+            alignment = style_alignment
+        attrs = f' style="text-align:{_ALIGNMENTS[alignment]}"' if alignment in _ALIGNMENTS else ''
+
+        for index, part in enumerate(parts):
+            if index:
+                yield PAGE_BREAK
+            content = ''.join(part)
+            if not content and index:
+                continue
+            yield kind, f'<{tag}{attrs}>{content or "&#160;"}</{tag}>'
+
+    def table(self, table):
+        from docx.table import _Cell
+
+        rows = []
+        for tr in table._tbl.tr_lst:
+            cells = []
+            for tc in tr.tc_lst:
+                span = f' colspan="{tc.grid_span}"' if tc.grid_span > 1 else ''
+                if tc.vMerge == 'continue':
+                    cells.append(f'<td{span}></td>')
+                    continue
+                content = ''.join(html for kind, html in self.blocks(_Cell(tc, table)) if html is not PAGE_BREAK)
+                cells.append(f'<td{span}>{content}</td>')
+            rows.append(f'<tr>{"".join(cells)}</tr>')
+        return f'<table>{"".join(rows)}</table>'
+
+    def blocks(self, container):
+        """(kind, html) pairs and PAGE_BREAKs for the paragraphs and tables of `container`, in order."""
+        from docx.table import Table
+        from docx.text.paragraph import Paragraph
+
+        element = container._element.body if hasattr(container._element, 'body') else container._element
+        for child in element.iterchildren():
+            if child.tag == _qn('w:p'):
+                for block in self.paragraph(Paragraph(child, container)):
+                    yield (None, PAGE_BREAK) if block is PAGE_BREAK else block
+            elif child.tag == _qn('w:tbl'):
+                yield None, self.table(Table(child, container))
+
+
+def convert(input_path, output_path):
+    """Convert the DOCX at `input_path` to a PDF at `output_path`. Returns the page count."""
+    import docx
+
+    document = docx.Document(input_path)
+    section = document.sections[0]
+    width = (section.page_width or 7772400) / EMU_PER_POINT
+    height = (section.page_height or 10058400) / EMU_PER_POINT
+    mediabox = fitz.Rect(0, 0, width, height)
+    where = fitz.Rect(
+        (section.left_margin or 0) / EMU_PER_POINT, (section.top_margin or 0) / EMU_PER_POINT,
+        width - (section.right_margin or 0) / EMU_PER_POINT, height - (section.bottom_margin or 0) / EMU_PER_POINT,
+    )
+    if where.is_empty:
+        where = mediabox + (72, 72, -72, -72)
+
+    renderer = _Renderer(document)
+    with open(output_path, 'wb') as fp:
+        return _lay_out(renderer, document, _PageFlow(PageSink(fp, mediabox), where))
+
+
+def _lay_out(renderer, document, flow):
+    html, blocks, open_list = [], 0, None
+
+    def flush():
+        nonlocal html, blocks, open_list
+        if open_list:
+            html.append(f'</{open_list}>')
+            open_list = None
+        if html:
+            archive = fitz.Archive()
+            for name, data in renderer.images.items():
+                archive.add(data, name)
+            flow.place(fitz.Story(html=''.join(html), user_css=USER_CSS, archive=archive))
+        html, blocks = [], 0
+        renderer.images = {}
+
+    for kind, block in renderer.blocks(document):
+        if block is PAGE_BREAK:
+            flush()
+            flow.end_page()
+            continue
+        if kind != open_list:
+            if open_list:
+                html.append(f'</{open_list}>')
+            if kind:
+                html.append(f'<{kind}>')
+            open_list = kind
+        html.append(block)
+        blocks += 1
+        # Splitting a numbered list would restart its numbering
+        if blocks >= BLOCKS_PER_STORY and open_list != 'ol':
+            flush()
+    flush()
+    return flow.close()
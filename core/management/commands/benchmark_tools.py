@@ -0,0 +1,420 @@
+"""
+Django management command that benchmarks the free-tool engine on synthetic
+documents, so changes to the PDF pipeline can be measured on the target box.
+
+Usage:
+    python manage.py benchmark_tools
+    python manage.py benchmark_tools --only render --pages 200
+    python manage.py benchmark_tools --only render --workers 8
+    python manage.py benchmark_tools --only merge --files 500
+    python manage.py benchmark_tools --only tables --pages 50
+    python manage.py benchmark_tools --only watermark --pages 1000
+    python manage.py benchmark_tools --only edit --scan-mb 500
+    python manage.py benchmark_tools --only html --pages 500
+    python manage.py benchmark_tools --only excel --rows 100000
+    python manage.py benchmark_tools --only ppt --pages 200
+"""
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from core import page_render, pdf_tasks, tool_pool, xlsx_layout
+
+BENCHMARKS = ['render', 'merge', 'tables', 'watermark', 'edit', 'html', 'excel', 'ppt']
+
+
+def peak_rss_mb(fn, *args):
+    """Run `fn` in a fresh process and return that process's peak RSS in MB."""
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(_measure, fn, *args).result()
+
+
+def _measure(fn, *args):
+    fn(*args)
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_table_pdf(path, pages, rows=25, cols=5):
+    """
+    Ruled tables with one known value per cell. Returns the expected cell
+    values of every page's table, for scoring extraction accuracy.
+    """
+    doc = fitz.open()
+    expected = []
+    for p in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 60), f"Results table {p + 1}", fontsize=14)
+        table = []
+        for r in range(rows):
+            row = []
+            for c in range(cols):
+                cell = fitz.Rect(50 + c * 100, 80 + r * 26, 150 + c * 100, 106 + r * 26)
+                page.draw_rect(cell, color=(0, 0, 0), width=0.5)
+                value = 'Name' if r == 0 and c == 0 else f"{p}-{r}-{c * 7.5:.1f}"
+                page.insert_text((cell.x0 + 4, cell.y1 - 8), value, fontsize=9)
+                row.append(value)
+            table.append(row)
+        expected.append(table)
+    doc.save(path)
+    doc.close()
+    return expected
+
+
+def insert_text_watermark(input_path, output_path, text):
+    """The previous watermark: text operators and a font reference written into every page."""
+    with fitz.open(input_path) as doc:
+        for page in doc:
+            center = fitz.Point(page.rect.width / 2, page.rect.height / 2)
+            page.insert_text(center, text, fontname="helv", fontsize=50, color=(0.5, 0.5, 0.5))
+        doc.save(output_path, garbage=1, deflate=True)
+
+
+def reportlab_html_to_pdf(html, output_path):
+    """The previous HTML to PDF: flattened text, one Paragraph and Spacer per line."""
+    from bs4 import BeautifulSoup
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+    text_content = BeautifulSoup(html, 'html.parser').get_text(separator='\n', strip=True)
+    styles = getSampleStyleSheet()
+    story = []
+    for line in text_content.split('\n'):
+        if line.strip():
+            try:
+                story.append(Paragraph(line, styles['BodyText']))
+                story.append(Spacer(1, 6))
+            except Exception:
+                continue
+    SimpleDocTemplate(output_path, pagesize=letter).build(story)
+
+
+def make_sample_pptx(path, slides):
+    """A deck of `slides` slides, each with a title, bullets, a photo and a table."""
+    from PIL import Image
+    import io
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    image = Image.frombytes('RGB', (800, 600), os.urandom(800 * 600 * 3))
+    buf = io.BytesIO()
+    image.save(buf, format='JPEG', quality=80)
+    presentation = Presentation()
+    for s in range(slides):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+        slide.shapes.title.text = f'Slide {s + 1}: quarterly results'
+        body = slide.placeholders[1]
+        body.width = Inches(4.5)
+        body.text_frame.text = 'Revenue grew in every region'
+        for point in ('Costs held flat', 'Two new markets opened', 'Hiring on plan'):
+            body.text_frame.add_paragraph().text = point
+        slide.shapes.add_picture(io.BytesIO(buf.getvalue()), Inches(5.2), Inches(1.8), Inches(4), Inches(3))
+        table = slide.shapes.add_table(4, 3, Inches(0.5), Inches(5.2), Inches(9), Inches(1.6)).table
+        for r in range(4):
+            for c in range(3):
+                table.cell(r, c).text = f'Cell {r}-{c}'
+    presentation.save(path)
+
+
+def make_sample_html(sections):
+    """An article of `sections` sections, each with a heading, paragraphs, a list and a table."""
+    parts = ['<html><body><h1>Benchmark article</h1>']
+    for s in range(sections):
+        parts.append(f'<h2>Section {s + 1}</h2>')
+        parts.extend(f'<p>Paragraph {p + 1}: ' + 'lorem ipsum dolor sit amet ' * 12 + '</p>' for p in range(3))
+        parts.append('<ul>' + ''.join(f'<li>Point {i + 1}</li>' for i in range(4)) + '</ul>')
+        rows = ''.join(f'<tr><td>{s}-{r}</td><td>{r * 7.5:.1f}</td><td>ok</td></tr>' for r in range(5))
+        parts.append(f'<table><tr><th>Id</th><th>Value</th><th>State</th></tr>{rows}</table>')
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def make_sample_xlsx(path, rows):
+    """An order log of `rows` rows, written without holding the sheet in memory."""
+    import datetime
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Orders')
+    sheet.append(['Order', 'Customer', 'Quantity', 'Amount', 'Ordered', 'Status', 'Note'])
+    start = datetime.datetime(2024, 1, 1)
+    for i in range(rows):
+        sheet.append([
+            i + 1, f'Customer {i % 997}', i % 40 + 1, round((i % 40 + 1) * 19.99, 2),
+            start + datetime.timedelta(minutes=i), ('open', 'paid', 'shipped')[i % 3],
+            'Deliver to the side entrance ' * (i % 4),
+        ])
+    workbook.save(path)
+
+
+def make_scan_pdf(path, size_mb):
+    """Pages of incompressible JPEG 'scans', about `size_mb` MB in total."""
+    from PIL import Image
+    import io
+
+    doc = fitz.open()
+    while True:
+        image = Image.frombytes('RGB', (1000, 1400), os.urandom(1000 * 1400 * 3))
+        buf = io.BytesIO()
+        image.save(buf, format='JPEG', quality=90)
+        page = doc.new_page()
+        page.insert_image(page.rect, stream=buf.getvalue())
+        if doc.page_count * len(buf.getvalue()) >= size_mb * 1024 * 1024:
+            break
+    doc.save(path)
+    doc.close()
+
+
+def make_sample_pdf(path, pages):
+    """Text-and-vector pages that take a realistic amount of time to rasterize."""
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Benchmark page {i + 1}", fontsize=24)
+        for line in range(40):
+            page.insert_text((72, 110 + line * 16), f"Line {line + 1}: " + "lorem ipsum dolor sit amet " * 3, fontsize=9)
+        for k in range(30):
+            page.draw_circle((300, 420), 20 + k * 6, color=(k / 30, 0.2, 1 - k / 30), width=1.5)
+    doc.save(path)
+    doc.close()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the free PDF tools on synthetic documents'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only',
+            choices=BENCHMARKS,
+            action='append',
+            help='Run only the named benchmark (repeatable; default: all)'
+        )
+        parser.add_argument(
+            '--pages',
+            type=int,
+            default=200,
+            help='Pages in the synthetic document (default: 200)'
+        )
+        parser.add_argument(
+            '--files',
+            type=int,
+            default=500,
+            help='Input files for the merge benchmark (default: 500)'
+        )
+        parser.add_argument(
+            '--scan-mb',
+            type=int,
+            default=200,
+            help='Size of the scanned document for the edit benchmark (default: 200)'
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=100000,
+            help='Rows in the spreadsheet for the excel benchmark (default: 100000)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'TOOL_POOL_WORKERS', 0),
+            help='Pool workers for the parallel runs (default: TOOL_POOL_WORKERS)'
+        )
+
+    def handle(self, *args, **options):
+        self.work_dir = tempfile.mkdtemp(prefix='hewor_bench_')
+        try:
+            for name in options['only'] or BENCHMARKS:
+                self.stdout.write(self.style.MIGRATE_HEADING(f'== {name} =='))
+                getattr(self, f'bench_{name}')(options)
+        finally:
+            tool_pool.shutdown()
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def timed(self, label, fn):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'  {label:<32} {elapsed:8.2f}s')
+        return elapsed, result
+
+    def bench_render(self, options):
+        pages, workers = options['pages'], options['workers']
+        pdf_path = os.path.join(self.work_dir, 'render.pdf')
+        make_sample_pdf(pdf_path, pages)
+        self.stdout.write(f'  {pages} pages, {workers} workers')
+
+        sequential, images = self.timed('sequential (1 process)', lambda: pdf_tasks.render_page_images(
+            pdf_path, 0, pages
+        ))
+
+        with override_settings(TOOL_POOL_WORKERS=workers):
+            tool_pool.shutdown()
+            tool_pool.get_pool()  # don't time the pool start-up
+            parallel, parallel_images = self.timed('parallel (page ranges)', lambda: page_render.render_images(
+                pdf_path
+            ))
+            tool_pool.shutdown()
+
+        assert parallel_images == images
+        self.stdout.write(self.style.SUCCESS(f'  speed-up: {sequential / parallel:.2f}x'))
+
+    def bench_merge(self, options):
+        files = options['files']
+        batch_size = getattr(settings, 'TOOL_MERGE_BATCH_SIZE', 25)
+        part_path = os.path.join(self.work_dir, 'part.pdf')
+        make_sample_pdf(part_path, 4)
+        self.stdout.write(f'  {os.path.getsize(part_path) // 1024} KB per part, batch size {batch_size}')
+        self.stdout.write(f'  idle worker: {peak_rss_mb(pdf_tasks.noop):.1f} MB')
+
+        for count in sorted({max(1, files // 5), max(1, files // 2), files}):
+            input_paths = []
+            for i in range(count):
+                path = os.path.join(self.work_dir, f'part_{i}.pdf')
+                if not os.path.exists(path):
+                    shutil.copyfile(part_path, path)
+                input_paths.append(path)
+            output_path = os.path.join(self.work_dir, 'merged.pdf')
+
+            start = time.perf_counter()
+            in_memory = peak_rss_mb(pdf_tasks.merge_pdfs, input_paths, output_path)
+            in_memory_time = time.perf_counter() - start
+            start = time.perf_counter()
+            bounded = peak_rss_mb(pdf_tasks.merge_pdfs_bounded, input_paths, output_path, batch_size)
+            bounded_time = time.perf_counter() - start
+            self.stdout.write(
+                f'  {count:>5} files   in-memory: {in_memory:7.1f} MB peak, {in_memory_time:6.2f}s'
+                f'   bounded: {bounded:7.1f} MB peak, {bounded_time:6.2f}s'
+            )
+
+    def bench_tables(self, options):
+        pages, workers = options['pages'], options['workers']
+        pdf_path = os.path.join(self.work_dir, 'tables.pdf')
+        expected = make_table_pdf(pdf_path, pages)
+        total_cells = sum(len(row) for table in expected for row in table)
+        self.stdout.write(f'  {pages} pages, {total_cells} cells')
+
+        def accuracy(tables):
+            found = {name: rows for name, rows in tables}
+            correct = 0
+            for p, table in enumerate(expected):
+                rows = found.get(f'Page_{p+1}_Table_1', [])
+                for r, row in enumerate(table):
+                    for c, value in enumerate(row):
+                        if r < len(rows) and c < len(rows[r]) and (rows[r][c] or '').strip() == value:
+                            correct += 1
+            return 100.0 * correct / total_cells
+
+        for engine, extract in pdf_tasks.TABLE_ENGINES.items():
+            elapsed, tables = self.timed(f'{engine} (1 process)', lambda: extract(pdf_path, 0, pages))
+            self.stdout.write(f'  {"":<32} {pages / elapsed:8.1f} pages/s, {accuracy(tables):5.1f}% cells exact')
+
+        with override_settings(TOOL_POOL_WORKERS=workers):
+            tool_pool.shutdown()
+            tool_pool.get_pool()
+            output_path = os.path.join(self.work_dir, 'tables.xlsx')
+            self.timed(f'pymupdf end to end ({workers} workers)', lambda: page_render.pdf_to_xlsx(pdf_path, output_path))
+            tool_pool.shutdown()
+
+    def bench_watermark(self, options):
+        pages = options['pages']
+        pdf_path = os.path.join(self.work_dir, 'watermark.pdf')
+        make_sample_pdf(pdf_path, pages)
+        output_path = os.path.join(self.work_dir, 'watermarked.pdf')
+        self.stdout.write(f'  {pages} pages')
+
+        def save_only():
+            with fitz.open(pdf_path) as doc:
+                doc.save(output_path, garbage=1, deflate=True)
+
+        runs = [
+            ('open + save, no watermark', save_only),
+            ('insert_text on every page', lambda: insert_text_watermark(pdf_path, output_path, 'CONFIDENTIAL')),
+            ('shared XObject', lambda: pdf_tasks.add_watermark(pdf_path, output_path, 'CONFIDENTIAL', 45, 0.3)),
+            ('shared XObject, tiled', lambda: pdf_tasks.add_watermark(pdf_path, output_path, 'CONFIDENTIAL', 45, 0.3, True)),
+        ]
+        baseline = None
+        for label, fn in runs:
+            self.timed(label, fn)
+            size = os.path.getsize(output_path)
+            baseline = size if baseline is None else baseline
+            self.stdout.write(f'  {"":<32} {size / 1024:8.0f} KB, +{(size - baseline) / pages:.0f} bytes/page')
+
+    def bench_edit(self, options):
+        scan_path = os.path.join(self.work_dir, 'scan.pdf')
+        make_scan_pdf(scan_path, options['scan_mb'])
+        with fitz.open(scan_path) as doc:
+            pages = doc.page_count
+        self.stdout.write(f'  {os.path.getsize(scan_path) / 1024 / 1024:.0f} MB, {pages} pages')
+
+        input_path = os.path.join(self.work_dir, 'scan_copy.pdf')
+        output_path = os.path.join(self.work_dir, 'rotated.pdf')
+
+        def full_save():
+            with fitz.open(input_path) as doc:
+                for page in doc:
+                    page.set_rotation(90)
+                doc.save(output_path)
+
+        for label, fn in [
+            ('rotate, full save', full_save),
+            ('rotate, incremental update', lambda: pdf_tasks.rotate_pages(input_path, output_path, 90)),
+            ('page numbers, incremental update', lambda: pdf_tasks.add_page_numbers(input_path, output_path)),
+        ]:
+            shutil.copyfile(scan_path, input_path)  # the fast path consumes its input
+            if os.path.exists(output_path):
+                os.remove(output_path)  # don't time unlinking the previous run's output
+            self.timed(label, fn)
+
+    def bench_html(self, options):
+        sections = options['pages']
+        html = make_sample_html(sections)
+        output_path = os.path.join(self.work_dir, 'html.pdf')
+        self.stdout.write(f'  {sections} sections, {len(html) / 1024:.0f} KB of HTML')
+
+        for label, fn in [
+            ('reportlab, flattened text', lambda: reportlab_html_to_pdf(html, output_path)),
+            ('fitz.Story layout', lambda: pdf_tasks.html_to_pdf(html, output_path)),
+        ]:
+            elapsed, _ = self.timed(label, fn)
+            with fitz.open(output_path) as doc:
+                pages = doc.page_count
+            self.stdout.write(f'  {"":<32} {pages:8d} pages, {pages / elapsed:.0f} pages/s')
+
+    def bench_excel(self, options):
+        output_path = os.path.join(self.work_dir, 'excel.pdf')
+        # A tenth of the rows and then all of them: peak memory should not grow with the sheet
+        for rows in (max(options['rows'] // 10, 1), options['rows']):
+            xlsx_path = os.path.join(self.work_dir, f'excel_{rows}.xlsx')
+            make_sample_xlsx(xlsx_path, rows)
+            elapsed, _ = self.timed(f'{rows} rows', lambda: xlsx_layout.convert(xlsx_path, output_path))
+            with fitz.open(output_path) as doc:
+                pages = doc.page_count
+            peak = peak_rss_mb(xlsx_layout.convert, xlsx_path, output_path)
+            self.stdout.write(f'  {"":<32} {rows / elapsed:8.0f} rows/s, {pages} pages, peak RSS {peak:.0f} MB')
+
+    def bench_ppt(self, options):
+        slides = options['pages']
+        pptx_path = os.path.join(self.work_dir, 'deck.pptx')
+        make_sample_pptx(pptx_path, slides)
+        output_path = os.path.join(self.work_dir, 'deck.pdf')
+        self.stdout.write(f'  {slides} slides, {os.path.getsize(pptx_path) / 1024 / 1024:.1f} MB')
+
+        for label, fn in [
+            ('platypus, slide text only', pdf_tasks.pptx_text_to_pdf),
+            ('slide renderer', pdf_tasks.pptx_to_pdf),
+        ]:
+            fn(pptx_path, output_path)  # untimed, so neither pays for first imports and font loading
+            elapsed, _ = self.timed(label, lambda: fn(pptx_path, output_path))
+            peak = peak_rss_mb(fn, pptx_path, output_path)
+            self.stdout.write(f'  {"":<32} {slides / elapsed:8.0f} slides/s, peak RSS {peak:.0f} MB')
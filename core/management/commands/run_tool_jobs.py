@@ -0,0 +1,68 @@
+"""
+Django management command that processes background free-tool jobs.
+
+Usage:
+    python manage.py run_tool_jobs
+    python manage.py run_tool_jobs --once
+    python manage.py run_tool_jobs --sleep 2 --purge-after-hours 6
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.tool_jobs import claim_next_job, process_job, purge_finished_jobs
+
+
+class Command(BaseCommand):
+    help = 'Process queued PDF to Word/PowerPoint/Excel conversion jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process every queued job, then exit instead of polling'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Seconds to wait between polls when the queue is empty (default: 1)'
+        )
+        parser.add_argument(
+            '--purge-after-hours',
+            type=int,
+            default=getattr(settings, 'TOOL_JOB_TTL_HOURS', 24),
+            help='Delete finished jobs and their results after X hours'
+        )
+
+    def handle(self, *args, **options):
+        once = options['once']
+        purge_after = options['purge_after_hours']
+        last_purge = 0.0
+
+        self.stdout.write('Tool job worker started...')
+
+        while True:
+            if time.monotonic() - last_purge > 600:
+                purged = purge_finished_jobs(purge_after)
+                if purged:
+                    self.stdout.write(f'  Purged {purged} finished jobs')
+                last_purge = time.monotonic()
+
+            job = claim_next_job()
+            if job is None:
+                if once:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            self.stdout.write(f'  Running {job.tool} job {job.id}...')
+            process_job(job)
+            job.refresh_from_db()
+            if job.status == 'done':
+                self.stdout.write(self.style.SUCCESS(f'  ✓ Job {job.id} done ({job.total} pages)'))
+            else:
+                self.stdout.write(self.style.ERROR(f'  ✗ Job {job.id} failed: {job.error}'))
+
+        self.stdout.write(self.style.SUCCESS('Queue empty, worker exiting.'))
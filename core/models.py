@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -322,3 +323,55 @@ class BlogPost(models.Model):
     def get_absolute_url(self):
         from django.urls import reverse
         return reverse('blog_detail', kwargs={'slug': self.slug})
+
+
+# --- 11. TOOL JOB MODEL (Background conversions for the free tools) ---
+class ToolJob(models.Model):
+    """
+    A long-running free-tool conversion processed by the `run_tool_jobs` worker.
+    The UUID is the only handle the client gets, so it doubles as the access key.
+    """
+    TOOL_CHOICES = [
+        ('pdf_to_word', 'PDF to Word'),
+        ('pdf_to_ppt', 'PDF to PowerPoint'),
+        ('pdf_to_excel', 'PDF to Excel'),
+    ]
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tool = models.CharField(max_length=50, choices=TOOL_CHOICES)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    options = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    progress = models.PositiveIntegerField(default=0, help_text="Pages processed so far")
+    total = models.PositiveIntegerField(default=0, help_text="Total pages to process")
+    error = models.TextField(blank=True)
+
+    result_file = models.FileField(upload_to='tool_jobs/results/', blank=True, null=True)
+    result_name = models.CharField(max_length=255, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"{self.get_tool_display()} job {self.id} ({self.status})"
+
+
+class ToolJobInput(models.Model):
+    job = models.ForeignKey(ToolJob, related_name='inputs', on_delete=models.CASCADE)
+    file = models.FileField(upload_to='tool_jobs/inputs/')
+    original_filename = models.CharField(max_length=255)
+
+    def __str__(self):
+        return f"{self.original_filename} for job {self.job_id}"
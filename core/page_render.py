@@ -0,0 +1,77 @@
+"""
+Parallel page rendering (and table extraction) for the free tools.
+
+A document's pages are split into contiguous ranges (see
+`tool_pool.page_ranges`) and every range is handled by a different pool
+worker, so one long PDF uses every core instead of one. Results are stitched
+back together in page order.
+"""
+from concurrent.futures import TimeoutError as FutureTimeout, as_completed
+
+from django.conf import settings
+
+from . import pdf_tasks, tool_pool
+
+
+def _map_and_gather(fn, input_path, *args, progress=None, **kwargs):
+    """
+    Run `fn` over the page ranges of `input_path` and flatten the results in
+    page order. `progress`, if given, is called with the number of pages done
+    as each range finishes.
+    """
+    page_count = pdf_tasks.count_pages(input_path)
+    futures = tool_pool.map_page_ranges(fn, input_path, page_count, *args, **kwargs)
+    if progress:
+        range_pages = {
+            future: stop - start
+            for future, (start, stop) in zip(futures, tool_pool.page_ranges(page_count))
+        }
+        done = 0
+        try:
+            for future in as_completed(futures, timeout=tool_pool.wait_timeout(futures[0])):
+                done += range_pages[future]
+                progress(done)
+        except FutureTimeout:
+            pass  # tool_pool.result stops the job below
+    return [item for future in futures for item in tool_pool.result(future)]
+
+
+def render_images(input_path, dpi=144, image_format='jpeg', quality=85, progress=None):
+    """Every page of `input_path` as image bytes, in page order."""
+    return _map_and_gather(
+        pdf_tasks.render_page_images, input_path,
+        dpi=dpi, image_format=image_format, quality=quality, progress=progress,
+    )
+
+
+def pdf_to_pptx(input_path, output_path, progress=None, dpi=144, image_format='jpeg', quality=80):
+    """PDF to PowerPoint with the slide images rendered in parallel."""
+    images = render_images(input_path, dpi=dpi, image_format=image_format, quality=quality, progress=progress)
+    tool_pool.run(pdf_tasks.images_to_pptx, input_path, images, output_path)
+    return output_path
+
+
+def pdf_to_xlsx(input_path, output_path, progress=None, engine='pymupdf'):
+    """PDF to Excel with the tables of each page range extracted in parallel."""
+    tables = _map_and_gather(pdf_tasks.TABLE_ENGINES[engine], input_path, progress=progress)
+    tool_pool.run(pdf_tasks.write_tables_xlsx, tables, output_path)
+    return output_path
+
+
+def pdf_to_docx(input_path, output_path, progress=None, start=0, end=None):
+    """
+    PDF to Word for one document, letting pdf2docx parse the page range in
+    TOOL_WORD_PROCESSES processes when the range is long enough to pay for it.
+    """
+    page_count = len(range(pdf_tasks.count_pages(input_path))[start:end])
+    cpu_count = 0
+    # Inline mode runs on a request thread, where pdf2docx's chdir isn't safe
+    if tool_pool.pool_size() > 0 and page_count >= settings.TOOL_WORD_MP_MIN_PAGES:
+        cpu_count = settings.TOOL_WORD_PROCESSES
+    tool_pool.run(
+        pdf_tasks.pdf_to_docx, input_path, output_path,
+        start=start, end=end, cpu_count=cpu_count,
+    )
+    if progress:
+        progress(page_count)
+    return output_path
@@ -0,0 +1,229 @@
+"""
+Page selections shared by the split, remove, extract and rotate tools.
+
+A selection is written as comma-separated terms, with pages numbered from 1:
+
+    7          a single page
+    3-9        an inclusive range (9-3 selects the same pages in reverse order)
+    5-         page 5 to the end of the document
+    last, -1   the last page; negative numbers count back from the end
+    -3-last    the last three pages
+    odd, even  every odd / even page; a range may be qualified too, as in "1-20 odd"
+
+`parse` checks the syntax once, without knowing the page count, and returns a
+`PageSelection` whose terms are resolved per document into Python `range`
+objects. Everything here is O(number of terms): "1-1000000" is one range, not
+a million page numbers. Selections are picklable so they can be sent to the
+tool pool.
+"""
+import re
+from itertools import chain
+
+LAST = 'last'
+
+_TERM = re.compile(
+    r'^(?P<start>-?\d+|last)(?:\s*(?P<dash>-)\s*(?P<stop>-?\d+|last)?)?(?:\s+(?P<parity>odd|even))?$'
+    r'|^(?P<all>odd|even)$'
+)
+
+
+class PageSelection:
+    def __init__(self, terms):
+        # (start, stop, parity): 1-based or negative page numbers, 'last', or None
+        # for an open end; parity is 'odd', 'even' or None
+        self.terms = tuple(terms)
+
+    def __str__(self):
+        """Canonical spelling, e.g. for cache keys."""
+        return ','.join(_format_term(*term) for term in self.terms)
+
+    def __repr__(self):
+        return f'PageSelection({str(self)!r})'
+
+    def __eq__(self, other):
+        return isinstance(other, PageSelection) and self.terms == other.terms
+
+    def __hash__(self):
+        return hash(self.terms)
+
+    def resolve(self, page_count):
+        """
+        0-based `range`s in the order they were written, clipped to the document.
+        Terms that fall entirely outside it are dropped.
+        """
+        ranges = []
+        for start, stop, parity in self.terms:
+            first = _index(start, page_count)
+            last = _index(stop, page_count)
+            step = 1 if first <= last else -1
+            # Clip both ends to [0, page_count)
+            low, high = max(min(first, last), 0), min(max(first, last), page_count - 1)
+            if low > high:
+                continue
+            if step == 1:
+                first, last = low, high
+            else:
+                first, last = high, low
+            if parity:
+                # Odd pages have even 0-based indices
+                wanted = 0 if parity == 'odd' else 1
+                if first % 2 != wanted:
+                    first += step
+                step *= 2
+                if (last - first) * step < 0:
+                    continue
+            ranges.append(range(first, last + (1 if step > 0 else -1), step))
+        return ranges
+
+    def pages(self, page_count):
+        """Selected 0-based page numbers in written order, repeats included."""
+        for r in self.resolve(page_count):
+            yield from r
+
+    def count(self, page_count):
+        return sum(len(r) for r in self.resolve(page_count))
+
+    def merged(self, page_count):
+        """
+        The distinct selected pages as sorted, disjoint step-1 `range`s. Plain
+        ranges are merged as intervals, and so are the odd/even terms of each
+        parity. Where odd and even runs overlap they fill an interval; only
+        their pages left in the gaps between intervals come out one by one.
+        """
+        plain, parity = [], ([], [])  # parity runs by the parity of their 0-based indices
+        for r in self.resolve(page_count):
+            if r.step < 0:
+                r = r[::-1]
+            if r.step == 1 or len(r) == 1:
+                plain.append((r.start, r.start + len(r)))
+            else:
+                parity[r.start % 2].append((r.start, r[-1] + 1))
+        # Runs of one parity touch when the next starts two pages after the last
+        evens, odds = (_union(runs, slack=1) for runs in parity)
+
+        intervals = plain
+        i = j = 0
+        while i < len(evens) and j < len(odds):
+            start, stop = max(evens[i][0], odds[j][0]), min(evens[i][1], odds[j][1])
+            if start < stop:
+                intervals.append((start, stop))
+            if evens[i][1] < odds[j][1]:
+                i += 1
+            else:
+                j += 1
+        intervals = _union(intervals)
+
+        singles = []  # ranges of single pages, every other page
+        for runs in (evens, odds):
+            k = 0
+            for start, stop in runs:
+                page = start
+                while page < stop:
+                    while k < len(intervals) and intervals[k][1] <= page:
+                        k += 1
+                    if k < len(intervals) and intervals[k][0] <= page:
+                        end = intervals[k][1]  # covered; go on past the interval, on this parity
+                    else:
+                        end = min(stop, intervals[k][0]) if k < len(intervals) else stop
+                        singles.append(range(page, end, 2))
+                    page = end + (page - end) % 2
+
+        runs = []
+        k = 0
+        for single in sorted(chain.from_iterable(singles)):
+            while k < len(intervals) and intervals[k][0] <= single:
+                _extend(runs, *intervals[k])
+                k += 1
+            _extend(runs, single, single + 1)
+        for start, stop in intervals[k:]:
+            _extend(runs, start, stop)
+        return [range(start, stop) for start, stop in runs]
+
+    def complement(self, page_count):
+        """The pages not selected, as sorted, disjoint step-1 `range`s."""
+        gaps = []
+        position = 0
+        for r in self.merged(page_count):
+            if r.start > position:
+                gaps.append(range(position, r.start))
+            position = r.stop
+        if position < page_count:
+            gaps.append(range(position, page_count))
+        return gaps
+
+
+def parse(spec):
+    """
+    Parse a selection such as "1, 3-5, 10-, last". Raises ValueError naming the
+    first term that can't be read.
+    """
+    terms = []
+    for raw in spec.split(','):
+        text = raw.strip().lower()
+        if not text:
+            continue
+        match = _TERM.match(text)
+        if not match:
+            raise ValueError(f"Invalid page selection: '{raw.strip()}'")
+        if match['all']:
+            terms.append((1, None, match['all']))
+            continue
+        start = _number(match['start'], raw)
+        if match['dash'] and match['stop'] is None:
+            stop = None  # open range
+        elif match['dash']:
+            stop = _number(match['stop'], raw)
+        else:
+            stop = start
+        terms.append((start, stop, match['parity']))
+    if not terms:
+        raise ValueError("No pages selected.")
+    return PageSelection(terms)
+
+
+def _union(intervals, slack=0):
+    """
+    [start, stop) `intervals` as sorted, disjoint ones, also joining those
+    at most `slack` pages apart.
+    """
+    runs = []
+    for start, stop in sorted(intervals):
+        _extend(runs, start, stop, slack)
+    return [tuple(run) for run in runs]
+
+
+def _extend(runs, start, stop, slack=0):
+    """Add [start, stop) to sorted `runs` ([start, stop] lists), none of which starts later."""
+    if runs and start <= runs[-1][1] + slack:
+        if stop > runs[-1][1]:
+            runs[-1][1] = stop
+    else:
+        runs.append([start, stop])
+
+
+def _number(token, raw):
+    if token == LAST:
+        return LAST
+    value = int(token)
+    if value == 0:
+        raise ValueError(f"Invalid page selection: '{raw.strip()}' (pages are numbered from 1)")
+    return value
+
+
+def _index(page, page_count):
+    """1-based, negative, 'last' or open (None) page to a 0-based index, unclipped."""
+    if page is None or page == LAST:
+        return page_count - 1
+    if page < 0:
+        return page_count + page
+    return page - 1
+
+
+def _format_term(start, stop, parity):
+    if stop == start:
+        text = str(start)
+    elif start == 1 and stop is None and parity:
+        return parity
+    else:
+        text = f"{start}-{'' if stop is None else stop}"
+    return f'{text} {parity}' if parity else text
@@ -0,0 +1,950 @@
+"""
+CPU-heavy document work for the free tools.
+
+Every function in this module runs inside a `core.tool_pool` worker process,
+so it must stay importable without Django: take file paths and plain values,
+write results to the given output paths and return small picklable values.
+The same holds for every module it uses (the writer, page selections and
+the Office converters); `tests_tool_pool` imports them all without Django.
+"""
+import io
+import math
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+
+import fitz  # PyMuPDF
+
+from . import budgets
+from .pdf_writer import PageSink, PdfWriter, pdf_number
+
+
+def warm_up():
+    """Import the heavy conversion stack once per worker process."""
+    import pdfplumber  # noqa: F401
+    import openpyxl  # noqa: F401
+    import pptx  # noqa: F401
+    import pdf2docx  # noqa: F401
+
+
+def noop():
+    return os.getpid()
+
+
+def open_pdf(path):
+    """`fitz.open(path)`, refused when the document is over the job's page budget."""
+    doc = fitz.open(path)
+    try:
+        budgets.check_pages(doc.page_count)
+    except budgets.BudgetExceeded:
+        doc.close()
+        raise
+    return doc
+
+
+def count_pages(input_path):
+    with open_pdf(input_path) as doc:
+        return doc.page_count
+
+
+def merge_pdfs(input_paths, output_path):
+    merged_doc = fitz.open()
+    try:
+        for path in input_paths:
+            with open_pdf(path) as part_doc:
+                merged_doc.insert_pdf(part_doc)
+            budgets.check_pages(merged_doc.page_count)
+        # garbage=4: deduplicate objects, deflate=True: compress streams
+        merged_doc.save(output_path, garbage=4, deflate=True)
+    finally:
+        merged_doc.close()
+    return output_path
+
+
+def merge_pdfs_bounded(input_paths, output_path, batch_size=25):
+    """
+    Merge for very large jobs with roughly constant memory. Parts are appended
+    `batch_size` at a time to the output file, which is saved incrementally
+    and reopened between batches, so MuPDF never holds more than one batch of
+    parts in memory. No whole-file garbage collection pass is made at the end,
+    since that would load every object again.
+    """
+    merged_doc = fitz.open()
+    try:
+        for path in input_paths[:batch_size]:
+            with open_pdf(path) as part_doc:
+                merged_doc.insert_pdf(part_doc)
+            budgets.check_pages(merged_doc.page_count)
+        merged_doc.save(output_path, deflate=True)
+    finally:
+        merged_doc.close()
+
+    for start in range(batch_size, len(input_paths), batch_size):
+        merged_doc = fitz.open(output_path)
+        try:
+            for path in input_paths[start:start + batch_size]:
+                with open_pdf(path) as part_doc:
+                    merged_doc.insert_pdf(part_doc)
+                budgets.check_pages(merged_doc.page_count)
+            merged_doc.saveIncr()
+        finally:
+            merged_doc.close()
+    return output_path
+
+
+def split_pdf(input_path, selection, output_dir, base_name):
+    """
+    Split `input_path` after every page in `selection` (a PageSelection).
+    Returns a list of (archive name, part path) tuples.
+    """
+    parts = []
+    with open_pdf(input_path) as source_doc:
+        total_pages = source_doc.page_count
+        # A part ends after each selected page; splitting after the last page is a no-op
+        ranges = []
+        last_split = 0
+        for run in selection.merged(total_pages):
+            for split_point in range(run.start + 1, min(run.stop, total_pages - 1) + 1):
+                ranges.append((last_split, split_point))
+                last_split = split_point
+        if last_split < total_pages:
+            ranges.append((last_split, total_pages))
+
+        for part_idx, (r_start, r_end) in enumerate(ranges):
+            if r_start >= r_end:
+                continue
+            arcname = f"{base_name}_part_{part_idx + 1}.pdf"
+            part_path = os.path.join(output_dir, arcname)
+            budgets.check_time()
+            part_doc = fitz.open()
+            try:
+                part_doc.insert_pdf(source_doc, from_page=r_start, to_page=r_end - 1)
+                part_doc.save(part_path, garbage=4, deflate=True)
+            finally:
+                part_doc.close()
+            parts.append((arcname, part_path))
+    return parts
+
+
+def save_edit(doc, output_path):
+    """
+    Save a document that was edited without changing its structure (rotation,
+    stamped content, annotations).
+
+    When the file allows it (a plain, unencrypted PDF that MuPDF didn't have to
+    repair), the opened file is copied to `output_path` and only the changed
+    objects are appended to the copy as an incremental update. That costs a
+    byte copy, done in the kernel, instead of a rewrite. Otherwise the document
+    is rewritten to `output_path` in full. The opened file is never written to:
+    it may be an upload still owned by Django (see `uploads.upload_path`).
+    Returns True for the incremental path.
+    """
+    # is_encrypted turns False once an empty user password has been applied
+    encrypted = doc.is_encrypted or doc.needs_pass or doc.metadata.get('encryption')
+    if doc.can_save_incrementally() and not encrypted and not doc.is_repaired:
+        shutil.copyfile(doc.name, output_path)
+        if not _append_update(doc, output_path):
+            # Cross-reference streams: let MuPDF append the update (it re-reads
+            # the file); PyMuPDF's saveIncr() would only write to `doc.name`
+            options = fitz.mupdf.PdfWriteOptions()
+            options.do_incremental = 1
+            fitz.mupdf.pdf_save_document(fitz._as_pdf_document(doc), output_path, options)
+        return True
+    doc.save(output_path)
+    return False
+
+
+def _append_update(doc, path):
+    """
+    Append to `path`, a copy of the file `doc` was opened from, the objects
+    MuPDF marks as changed since, a classic xref section for them and a
+    trailer pointing back at the previous one.
+    MuPDF's own incremental save reads the whole file again first, which is
+    what made rotating a large scan slow. Returns False, without writing, when
+    the file doesn't end in a classic xref table and trailer.
+    """
+    with open(path, 'rb') as f:
+        end = f.seek(0, os.SEEK_END)
+        f.seek(max(0, end - 16384))
+        tail = f.read()
+        match = re.search(rb'startxref\s+(\d+)\s+%%EOF\s*$', tail)
+        if not match:
+            return False
+        prev = int(match.group(1))
+        f.seek(prev)
+        if f.read(4) != b'xref':
+            return False
+    trailer_at = tail.rfind(b'trailer', 0, match.start())
+    if trailer_at < 0:
+        return False
+    trailer = tail[trailer_at + len(b'trailer'):match.start()].strip()
+    if not trailer.startswith(b'<<'):
+        return False
+
+    pdf = fitz._as_pdf_document(doc)
+    changed = [x for x in range(1, doc.xref_length()) if fitz.mupdf.pdf_xref_is_incremental(pdf, x)]
+    offsets = {}
+    with open(path, 'ab') as f:
+        position = end + f.write(b'\n')
+        for xref in changed:
+            entry = fitz.mupdf.ll_pdf_get_xref_entry_no_null(pdf.m_internal, xref)
+            if entry.type == ord('f'):
+                offsets[xref] = (0, entry.gen, 'f')
+                continue
+            offsets[xref] = (position, entry.gen, 'n')
+            if doc.xref_is_stream(xref):
+                data = doc.xref_stream_raw(xref)
+                doc.xref_set_key(xref, 'Length', str(len(data)))
+                body = doc.xref_object(xref, compressed=True).encode('latin-1')
+                body += b'\nstream\n' + data + b'\nendstream'
+            else:
+                body = doc.xref_object(xref, compressed=True).encode('latin-1')
+            position += f.write(b'%d %d obj\n%s\nendobj\n' % (xref, entry.gen, body))
+
+        lines = ['xref\n']
+        run = []
+        for xref in changed + [None]:
+            if run and xref != run[-1] + 1:
+                lines.append(f'{run[0]} {len(run)}\n')
+                lines.extend('%010d %05d %s \n' % offsets[x] for x in run)
+                run = []
+            if xref is not None:
+                run.append(xref)
+        for key, value in ((rb'/Size', doc.xref_length()), (rb'/Prev', prev)):
+            trailer, found = re.subn(key + rb'\s+\d+', b'%s %d' % (key, value), trailer)
+            if not found:
+                trailer = b'<<%s %d' % (key, value) + trailer[2:]
+        # A hybrid file's /XRefStm belongs to the section it was written with
+        trailer = re.sub(rb'/XRefStm\s+\d+', b'', trailer)
+        f.write(''.join(lines).encode('ascii'))
+        f.write(b'trailer\n%s\nstartxref\n%d\n%%%%EOF\n' % (trailer, position))
+    return True
+
+
+def rotate_pages(input_path, output_path, angle, selection=None):
+    """
+    Rotate the pages in `selection` (default: all) clockwise by `angle` degrees.
+    Saved with `save_edit`; `input_path` is left untouched.
+    """
+    with open_pdf(input_path) as doc:
+        runs = selection.merged(doc.page_count) if selection else [range(doc.page_count)]
+        for run in runs:
+            for pno in run:
+                page = doc[pno]
+                page.set_rotation((page.rotation + angle) % 360)
+        save_edit(doc, output_path)
+    return output_path
+
+
+def remove_pages(input_path, output_path, selection):
+    """
+    Delete the pages in `selection`. Each selected run is one delete_pages call,
+    last run first so earlier page numbers stay valid.
+    """
+    with open_pdf(input_path) as doc:
+        runs = selection.merged(doc.page_count)
+        if sum(len(run) for run in runs) == doc.page_count:
+            raise ValueError("Cannot remove all pages.")
+        for run in reversed(runs):
+            doc.delete_pages(from_page=run.start, to_page=run.stop - 1)
+        doc.save(output_path)
+    return output_path
+
+
+WATERMARK_FONTSIZE = 50
+WATERMARK_MAX_TILES = 400
+
+
+def _watermark_stamp(text, image_path, opacity):
+    """
+    One-page document holding just the watermark, cropped to its bounds. Opacity
+    is baked in here (an ExtGState for text, the alpha channel for images).
+    """
+    stamp = fitz.open()
+    if image_path:
+        from PIL import Image, ImageOps
+
+        with Image.open(image_path) as image:
+            budgets.check_image(*image.size)
+            image = ImageOps.exif_transpose(image).convert('RGBA')
+        if opacity < 1:
+            image.putalpha(image.getchannel('A').point(lambda a: round(a * opacity)))
+        buf = io.BytesIO()
+        image.save(buf, format='PNG')
+        page = stamp.new_page(width=image.width, height=image.height)
+        page.insert_image(page.rect, stream=buf.getvalue())
+    else:
+        font = fitz.Font('helv')
+        width = font.text_length(text, fontsize=WATERMARK_FONTSIZE)
+        height = WATERMARK_FONTSIZE * (font.ascender - font.descender)
+        page = stamp.new_page(width=max(width, 1), height=height)
+        page.insert_text(
+            (0, WATERMARK_FONTSIZE * font.ascender), text, fontname='helv', fontsize=WATERMARK_FONTSIZE,
+            color=(0.5, 0.5, 0.5), fill_opacity=opacity,
+        )
+    return stamp
+
+
+def _watermark_overlay(overlay_doc, stamp, width, height, rotation, tile):
+    """Append a `width` x `height` page to `overlay_doc` with the stamp placed on it."""
+    page = overlay_doc.new_page(width=width, height=height)
+    # Bounding box of the rotated stamp
+    angle = math.radians(rotation)
+    sw, sh = stamp[0].rect.width, stamp[0].rect.height
+    bw = abs(sw * math.cos(angle)) + abs(sh * math.sin(angle))
+    bh = abs(sw * math.sin(angle)) + abs(sh * math.cos(angle))
+
+    if not tile:
+        # Centred, shrunk to fit if it's wider or taller than the page
+        scale = min(1, 0.9 * width / bw, 0.9 * height / bh)
+        bw, bh = bw * scale, bh * scale
+        rect = fitz.Rect((width - bw) / 2, (height - bh) / 2, (width + bw) / 2, (height + bh) / 2)
+        page.show_pdf_page(rect, stamp, 0, rotate=rotation)
+        return
+
+    # Grid with half a stamp of space around each tile, centred on the page
+    cell_w = max(bw * 1.5, 36, math.sqrt(width * height / WATERMARK_MAX_TILES))
+    cell_h = max(bh * 1.5, 36, math.sqrt(width * height / WATERMARK_MAX_TILES))
+    cols, rows = math.ceil(width / cell_w), math.ceil(height / cell_h)
+    x0, y0 = (width - cols * cell_w) / 2, (height - rows * cell_h) / 2
+    for row in range(rows):
+        for col in range(cols):
+            cx, cy = x0 + (col + 0.5) * cell_w, y0 + (row + 0.5) * cell_h
+            page.show_pdf_page(fitz.Rect(cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2), stamp, 0, rotate=rotation)
+
+
+def _new_stream(doc, data):
+    xref = doc.get_new_xref()
+    doc.update_object(xref, '<<>>')
+    doc.update_stream(xref, data)
+    return xref
+
+
+def _set_page_resource(doc, page_xref, category, name, value):
+    """
+    Set /Resources/<category>/<name> on a page, following indirect dictionaries
+    on the way. Returns the xref of the object that was changed.
+    """
+    xref, path = page_xref, ''
+    for key in ('Resources', category):
+        path = f'{path}/{key}' if path else key
+        kind, ref = doc.xref_get_key(xref, path)
+        if kind == 'xref':
+            xref, path = int(ref.split()[0]), ''
+    doc.xref_set_key(xref, f'{path}/{name}' if path else name, value)
+    return xref
+
+
+def _contents_refs(doc, page_xref):
+    kind, value = doc.xref_get_key(page_xref, 'Contents')
+    if kind == 'xref':
+        return value
+    if kind == 'array':
+        return value[1:-1].strip()
+    return ''
+
+
+def add_watermark(input_path, output_path, text='', rotation=0, opacity=1.0, tile=False, image_path=None):
+    """
+    Stamp a text (or image, if `image_path` is given) watermark on every page.
+
+    The watermark is drawn once into an overlay document, one overlay page per
+    distinct page size. The first page of each geometry gets it through
+    show_pdf_page; every other page with that geometry just references the same
+    Form XObject and the same two tiny content streams, so the output grows by
+    a few bytes per page and nothing is re-encoded.
+    """
+    with open_pdf(input_path) as doc, _watermark_stamp(text, image_path, opacity) as stamp, fitz.open() as overlays:
+        pages = []
+        overlay_for_size = {}
+        for page in doc:
+            budgets.check_time()
+            # show_pdf_page works in unrotated page space, so the overlay is drawn
+            # there and the stamp turned by the page's /Rotate to come out upright
+            target = page.rect * page.derotation_matrix
+            size = (round(target.width, 2), round(target.height, 2), page.rotation)
+            geometry = (tuple(page.mediabox), tuple(page.cropbox), page.rotation)
+            pages.append((page.xref, target, size, geometry))
+            if size not in overlay_for_size:
+                # All overlays must exist before the first one is grafted into `doc`
+                overlay_for_size[size] = overlays.page_count
+                _watermark_overlay(overlays, stamp, size[0], size[1], rotation + page.rotation, tile)
+
+        stamped = {}  # geometry -> (XObject name, xref)
+        save_state = None  # "q" before the page's own content, which may leave the CTM changed
+        restore_and_stamp = {}  # XObject name -> "Q q /name Do Q" stream
+        resources_done = set()  # shared /Resources (or /XObject) dictionaries already updated
+        for pno, (page_xref, target, size, geometry) in enumerate(pages):
+            kind, resources = doc.xref_get_key(page_xref, 'Resources')
+            if geometry not in stamped or kind == 'null':
+                # First page of this geometry, or resources inherited from the page tree
+                page = doc[pno]
+                before = {name for _, name, *_ in page.get_xobjects()}
+                page.show_pdf_page(target, overlays, overlay_for_size[size])
+                if geometry not in stamped:
+                    xref = next(x for x, name, *_ in page.get_xobjects() if name not in before)
+                    stamped[geometry] = (f'HwWm{xref}', xref)
+                continue
+
+            name, xref = stamped[geometry]
+            if save_state is None:
+                save_state = _new_stream(doc, b'q\n')
+            if name not in restore_and_stamp:
+                restore_and_stamp[name] = _new_stream(doc, f'\nQ q /{name} Do Q\n'.encode('ascii'))
+            if (resources, name) not in resources_done:
+                _set_page_resource(doc, page_xref, 'XObject', name, f'{xref} 0 R')
+                if kind == 'xref':
+                    resources_done.add((resources, name))
+            doc.xref_set_key(
+                page_xref, 'Contents',
+                f'[{save_state} 0 R {_contents_refs(doc, page_xref)} {restore_and_stamp[name]} 0 R]',
+            )
+        doc.save(output_path, garbage=1, deflate=True)
+    return output_path
+
+
+def add_page_numbers(input_path, output_path):
+    """
+    Add 'Page X of Y', centred at the bottom of every page.
+    Saved with `save_edit`; `input_path` is left untouched.
+    """
+    with open_pdf(input_path) as doc:
+        total_pages = doc.page_count
+        for i, page in enumerate(doc):
+            budgets.check_time()
+            rect = page.rect
+            footer_rect = fitz.Rect(0, rect.height - 40, rect.width, rect.height - 5)
+            page.insert_textbox(footer_rect, f"Page {i + 1} of {total_pages}", fontsize=10, fontname="helv", align=1)
+        save_edit(doc, output_path)
+    return output_path
+
+
+SIGNATURE_SIZE = (150, 80)
+SIGNATURE_MARGIN = 50
+SIGNATURE_MAX_PLACEMENTS = 20
+
+
+def parse_placements(spec):
+    """
+    Signature boxes written as "x,y" or "x,y,width,height" and separated by
+    ';', in points from the top-left corner of the page as displayed. Width
+    and height default to SIGNATURE_SIZE. Raises ValueError.
+    """
+    placements = []
+    for raw in spec.split(';'):
+        text = raw.strip()
+        if not text:
+            continue
+        try:
+            values = [float(value) for value in text.split(',')]
+        except ValueError:
+            values = []
+        if len(values) == 2:
+            values += SIGNATURE_SIZE
+        if len(values) != 4 or not all(math.isfinite(v) for v in values) or values[2] <= 0 or values[3] <= 0:
+            raise ValueError(f"Invalid signature position: '{text}' (use x,y or x,y,width,height)")
+        placements.append(tuple(values))
+    if len(placements) > SIGNATURE_MAX_PLACEMENTS:
+        raise ValueError(f"At most {SIGNATURE_MAX_PLACEMENTS} signature positions per page.")
+    return placements
+
+
+def sign_pdf(input_path, output_path, signature, placements=None, selection=None):
+    """
+    Place the signature image (encoded bytes, e.g. a PNG) in each of
+    `placements` on every page of `selection`. By default it goes at the
+    bottom right of the last page.
+
+    The image is embedded by the first placement and every later one refers
+    to that xref, so signing all pages of a long contract adds a single image
+    object. Saved with `save_edit`; `input_path` is left untouched.
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(signature)) as image:
+        budgets.check_image(*image.size)
+    with open_pdf(input_path) as doc:
+        runs = selection.merged(doc.page_count) if selection else [range(doc.page_count - 1, doc.page_count)]
+        xref = 0
+        for run in runs:
+            for pno in run:
+                page = doc[pno]
+                boxes = placements
+                if not boxes:
+                    width, height = SIGNATURE_SIZE
+                    boxes = [(
+                        page.rect.width - width - SIGNATURE_MARGIN,
+                        page.rect.height - height - SIGNATURE_MARGIN,
+                        width, height,
+                    )]
+                for x, y, width, height in boxes:
+                    # Placements are given on the page as displayed; insert_image works unrotated
+                    rect = fitz.Rect(x, y, x + width, y + height) * page.derotation_matrix
+                    if xref:
+                        page.insert_image(rect, xref=xref, rotate=page.rotation)
+                    else:
+                        xref = page.insert_image(rect, stream=signature, rotate=page.rotation)
+        save_edit(doc, output_path)
+    return output_path
+
+
+def protect_pdf(input_path, output_path, password):
+    """Encrypt with AES-256 (R6), using `password` as both user and owner password."""
+    import pikepdf
+
+    with pikepdf.Pdf.open(input_path) as pdf:
+        pdf.save(output_path, encryption=pikepdf.Encryption(owner=password, user=password, R=6))
+    return output_path
+
+
+def unlock_pdf(input_path, output_path, password=''):
+    """Save a decrypted copy. A wrong or missing password raises ValueError."""
+    import pikepdf
+
+    try:
+        with pikepdf.Pdf.open(input_path, password=password) as pdf:
+            pdf.save(output_path)
+    except pikepdf.PasswordError:
+        raise ValueError("Incorrect password or password required.")
+    return output_path
+
+
+def extract_pages(input_path, output_path, selection):
+    """Keep only the pages in `selection`, in the order (and with the repeats) given."""
+    with open_pdf(input_path) as doc:
+        pages = list(selection.pages(doc.page_count))
+        if not pages:
+            raise ValueError("No valid pages selected.")
+        doc.select(pages)
+        doc.save(output_path)
+    return output_path
+
+
+# Compression level -> (target image DPI, JPEG quality)
+COMPRESS_PRESETS = {
+    'low': (200, 85),
+    'medium': (150, 75),
+    'high': (96, 60),
+}
+
+# Bi-level scans are already tiny in these encodings and JPEG would ruin them
+_SKIP_IMAGE_FILTERS = {'JBIG2Decode', 'CCITTFaxDecode'}
+
+
+def _recompress_images(doc, target_dpi, quality):
+    """
+    Downsample every embedded image shown above `target_dpi` and re-encode it
+    as JPEG, keeping the original whenever the new stream would not be smaller.
+    Returns the number of images replaced.
+    """
+    replaced = 0
+    seen = set()
+    for page in doc:
+        budgets.check_time()
+        for xref, smask, width, height, bpc, colorspace, _, _, image_filter, _ in page.get_images(full=True):
+            if xref in seen:
+                continue
+            seen.add(xref)
+            # Transparency (soft masks) and 1-bit images can't survive a JPEG round trip
+            if smask or bpc == 1 or image_filter in _SKIP_IMAGE_FILTERS:
+                continue
+
+            # The largest placement decides the resolution the image needs
+            rects = page.get_image_rects(xref)
+            shown_width = max((r.width for r in rects), default=0)
+            if shown_width <= 0:
+                continue
+            dpi = width / (shown_width / 72)
+            scale = min(1.0, target_dpi / dpi)
+
+            budgets.check_image(width, height)
+            try:
+                pix = fitz.Pixmap(doc, xref)
+                if pix.alpha:
+                    continue
+                if pix.colorspace is None or pix.colorspace.n not in (1, 3):
+                    pix = fitz.Pixmap(fitz.csRGB, pix)
+                if scale < 1.0:
+                    pix = fitz.Pixmap(pix, max(1, int(width * scale)), max(1, int(height * scale)), None)
+                data = pix.tobytes('jpeg', jpg_quality=quality)
+            except (RuntimeError, ValueError):
+                continue  # Exotic encodings MuPDF can't decode; leave as is
+
+            if len(data) >= len(doc.xref_stream_raw(xref)):
+                continue
+            page.replace_image(xref, stream=data)
+            replaced += 1
+    return replaced
+
+
+def compress_pdf(input_path, output_path, preset=None):
+    """
+    Rewrite `input_path` with deduplicated, deflated objects. With a preset
+    from COMPRESS_PRESETS the embedded images are downsampled and re-encoded
+    too. If the result is not smaller, the original is kept.
+    """
+    with open_pdf(input_path) as doc:
+        if preset:
+            _recompress_images(doc, *COMPRESS_PRESETS[preset])
+        # garbage=4 (deduplicate), deflate=True (compress streams)
+        doc.save(output_path, garbage=4, deflate=True)
+    if os.path.getsize(output_path) >= os.path.getsize(input_path):
+        shutil.copyfile(input_path, output_path)
+    return output_path
+
+
+def pdf_to_docx(input_path, output_path, progress=None, start=0, end=None, cpu_count=0):
+    """
+    Convert pages [start, end) (default: all) with pdf2docx. With `cpu_count`
+    > 1, pdf2docx parses the range in that many processes of its own.
+    pdf2docx has no page callback, so `progress` only fires at the end.
+    """
+    from pdf2docx import Converter
+
+    cv = Converter(input_path)
+    cwd = os.getcwd()
+    work_dir = None
+    try:
+        if cpu_count > 1:
+            # pdf2docx exchanges parsed pages through pages-<n>.json files in
+            # the working directory; give every conversion its own
+            work_dir = tempfile.mkdtemp(prefix='hewor_docx_')
+            os.chdir(work_dir)
+            cv.convert(output_path, start=start, end=end, multi_processing=True, cpu_count=cpu_count)
+        else:
+            cv.convert(output_path, start=start, end=end)
+        if progress:
+            progress(len(cv.fitz_doc))
+    except BaseException:
+        if cpu_count > 1:
+            # pdf2docx never terminates its worker pool when parsing fails or
+            # the job's deadline interrupts it
+            for child in multiprocessing.active_children():
+                child.kill()
+        raise
+    finally:
+        cv.close()
+        if work_dir:
+            os.chdir(cwd)
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return output_path
+
+
+def _check_render_pixels(doc, zoom):
+    budgets.check_render_pixels(sum(
+        math.ceil(rect.width * zoom) * math.ceil(rect.height * zoom)
+        for rect in map(doc.page_cropbox, range(doc.page_count))
+    ))
+
+
+def count_render_pages(input_path, dpi=144):
+    """
+    `count_pages`, also checking the budget for rendering every page at `dpi`
+    up front; then `render_page_images(..., checked=True)` can skip it.
+    """
+    with open_pdf(input_path) as doc:
+        _check_render_pixels(doc, dpi / 72)
+        return doc.page_count
+
+
+def render_page_images(input_path, start, stop, dpi=144, image_format='jpeg', quality=85, progress=None,
+                       checked=False):
+    """
+    Encode pages [start, stop) of `input_path` straight to image bytes ('jpeg'
+    or 'png'), without writing anything to disk. Each call opens its own
+    document, so ranges can render in parallel workers.
+    Returns the images in page order.
+    """
+    zoom = dpi / 72
+    matrix = fitz.Matrix(zoom, zoom)
+    images = []
+    with open_pdf(input_path) as doc:
+        if not checked:
+            # The whole document, so every range of a job reaches the same verdict
+            _check_render_pixels(doc, zoom)
+        for i in range(start, min(stop, doc.page_count)):
+            budgets.check_time()
+            pix = doc[i].get_pixmap(matrix=matrix)
+            if image_format == 'png':
+                images.append(pix.tobytes('png'))
+            else:
+                images.append(pix.tobytes('jpeg', jpg_quality=quality))
+            if progress:
+                progress(len(images))
+    return images
+
+
+def images_to_pptx(input_path, images, output_path):
+    """Build a deck with one full-bleed slide per page image (bytes) of `input_path`."""
+    from pptx import Presentation
+
+    prs = Presentation()
+    with open_pdf(input_path) as doc:
+        # Match the slide size to the first page (PyMuPDF points -> EMU)
+        if len(doc) > 0:
+            page = doc[0]
+            prs.slide_width = int(page.rect.width * 914400 / 72)
+            prs.slide_height = int(page.rect.height * 914400 / 72)
+
+    blank_slide_layout = prs.slide_layouts[6]
+    for image in images:
+        slide = prs.slides.add_slide(blank_slide_layout)
+        slide.shapes.add_picture(io.BytesIO(image), 0, 0, width=prs.slide_width, height=prs.slide_height)
+
+    prs.save(output_path)
+    return output_path
+
+
+def pdf_to_pptx(input_path, output_path, progress=None, dpi=144, image_format='jpeg', quality=80):
+    """
+    Single-process PDF to PowerPoint, used for batches where files already run
+    in parallel. `progress`, if given, is called with the number of pages done.
+    """
+    images = render_page_images(
+        input_path, 0, count_pages(input_path),
+        dpi=dpi, image_format=image_format, quality=quality, progress=progress,
+    )
+    return images_to_pptx(input_path, images, output_path)
+
+
+# Page size for image pages: pixels at this many per inch (what the tool has always used)
+IMAGE_PAGE_DPI = 100
+
+# EXIF orientation -> where a stored pixel (x, y) of a w x h image is displayed,
+# and the displayed size. Coordinates run right and down from the top left.
+_EXIF_ORIENTATIONS = {
+    1: (lambda x, y, w, h: (x, y), False),
+    2: (lambda x, y, w, h: (w - x, y), False),          # mirrored
+    3: (lambda x, y, w, h: (w - x, h - y), False),      # rotated 180
+    4: (lambda x, y, w, h: (x, h - y), False),          # flipped
+    5: (lambda x, y, w, h: (y, x), True),               # transposed
+    6: (lambda x, y, w, h: (h - y, x), True),           # rotated 90 clockwise
+    7: (lambda x, y, w, h: (h - y, w - x), True),       # transversed
+    8: (lambda x, y, w, h: (y, w - x), True),           # rotated 90 counter-clockwise
+}
+
+
+def _image_placement(orientation, width, height):
+    """
+    (page width, page height, cm operands) that draw a `width` x `height`
+    image the way its EXIF orientation says it should be displayed, without
+    touching its pixels.
+    """
+    transform, swaps = _EXIF_ORIENTATIONS.get(orientation, _EXIF_ORIENTATIONS[1])
+    page_w, page_h = (height, width) if swaps else (width, height)
+
+    def on_page(x, y):
+        dx, dy = transform(x, y, width, height)
+        return dx, page_h - dy  # PDF y runs up
+
+    # The image XObject's unit square: (0,0) is its bottom-left stored pixel,
+    # (1,0) its bottom-right and (0,1) its top-left
+    e, f = on_page(0, height)
+    bx, by = on_page(width, height)
+    tx, ty = on_page(0, 0)
+    return page_w, page_h, (bx - e, by - f, tx - e, ty - f, e, f)
+
+
+def images_to_pdf(image_paths, output_path):
+    """
+    One page per image, written incrementally so memory is bounded by the
+    largest single image. JPEGs are embedded byte for byte (DCTDecode), with
+    EXIF orientation applied through the page transform; other formats are
+    decoded one at a time and stored losslessly.
+    """
+    from PIL import Image, ImageOps
+
+    with open(output_path, 'wb') as fp:
+        writer = PdfWriter(fp)
+        for path in image_paths:
+            budgets.check_time()
+            with Image.open(path) as img:
+                budgets.check_image(*img.size)
+                # Header only: nothing is decoded for the JPEG path
+                orientation = img.getexif().get(0x0112, 1)
+                if img.format == 'JPEG' and img.mode in ('L', 'RGB', 'CMYK'):
+                    width, height = img.size
+                    colorspace = {'L': '/DeviceGray', 'RGB': '/DeviceRGB', 'CMYK': '/DeviceCMYK'}[img.mode]
+                    # Adobe CMYK JPEGs store inverted ink values
+                    decode = ' /Decode [1 0 1 0 1 0 1 0]' if img.mode == 'CMYK' and 'adobe' in img.info else ''
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                    image_ref = writer.add_stream(
+                        f'/Type /XObject /Subtype /Image /Width {width} /Height {height} '
+                        f'/ColorSpace {colorspace} /BitsPerComponent 8 /Filter /DCTDecode{decode}',
+                        data,
+                    )
+                else:
+                    img = ImageOps.exif_transpose(img)
+                    orientation = 1
+                    if img.mode in ('RGBA', 'LA', 'P', 'PA'):
+                        # Flatten transparency onto white rather than dropping it
+                        img = img.convert('RGBA')
+                        background = Image.new('RGB', img.size, (255, 255, 255))
+                        background.paste(img, mask=img.getchannel('A'))
+                        img = background
+                    elif img.mode not in ('L', 'RGB'):
+                        img = img.convert('RGB')
+                    width, height = img.size
+                    colorspace = '/DeviceGray' if img.mode == 'L' else '/DeviceRGB'
+                    image_ref = writer.add_stream(
+                        f'/Type /XObject /Subtype /Image /Width {width} /Height {height} '
+                        f'/ColorSpace {colorspace} /BitsPerComponent 8',
+                        img.tobytes(), compress=True,
+                    )
+                    del img
+
+            scale = 72 / IMAGE_PAGE_DPI
+            page_w, page_h, matrix = _image_placement(orientation, width * scale, height * scale)
+            writer.add_page(
+                page_w, page_h,
+                f"q {' '.join(pdf_number(v) for v in matrix)} cm /Im0 Do Q",
+                resources=f'/XObject << /Im0 {image_ref} 0 R >>',
+            )
+        writer.close()
+    return output_path
+
+
+HTML_PAPER = 'letter'
+HTML_MARGIN = 36
+HTML_MAX_PAGES = 2000
+
+
+def html_to_pdf(html, output_path, images=None):
+    """
+    Lay out `html` with MuPDF's HTML engine (fitz.Story), keeping headings,
+    lists, tables and images, and fill pages in a single pass straight into
+    the output file through `pdf_writer.PageSink`. `images` maps the names
+    used in <img src> to image bytes (see `url_fetch.fetch_images`).
+    """
+    archive = fitz.Archive()
+    for name, data in (images or {}).items():
+        archive.add(data, name)
+    story = fitz.Story(html=html, archive=archive)
+    mediabox = fitz.paper_rect(HTML_PAPER)
+    where = mediabox + (HTML_MARGIN, HTML_MARGIN, -HTML_MARGIN, -HTML_MARGIN)
+
+    with open(output_path, 'wb') as fp:
+        sink = PageSink(fp, mediabox)
+        more = True
+        while more:
+            if sink.pages == HTML_MAX_PAGES:
+                raise ValueError(f"The page is too long to convert (over {HTML_MAX_PAGES} PDF pages).")
+            budgets.check_pages(sink.pages + 1)
+            device = fitz.DeviceWrapper(sink.begin_page())
+            more, _ = story.place(where)
+            story.draw(device)
+            sink.end_page()
+        return sink.close()
+
+
+def docx_to_pdf(input_path, output_path):
+    """Word to PDF through python-docx and fitz.Story (see `core.docx_layout`)."""
+    from . import docx_layout
+    docx_layout.convert(input_path, output_path)
+    return output_path
+
+
+def pptx_to_pdf(input_path, output_path):
+    """PowerPoint to PDF, one page per slide (see `core.pptx_layout`)."""
+    from . import pptx_layout
+    pptx_layout.convert(input_path, output_path)
+    return output_path
+
+
+def pptx_text_to_pdf(input_path, output_path):
+    """PowerPoint to PDF with the slide text only, through a reportlab Platypus story."""
+    from pptx import Presentation
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer
+
+    styles = getSampleStyleSheet()
+    story = []
+    for i, slide in enumerate(Presentation(input_path).slides):
+        story.append(Paragraph(f"<b>Slide {i+1}</b>", styles['Heading2']))
+        story.append(Spacer(1, 12))
+        for shape in slide.shapes:
+            if getattr(shape, 'has_text_frame', False):
+                for paragraph in shape.text_frame.paragraphs:
+                    if paragraph.text.strip():
+                        story.append(Paragraph(paragraph.text.strip(), styles['BodyText']))
+                        story.append(Spacer(1, 6))
+        story.append(PageBreak())
+    SimpleDocTemplate(output_path, pagesize=letter).build(story)
+    return output_path
+
+
+def xlsx_to_pdf(input_path, output_path):
+    """Excel to PDF, streamed row by row (see `core.xlsx_layout`)."""
+    from . import xlsx_layout
+    xlsx_layout.convert(input_path, output_path)
+    return output_path
+
+
+def extract_tables(input_path, start, stop, progress=None):
+    """
+    PyMuPDF `find_tables` over pages [start, stop).
+    Returns (sheet name, rows) tuples in page order.
+    """
+    tables = []
+    with open_pdf(input_path) as doc:
+        for done, i in enumerate(range(start, min(stop, doc.page_count)), 1):
+            budgets.check_time()
+            for j, table in enumerate(doc[i].find_tables().tables):
+                rows = table.extract()
+                if rows:
+                    tables.append((f'Page_{i+1}_Table_{j+1}', rows))
+            if progress:
+                progress(done)
+    return tables
+
+
+def extract_tables_pdfplumber(input_path, start, stop, progress=None):
+    """Same contract as `extract_tables`, using pdfplumber (slower, the original engine)."""
+    import pdfplumber
+
+    tables = []
+    with pdfplumber.open(input_path) as pdf:
+        for done, i in enumerate(range(start, min(stop, len(pdf.pages))), 1):
+            budgets.check_time()
+            for j, rows in enumerate(pdf.pages[i].extract_tables()):
+                if rows:
+                    tables.append((f'Page_{i+1}_Table_{j+1}', rows))
+            if progress:
+                progress(done)
+    return tables
+
+
+TABLE_ENGINES = {
+    'pymupdf': extract_tables,
+    'pdfplumber': extract_tables_pdfplumber,
+}
+
+
+def write_tables_xlsx(tables, output_path):
+    """One sheet per table, streamed with openpyxl's write-only mode."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    if not tables:
+        # Create a dummy sheet if no tables found to avoid error
+        wb.create_sheet("Info").append(["No tables found in this PDF"])
+    for sheet_name, rows in tables:
+        ws = wb.create_sheet(sheet_name[:31])
+        for row in rows:
+            ws.append(row)
+    wb.save(output_path)
+    return output_path
+
+
+def pdf_to_xlsx(input_path, output_path, progress=None, engine='pymupdf'):
+    """
+    Single-process PDF to Excel, used for batches where files already run in
+    parallel. `progress`, if given, is called with the number of pages done.
+    """
+    tables = TABLE_ENGINES[engine](input_path, 0, count_pages(input_path), progress=progress)
+    return write_tables_xlsx(tables, output_path)
+
@@ -0,0 +1,185 @@
+"""
+Minimal incremental PDF writer.
+
+Objects are written to the output file as soon as they are added and only
+their byte offsets are kept, so a document of any length is assembled with
+memory bounded by its largest single object. The page tree, catalog and xref
+table are written by `close()`.
+
+`PageSink` puts MuPDF's drawing (its PDF device, and fitz.Story on top of it)
+in front of the writer, for converters that lay pages out with MuPDF.
+"""
+import hashlib
+import re
+import zlib
+
+import fitz  # PyMuPDF
+
+_REFERENCE = re.compile(r'(\d+) 0 R')
+_LENGTH = re.compile(r'/Length\s+\d+(\s+0\s+R)?')
+
+
+def pdf_name(value):
+    """`value` as a PDF name object (e.g. /DeviceRGB)."""
+    return '/' + ''.join(
+        c if c.isalnum() or c in '-_.' else f'#{ord(c):02X}' for c in value
+    )
+
+
+def pdf_number(value):
+    if isinstance(value, int):
+        return str(value)
+    return f'{value:.4f}'.rstrip('0').rstrip('.')
+
+
+class PdfWriter:
+    def __init__(self, fileobj):
+        self.fp = fileobj
+        self.offsets = {}
+        self.page_refs = []
+        self.next_number = 3  # 1: catalog, 2: page tree
+        self.copied = {}  # (fitz document, xref) -> object number, for objects copied in
+        self.images = {}  # (dictionary, digest of the data) -> object number
+        self.last_image = (None, None, None)  # (dictionary, data, object number) of the last one copied
+        self.fp.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def reserve(self):
+        number = self.next_number
+        self.next_number += 1
+        return number
+
+    def write_object(self, number, body):
+        """Write object `number` with `body` (bytes or str) now."""
+        if isinstance(body, str):
+            body = body.encode('latin-1')
+        self.offsets[number] = self.fp.tell()
+        self.fp.write(f'{number} 0 obj\n'.encode('ascii'))
+        self.fp.write(body)
+        self.fp.write(b'\nendobj\n')
+        return number
+
+    def add_object(self, body):
+        return self.write_object(self.reserve(), body)
+
+    def add_stream(self, dictionary, data, compress=False):
+        """
+        Stream object with `dictionary` (the entries between << >>, without
+        /Length) and raw `data`; `compress` deflates it and adds the filter.
+        """
+        if compress:
+            data = zlib.compress(data)
+            dictionary += ' /Filter /FlateDecode'
+        number = self.reserve()
+        self.offsets[number] = self.fp.tell()
+        self.fp.write(f'{number} 0 obj\n<< {dictionary} /Length {len(data)} >>\nstream\n'.encode('latin-1'))
+        self.fp.write(data)
+        self.fp.write(b'\nendstream\nendobj\n')
+        return number
+
+    def copy_object(self, doc, xref, release_images=False):
+        """
+        Write object `xref` of the fitz document `doc` out, with the objects it
+        refers to, and return its number here. Each object is written once;
+        an image, once per distinct stream whichever object it comes from, as
+        MuPDF adds an image again every time it is drawn. `release_images`
+        deletes images from `doc` once copied.
+        """
+        if (doc, xref) in self.copied:
+            return self.copied[doc, xref]
+        text = doc.xref_object(xref, compressed=True)
+        if not doc.xref_is_stream(xref):
+            number = self.copied[doc, xref] = self.add_object(self.copy_references(doc, text, release_images))
+            return number
+        dictionary = self.copy_references(doc, _LENGTH.sub('', text), release_images)[2:-2]
+        data = doc.xref_stream_raw(xref)
+        if '/Subtype/Image' not in dictionary:
+            number = self.copied[doc, xref] = self.add_stream(dictionary, data, compress='/Filter' not in dictionary)
+            return number
+        # Not remembered by xref: a released image's number is reused by the next one
+        if release_images:
+            fitz.mupdf.pdf_delete_object(fitz.mupdf.pdf_document_from_fz_document(doc.this), xref)
+        # The same logo or background on every page: comparing is cheaper than hashing
+        if self.last_image[:2] == (dictionary, data):
+            return self.last_image[2]
+        key = (dictionary, hashlib.sha1(data).digest())
+        if key not in self.images:
+            self.images[key] = self.add_stream(dictionary, data, compress='/Filter' not in dictionary)
+        self.last_image = (dictionary, data, self.images[key])
+        return self.images[key]
+
+    def copy_references(self, doc, text, release_images=False):
+        """`text` from `doc` with the objects it refers to copied and renumbered (see `copy_object`)."""
+        return _REFERENCE.sub(lambda match: f'{self.copy_object(doc, int(match.group(1)), release_images)} 0 R', text)
+
+    def add_page(self, width, height, content, resources=''):
+        """Append a page of `width` x `height` points drawn by `content` (operators)."""
+        content_ref = self.add_stream('', content.encode('latin-1'), compress=len(content) > 256)
+        page_ref = self.add_object(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {pdf_number(width)} {pdf_number(height)}] '
+            f'/Resources << {resources} >> /Contents {content_ref} 0 R >>'
+        )
+        self.page_refs.append(page_ref)
+        return page_ref
+
+    def close(self):
+        kids = ' '.join(f'{ref} 0 R' for ref in self.page_refs)
+        self.write_object(2, f'<< /Type /Pages /Kids [{kids}] /Count {len(self.page_refs)} >>')
+        self.write_object(1, '<< /Type /Catalog /Pages 2 0 R >>')
+
+        xref_offset = self.fp.tell()
+        size = self.next_number
+        lines = [f'xref\n0 {size}\n', '0000000000 65535 f \n']
+        for number in range(1, size):
+            offset = self.offsets.get(number)
+            lines.append(f'{offset:010d} 00000 n \n' if offset is not None else '0000000000 65535 f \n')
+        lines.append(f'trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n')
+        self.fp.write(''.join(lines).encode('ascii'))
+
+
+class PageSink:
+    """
+    MuPDF's PDF writers (fitz.DocumentWriter included) keep the whole document
+    in memory until it is saved, and embed an image again every time it is
+    drawn. Here each page is drawn through MuPDF's PDF device into a scratch
+    document instead, and streamed out through a `PdfWriter` as soon as it is
+    done, with the objects it uses. Fonts stay in the scratch document, where
+    the device shares them between pages, and are written once; images are
+    written once per distinct stream and then dropped from the scratch
+    document, so memory does not grow with the length of the document.
+
+    `begin_page()` returns the page's MuPDF device; wrap it in
+    fitz.DeviceWrapper to draw a fitz.Story on it.
+    """
+
+    def __init__(self, fp, mediabox):
+        self.writer = PdfWriter(fp)
+        self.mediabox = mediabox
+        self.scratch = fitz.open()
+        self.pdf = fitz.mupdf.pdf_document_from_fz_document(self.scratch.this)
+        self.device = self.resources = self.contents = None
+
+    @property
+    def pages(self):
+        return len(self.writer.page_refs)
+
+    def begin_page(self):
+        m = fitz.mupdf
+        self.device, self.resources, self.contents = m.pdf_page_write(self.pdf, m.FzRect(*self.mediabox))
+        return self.device
+
+    def end_page(self):
+        m = fitz.mupdf
+        m.fz_close_device(self.device)
+        # The resources dictionary is a direct object; file it to read it back
+        xref = m.pdf_to_num(m.pdf_add_object(self.pdf, self.resources))
+        resources = self.writer.copy_references(self.scratch, self.scratch.xref_object(xref, compressed=True), release_images=True)
+        m.pdf_delete_object(self.pdf, xref)
+        content = bytes(m.fz_buffer_extract(self.contents)).decode('latin-1')
+        self.writer.add_page(self.mediabox.width, self.mediabox.height, content, resources[2:-2])
+        self.device = self.resources = self.contents = None
+
+    def close(self):
+        """Finish the file; returns the page count."""
+        self.writer.close()
+        self.scratch.close()
+        return self.pages
@@ -0,0 +1,983 @@
+"""
+PowerPoint (PPTX) to PDF without an office suite.
+
+Every visible slide becomes one PDF page at the presentation's slide size, and
+its shapes are drawn in z-order at their EMU positions through MuPDF's PDF
+device:
+
+- rectangles, rounded rectangles, ellipses and lines with their solid fill and
+  outline (other preset geometries are drawn as their bounding rectangle);
+- pictures, with their cropping; the embedded image bytes are handed to MuPDF
+  as they are, so JPEGs go into the PDF without being re-encoded;
+- text frames and tables, with the run, paragraph and bullet formatting
+  inherited from the layout, master and theme;
+- group shapes, through their child transform.
+
+Text is broken into lines here, measuring with cached glyph advances, and
+drawn as MuPDF text in the base-14 family nearest the deck's typeface, with
+MuPDF's fallback fonts for characters those lack. There is no shaping, so
+right-to-left and complex scripts come out in logical order.
+
+Each page is written out through `core.pdf_writer.PageSink` as soon as its
+slide is drawn, with every distinct image and font stored once, so the output
+never builds up in memory. Only solid slide backgrounds are drawn, not the artwork
+on slide layouts and masters.
+"""
+import colorsys
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+import fitz  # PyMuPDF
+
+from . import budgets
+from .pdf_writer import PageSink
+
+EMU_PER_POINT = 12700
+MAX_SLIDES = 2000
+DEFAULT_FONT_SIZE = 18
+KAPPA = 0.5523  # bezier control distance for a quarter ellipse
+
+_LINE_WIDTHS = {1: 0.5, 2: 1.0, 3: 1.5}  # the theme's line styles, by style index
+_PRESET_COLORS = {'black': '000000', 'white': 'FFFFFF', 'red': 'FF0000', 'green': '008000', 'blue': '0000FF',
+                  'yellow': 'FFFF00', 'gray': '808080', 'grey': '808080'}
+_TITLE_TYPES = ('title', 'ctrTitle')
+_BODY_TYPES = ('body', 'obj', 'subTitle', None)
+_BASE14 = {  # family -> (regular, bold, italic, bold italic)
+    'sans': ('helv', 'hebo', 'heit', 'hebi'),
+    'serif': ('tiro', 'tibo', 'tiit', 'tibi'),
+    'mono': ('cour', 'cobo', 'coit', 'cobi'),
+}
+_WORDS = re.compile(r'[^ ]+ *| +')
+_RUN_ATTRIBUTES = frozenset(('b', 'i', 'u', 'strike', 'baseline', 'sz'))
+_PARAGRAPH_ATTRIBUTES = frozenset(('algn', 'marL', 'indent'))
+_TEXT_INSETS = (91440, 45720, 91440, 45720)  # EMU, left, top, right, bottom
+_CELL_MARGINS = (91440 / EMU_PER_POINT, 91440 / EMU_PER_POINT, 45720 / EMU_PER_POINT, 45720 / EMU_PER_POINT)
+
+
+@lru_cache(maxsize=None)
+def _qn(tag):
+    from pptx.oxml.ns import qn
+    return qn(tag)
+
+
+def _child(element, *tags):
+    """
+    The element at the end of the path of child `tags` from `element`, or
+    None. find() costs a few times more on python-pptx's element classes.
+    """
+    for tag in tags:
+        element = next(element.iterchildren(_qn(tag)), None)
+        if element is None:
+            return None
+    return element
+
+
+def _hex_rgb(value):
+    return tuple(int(value[i:i + 2], 16) / 255 for i in (0, 2, 4))
+
+
+def _family(typeface):
+    name = (typeface or '').lower()
+    if any(word in name for word in ('courier', 'consolas', 'mono')):
+        return 'mono'
+    if any(word in name for word in ('times', 'georgia', 'garamond', 'cambria', 'serif', 'book')):
+        return 'sans' if 'sans' in name else 'serif'
+    return 'sans'
+
+
+class _Theme:
+    """Colours and fonts of a slide master's theme."""
+
+    def __init__(self, master):
+        from lxml import etree
+        from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+
+        self.colors, self.fonts = {}, {}
+        try:
+            root = etree.fromstring(master.part.part_related_by(RT.THEME).blob)
+        except (KeyError, etree.XMLSyntaxError):
+            root = None
+        if root is not None:
+            scheme = root.find('.//' + _qn('a:clrScheme'))
+            for slot in (scheme if scheme is not None else []):
+                for child in slot:
+                    value = child.get('lastClr') if child.tag == _qn('a:sysClr') else child.get('val')
+                    if value:
+                        self.colors[etree.QName(slot).localname] = value
+            for kind, key in (('majorFont', 'mj'), ('minorFont', 'mn')):
+                latin = root.find(f'.//{_qn("a:" + kind)}/{_qn("a:latin")}')
+                if latin is not None:
+                    self.fonts[f'+{key}-lt'] = latin.get('typeface')
+        clr_map = _child(master._element, 'p:clrMap')
+        self.mapping = dict(clr_map.attrib) if clr_map is not None else {}
+
+    def color(self, element):
+        """RGB floats for a colour element (srgbClr, schemeClr, ...), or None."""
+        tag = element.tag.split('}')[-1]
+        value = None
+        if tag == 'srgbClr':
+            value = element.get('val')
+        elif tag == 'sysClr':
+            value = element.get('lastClr')
+        elif tag == 'prstClr':
+            value = _PRESET_COLORS.get(element.get('val'))
+        elif tag == 'schemeClr':
+            name = element.get('val')
+            value = self.colors.get(self.mapping.get(name, name))
+        try:
+            rgb = _hex_rgb(value)
+        except (TypeError, ValueError):
+            return None
+        return self.adjust(rgb, element)
+
+    def adjust(self, rgb, element):
+        for child in element:
+            name = child.tag.split('}')[-1]
+            amount = int(child.get('val', '100000')) / 100000
+            if name in ('lumMod', 'lumOff'):
+                h, l, s = colorsys.rgb_to_hls(*rgb)
+                l = l * amount if name == 'lumMod' else l + amount
+                rgb = colorsys.hls_to_rgb(h, min(max(l, 0), 1), s)
+            elif name == 'shade':
+                rgb = tuple(c * amount for c in rgb)
+            elif name == 'tint':
+                rgb = tuple(1 - (1 - c) * amount for c in rgb)
+        return rgb
+
+    def fill(self, container):
+        """
+        The fill colour found in `container` (spPr, tcPr, bgPr, ...): RGB
+        floats, False for an explicit noFill, or None when none is set.
+        """
+        if container is None:
+            return None
+        for child in container:
+            tag = child.tag.split('}')[-1]
+            if tag == 'noFill':
+                return False
+            if tag == 'solidFill' and len(child):
+                return self.color(child[0]) or False
+            if tag == 'gradFill':
+                stop = child.find('.//' + _qn('a:gs'))
+                return (self.color(stop[0]) or False) if stop is not None and len(stop) else False
+            if tag in ('blipFill', 'pattFill', 'grpFill'):
+                return False
+        return None
+
+    def style_color(self, sp, ref):
+        """The colour of one of the shape's style references (fillRef, lnRef, fontRef)."""
+        element = _child(sp, 'p:style', 'a:' + ref)
+        if element is None or (ref != 'fontRef' and element.get('idx') == '0') or not len(element):
+            return None
+        return self.color(element[0])
+
+
+class _Path:
+    """A mupdf path in page coordinates, filled and stroked on the device."""
+
+    def __init__(self):
+        self.path = fitz.mupdf.FzPath()
+
+    @classmethod
+    def geometry(cls, preset, rect, adjust=None):
+        self = cls()
+        path, m = self.path, fitz.mupdf
+        x0, y0, x1, y1 = rect
+        if preset == 'ellipse':
+            cx, cy, rx, ry = (x0 + x1) / 2, (y0 + y1) / 2, (x1 - x0) / 2, (y1 - y0) / 2
+            m.fz_moveto(path, cx + rx, cy)
+            m.fz_curveto(path, cx + rx, cy + KAPPA * ry, cx + KAPPA * rx, cy + ry, cx, cy + ry)
+            m.fz_curveto(path, cx - KAPPA * rx, cy + ry, cx - rx, cy + KAPPA * ry, cx - rx, cy)
+            m.fz_curveto(path, cx - rx, cy - KAPPA * ry, cx - KAPPA * rx, cy - ry, cx, cy - ry)
+            m.fz_curveto(path, cx + KAPPA * rx, cy - ry, cx + rx, cy - KAPPA * ry, cx + rx, cy)
+            m.fz_closepath(path)
+        elif preset == 'roundRect':
+            r = min(x1 - x0, y1 - y0) * (adjust if adjust is not None else 0.16667)
+            k = r * (1 - KAPPA)
+            m.fz_moveto(path, x0 + r, y0)
+            m.fz_lineto(path, x1 - r, y0)
+            m.fz_curveto(path, x1 - k, y0, x1, y0 + k, x1, y0 + r)
+            m.fz_lineto(path, x1, y1 - r)
+            m.fz_curveto(path, x1, y1 - k, x1 - k, y1, x1 - r, y1)
+            m.fz_lineto(path, x0 + r, y1)
+            m.fz_curveto(path, x0 + k, y1, x0, y1 - k, x0, y1 - r)
+            m.fz_lineto(path, x0, y0 + r)
+            m.fz_curveto(path, x0, y0 + k, x0 + k, y0, x0 + r, y0)
+            m.fz_closepath(path)
+        elif preset == 'line':
+            m.fz_moveto(path, x0, y0)
+            m.fz_lineto(path, x1, y1)
+        else:
+            m.fz_rectto(path, x0, y0, x1, y1)
+        return self
+
+    def segment(self, x0, y0, x1, y1):
+        fitz.mupdf.fz_moveto(self.path, x0, y0)
+        fitz.mupdf.fz_lineto(self.path, x1, y1)
+
+    def rect(self, x0, y0, x1, y1):
+        fitz.mupdf.fz_rectto(self.path, x0, y0, x1, y1)
+
+    def draw(self, device, ctm, fill=None, line=None, width=1.0):
+        m = fitz.mupdf
+        color = m.new_floats(3)
+        params = m.FzColorParams(m.fz_default_color_params)
+        try:
+            if fill:
+                for index, value in enumerate(fill):
+                    m.floats_setitem(color, index, value)
+                m.fz_fill_path(device, self.path, 0, _fz_matrix(ctm), m.fz_device_rgb(), color, 1.0, params)
+            if line:
+                for index, value in enumerate(line):
+                    m.floats_setitem(color, index, value)
+                stroke = m.fz_new_stroke_state()
+                stroke.m_internal.linewidth = width
+                m.fz_stroke_path(device, self.path, stroke, _fz_matrix(ctm), m.fz_device_rgb(), color, 1.0, params)
+        finally:
+            m.delete_floats(color)
+
+
+class _Font:
+    """A base-14 font and its glyph advances (per point of size), measured once per character."""
+
+    def __init__(self, name):
+        self.font = fitz.Font(name)
+        self.advances = {}
+
+    def width(self, text, size):
+        advances, total = self.advances, 0
+        for char in text:
+            advance = advances.get(char)
+            if advance is None:
+                # Characters the font lacks are measured in the fallback font MuPDF draws them with
+                m = fitz.mupdf
+                glyph, font = m.fz_encode_character_with_fallback(self.font.this, ord(char), 0, 0)
+                advance = advances[char] = m.fz_advance_glyph(font, glyph, 0)
+            total += advance
+        return total * size
+
+
+_fonts = {}  # base-14 name -> _Font
+
+
+def _font(family, bold, italic):
+    name = _BASE14[family][bold + 2 * italic]
+    if name not in _fonts:
+        _fonts[name] = _Font(name)
+    return _fonts[name]
+
+
+_Style = namedtuple('_Style', 'font size color underline strike rise')
+
+
+class _TextBlock:
+    """
+    Paragraphs broken into lines for one width, ready to draw. A paragraph is
+    a dict from `_Renderer.paragraph`: its (text, _Style) pieces, where
+    ('\\n', None) is a line break, plus its bullet, alignment, indents and
+    spacing. Lines break at spaces; a word wider than the whole line is
+    broken between characters.
+    """
+
+    def __init__(self, paragraphs, width):
+        self.width = width
+        self.lines = []  # (baseline, x shift, [(x, text, style), ...]) from the block's top left
+        y = 0
+        for paragraph in paragraphs:
+            y = self.paragraph(paragraph, y + paragraph['before']) + paragraph['after']
+        self.height = y
+
+    def paragraph(self, paragraph, y):
+        """Break `paragraph` into lines starting at `y`; returns where it ends."""
+        left = paragraph['left']
+        x = left + paragraph['indent']
+        line, lines, breakable = [], [], False
+        if paragraph['bullet']:
+            text, style = paragraph['bullet']
+            line.append((x, text, style))
+            x = max(left, x + style.font.width(text + ' ', style.size))
+
+        for text, style in paragraph['pieces']:
+            if style is None:  # line break
+                lines.append(line)
+                line, x, breakable = [], left, False
+                continue
+            space = style.font.width(' ', style.size)
+            for word in _WORDS.findall(text):
+                # Each word is measured once, without its trailing spaces
+                stripped = word.rstrip(' ')
+                measured = style.font.width(stripped, style.size)
+                parts = [(word, measured, len(word) - len(stripped))]
+                if measured > self.width - left:
+                    parts = [
+                        (part, style.font.width(part.rstrip(' '), style.size), len(part) - len(part.rstrip(' ')))
+                        for part in self.split(word, style, self.width - left)
+                    ]
+                for part, measured, spaces in parts:
+                    if breakable and x + measured > self.width:
+                        lines.append(line)
+                        line, x = [], left
+                        if part.isspace():
+                            continue  # spaces at a break vanish
+                    if line and line[-1][2] is style and not part.isspace() and line[-1][1].endswith(' '):
+                        # Words of one run on one line are drawn with a single string
+                        line[-1] = (line[-1][0], line[-1][1] + part, style)
+                    else:
+                        line.append((x, part, style))
+                    x += measured + spaces * space
+                    breakable = spaces > 0 or len(parts) > 1
+        lines.append(line)
+
+        for pieces in lines:
+            sizes = [style.size + style.rise for _, text, style in pieces if not text.isspace()]
+            size = max(sizes) if sizes else paragraph['size']
+            kind, value = paragraph['spacing']
+            height = value if kind == 'pts' else 1.2 * size * value
+            shift = 0
+            if pieces and paragraph['align'] in ('ctr', 'r'):
+                x, text, style = max(pieces, key=lambda piece: piece[0])
+                right = x + style.font.width(text.rstrip(' '), style.size)
+                shift = (self.width - right) / (2 if paragraph['align'] == 'ctr' else 1)
+            self.lines.append((y + height - 0.25 * size, shift, pieces))
+            y += height
+        return y
+
+    def split(self, word, style, width):
+        """`word` in pieces no wider than `width`, each at least one character."""
+        parts, start, used = [], 0, 0
+        for index, char in enumerate(word):
+            advance = style.font.width(char, style.size)
+            if used + advance > width and index > start:
+                parts.append(word[start:index])
+                start, used = index, 0
+            used += advance
+        parts.append(word[start:])
+        return parts
+
+
+
+class _Glyphs:
+    """
+    The text of one or more `_TextBlock`s, gathered so that each colour is
+    drawn with a single call (a table's cells are gathered together).
+    """
+
+    def __init__(self):
+        self.texts = {}  # colour -> fz_text holding every glyph in that colour
+        self.rules = {}  # (colour, thickness) -> _Path of underlines and strike-throughs
+
+    def add(self, block, x, y):
+        """Add `block`'s lines with its top left at (x, y)."""
+        m = fitz.mupdf
+        texts, rules = self.texts, self.rules
+        for baseline, shift, pieces in block.lines:
+            for left, text, style in pieces:
+                left += x + shift
+                bottom = y + baseline - style.rise
+                if not text.isspace():
+                    if style.color not in texts:
+                        texts[style.color] = m.fz_new_text()
+                    m.fz_show_string(
+                        texts[style.color], style.font.font.this,
+                        m.FzMatrix(style.size, 0, 0, -style.size, left, bottom),
+                        text, 0, 0, m.FZ_BIDI_LTR, m.FZ_LANG_UNSET,
+                    )
+                for flag, drop in ((style.underline, 0.12), (style.strike, -0.3)):
+                    if flag:
+                        key = (style.color, style.size / 18)
+                        rules.setdefault(key, _Path()).segment(
+                            left, bottom + drop * style.size, left + style.font.width(text, style.size), bottom + drop * style.size)
+
+    def draw(self, device, ctm):
+        """Draw everything added, through `ctm`."""
+        m = fitz.mupdf
+        params = m.FzColorParams(m.fz_default_color_params)
+        for color, text in self.texts.items():
+            m.fz_fill_text(device, text, _fz_matrix(ctm), m.fz_device_rgb(), color, 1.0, params)
+        for (color, thickness), path in self.rules.items():
+            path.draw(device, ctm, line=color, width=thickness)
+
+
+def _members(shapes):
+    """
+    The shapes in `shapes` (a slide's or group's python-pptx collection), made
+    from their elements' tags. python-pptx's own iteration looks each one up
+    as a placeholder first; `_Renderer.bases` does that for placeholders only.
+    """
+    from pptx.shapes.autoshape import Shape
+    from pptx.shapes.connector import Connector
+    from pptx.shapes.graphfrm import GraphicFrame
+    from pptx.shapes.group import GroupShape
+    from pptx.shapes.picture import Picture
+
+    classes = {
+        _qn('p:sp'): Shape, _qn('p:pic'): Picture, _qn('p:cxnSp'): Connector,
+        _qn('p:grpSp'): GroupShape, _qn('p:graphicFrame'): GraphicFrame,
+    }
+    for element in shapes._spTree.iter_shape_elms():
+        cls = classes.get(element.tag)
+        if cls is not None:
+            yield cls(element, shapes)
+
+
+def _fz_matrix(matrix):
+    return fitz.mupdf.FzMatrix(*tuple(matrix))
+
+
+def _placeholder(element):
+    """The shape element's p:ph, or None if it isn't a placeholder (python-pptx finds it by XPath)."""
+    properties = next(element.iterchildren(), None)  # nvSpPr, nvPicPr, ...
+    return _child(properties, 'p:nvPr', 'p:ph') if properties is not None else None
+
+
+def _xfrm(element):
+    """A shape element's own transform (python-pptx looks it up through several properties)."""
+    xfrm = _child(element, 'p:spPr', 'a:xfrm')
+    if xfrm is None:
+        xfrm = _child(element, 'p:xfrm')  # graphic frames (tables)
+    return xfrm
+
+
+def _extent(element):
+    """(x, y, cx, cy) in EMU from a shape element's own transform, or None if it has none."""
+    xfrm = _xfrm(element)
+    if xfrm is None:
+        return None
+    off, ext = _child(xfrm, 'a:off'), _child(xfrm, 'a:ext')
+    if off is None or ext is None:
+        return None
+    return int(off.get('x')), int(off.get('y')), int(ext.get('cx')), int(ext.get('cy'))
+
+
+def _rotation(rect, degrees):
+    """The matrix turning `rect` clockwise by `degrees` about its centre."""
+    if not degrees:
+        return fitz.Identity
+    center = (rect.tl + rect.br) / 2
+    return fitz.Matrix(1, 0, 0, 1, -center.x, -center.y) * fitz.Matrix(degrees) * fitz.Matrix(1, 0, 0, 1, center.x, center.y)
+
+
+class _Renderer:
+    def __init__(self, presentation):
+        self.presentation = presentation
+        self.themes = {}  # slide master part name -> _Theme
+        self.placeholders = {}  # (layout part name, idx, type) -> the layout and master placeholder elements
+        self.levels = {}  # (list-style elements, level) -> their properties for that level, and its run defaults
+        self.styles = {}  # inherited run formatting -> _Style, for runs with none of their own
+        self.formats = {}  # inherited paragraph formatting -> its resolved form, for paragraphs with none of their own
+        self.default_style = _child(presentation._element, 'p:defaultTextStyle')
+
+    def bases(self, shape, layout):
+        """
+        The layout and master placeholder elements a slide placeholder
+        inherits position and text formatting from, nearest first. python-pptx
+        looks these up by scanning the shape trees on every access.
+        """
+        from pptx.shapes.shapetree import SlideShapeFactory
+
+        ph = _placeholder(shape._element)
+        if ph is None:
+            return []
+        key = (layout, ph.get('idx', '0'), ph.get('type', 'obj'))
+        if key not in self.placeholders:
+            found, base = [], SlideShapeFactory(shape._element, shape._parent)
+            while hasattr(base, '_base_placeholder'):
+                base = base._base_placeholder
+                if base is None:
+                    break
+                found.append(base._element)
+            self.placeholders[key] = found
+        return self.placeholders[key]
+
+    def theme(self, master):
+        key = master.part.partname
+        if key not in self.themes:
+            self.themes[key] = _Theme(master)
+        return self.themes[key]
+
+    # --- slides ---
+
+    def slide(self, slide, device, mediabox):
+        layout = slide.slide_layout
+        master = layout.slide_master
+        theme = self.theme(master)
+        for owner in (slide, layout, master):
+            background = _child(owner._element, 'p:cSld', 'p:bg')
+            if background is None:
+                continue
+            properties = _child(background, 'p:bgPr')
+            if properties is not None:
+                color = theme.fill(properties)
+            else:
+                reference = _child(background, 'p:bgRef')
+                color = theme.color(reference[0]) if reference is not None and len(reference) else None
+            if color:
+                _Path.geometry('rect', mediabox).draw(device, fitz.Identity, fill=color)
+            break
+
+        context = (theme, master, mediabox, layout.part.partname)
+        base = fitz.Matrix(1 / EMU_PER_POINT, 0, 0, 1 / EMU_PER_POINT, 0, 0)
+        for shape in _members(slide.shapes):
+            self.shape(shape, device, base, context)
+
+    def shape(self, shape, device, matrix, context):
+        from pptx.shapes.connector import Connector
+        from pptx.shapes.group import GroupShape
+        from pptx.shapes.picture import Picture
+
+        if isinstance(shape, GroupShape):
+            xfrm = _child(shape._element, 'p:grpSpPr', 'a:xfrm')
+            child = matrix
+            if xfrm is not None:
+                off, ext = _child(xfrm, 'a:off'), _child(xfrm, 'a:ext')
+                ch_off, ch_ext = _child(xfrm, 'a:chOff'), _child(xfrm, 'a:chExt')
+                if None not in (off, ext, ch_off, ch_ext):
+                    sx = int(ext.get('cx')) / max(int(ch_ext.get('cx')), 1)
+                    sy = int(ext.get('cy')) / max(int(ch_ext.get('cy')), 1)
+                    child = fitz.Matrix(
+                        sx, 0, 0, sy,
+                        int(off.get('x')) - int(ch_off.get('x')) * sx,
+                        int(off.get('y')) - int(ch_off.get('y')) * sy,
+                    ) * matrix
+            for member in _members(shape.shapes):
+                self.shape(member, device, child, context)
+            return
+
+        theme, master, mediabox, layout = context
+        if isinstance(shape, Connector):
+            start = fitz.Point(shape.begin_x, shape.begin_y) * matrix
+            end = fitz.Point(shape.end_x, shape.end_y) * matrix
+            line, width = self.outline(shape._element, theme)
+            if line:
+                _Path.geometry('line', (start.x, start.y, end.x, end.y)).draw(device, fitz.Identity, line=line, width=width)
+            return
+
+        bases = self.bases(shape, layout)
+        for element in [shape._element] + bases:
+            extent = _extent(element)
+            if extent is not None:
+                break
+        else:
+            return
+        x, y, cx, cy = extent
+        rect = fitz.Rect(x, y, x + cx, y + cy) * matrix
+        xfrm = _xfrm(shape._element)
+        ctm = _rotation(rect, int(xfrm.get('rot', '0')) / 60000 if xfrm is not None else 0)
+
+        if isinstance(shape, Picture):
+            self.picture(shape, device, rect, ctm)
+        elif getattr(shape, 'has_table', False):
+            self.table(shape, device, rect, theme, mediabox)
+        elif shape._element.tag == _qn('p:sp'):
+            sp = shape._element
+            properties = _child(sp, 'p:spPr')
+            fill = theme.fill(properties)
+            if fill is None:
+                fill = theme.style_color(sp, 'fillRef')
+            line, width = self.outline(sp, theme)
+            if fill or line:
+                geometry = _child(properties, 'a:prstGeom') if properties is not None else None
+                preset = geometry.get('prst') if geometry is not None else 'rect'
+                adjust = None
+                guide = _child(geometry, 'a:avLst', 'a:gd') if geometry is not None else None
+                if guide is not None and guide.get('fmla', '').startswith('val '):
+                    adjust = int(guide.get('fmla')[4:]) / 100000
+                _Path.geometry(preset, rect, adjust).draw(device, ctm, fill=fill or None, line=line, width=width)
+            body = _child(sp, 'p:txBody')
+            if body is not None and any((t.text or '').strip() for t in body.iter(_qn('a:t'))):
+                self.text_frame(shape, bases, device, rect, ctm, context)
+
+    def outline(self, sp, theme):
+        """(colour, width in points) of the shape's outline; colour is None for no outline."""
+        properties = _child(sp, 'p:spPr')
+        ln = _child(properties, 'a:ln') if properties is not None else None
+        width = int(ln.get('w')) / EMU_PER_POINT if ln is not None and ln.get('w') else None
+        color = theme.fill(ln)
+        if color is None:
+            reference = _child(sp, 'p:style', 'a:lnRef')
+            color = theme.style_color(sp, 'lnRef')
+            if width is None and reference is not None:
+                width = _LINE_WIDTHS.get(int(reference.get('idx', '0')), 1.0)
+        return color or None, width or 0.75
+
+    def picture(self, shape, device, rect, ctm):
+        m = fitz.mupdf
+        try:
+            blob = shape.image.blob
+            image = m.fz_new_image_from_buffer(m.fz_new_buffer_from_copied_data(blob))
+        except Exception:
+            return  # linked, missing or unsupported (EMF, WMF) images are left out
+        left, top, right, bottom = shape.crop_left, shape.crop_top, shape.crop_right, shape.crop_bottom
+        clip = bool(left or top or right or bottom)
+        full = rect
+        if clip and 1 - left - right > 0 and 1 - top - bottom > 0:
+            w, h = rect.width / (1 - left - right), rect.height / (1 - top - bottom)
+            full = fitz.Rect(rect.x0 - left * w, rect.y0 - top * h, rect.x0 - left * w + w, rect.y0 - top * h + h)
+        if clip:
+            box = _Path.geometry('rect', rect)
+            m.fz_clip_path(device, box.path, 0, _fz_matrix(ctm), m.FzRect(m.FzRect.Fixed_INFINITE))
+        # The image's unit square maps onto `full`
+        placement = fitz.Matrix(full.width, 0, 0, full.height, full.x0, full.y0) * ctm
+        m.fz_fill_image(device, image, _fz_matrix(placement), 1.0, m.FzColorParams(m.fz_default_color_params))
+        if clip:
+            m.fz_pop_clip(device)
+
+    # --- text ---
+
+    def level_styles(self, shape, bases, master):
+        """The list-style elements (lstStyle, txStyles, ...) that `shape`'s text inherits from, nearest first."""
+        sources = []
+        for element in [shape._element] + bases:
+            body = _child(element, 'p:txBody')
+            if body is not None:
+                sources.append(_child(body, 'a:lstStyle'))
+        kind = None
+        ph = _placeholder(shape._element)
+        if ph is not None:
+            kind = ph.get('type', 'obj')
+            styles = _child(master._element, 'p:txStyles')
+            if styles is not None:
+                name = 'p:titleStyle' if kind in _TITLE_TYPES else 'p:bodyStyle' if kind in _BODY_TYPES else 'p:otherStyle'
+                sources.append(_child(styles, name))
+        sources.append(self.default_style)
+        return [source for source in sources if source is not None], kind
+
+    def text_frame(self, shape, bases, device, rect, ctm, context):
+        theme, master, mediabox, layout = context
+        sources, kind = self.level_styles(shape, bases, master)
+        body = _child(shape._element, 'p:txBody')
+        body_pr = _child(body, 'a:bodyPr')
+        default_color = theme.style_color(shape._element, 'fontRef')
+
+        scale, reduction = 1.0, 0.0
+        autofit = _child(body_pr, 'a:normAutofit') if body_pr is not None else None
+        if autofit is not None:
+            scale = int(autofit.get('fontScale', '100000')) / 100000
+            reduction = int(autofit.get('lnSpcReduction', '0')) / 100000
+
+        anchor = body_pr.get('anchor') if body_pr is not None else None
+        insets = (body_pr.lIns, body_pr.tIns, body_pr.rIns, body_pr.bIns) if body_pr is not None else _TEXT_INSETS
+        for base in bases:
+            if anchor is not None:
+                break
+            base_body = _child(base, 'p:txBody', 'a:bodyPr')
+            if base_body is not None:
+                anchor = base_body.get('anchor')
+        if anchor is None and kind in _TITLE_TYPES:
+            anchor = 'ctr'
+        inner = fitz.Rect(
+            rect.x0 + insets[0] / EMU_PER_POINT, rect.y0 + insets[1] / EMU_PER_POINT,
+            rect.x1 - insets[2] / EMU_PER_POINT, rect.y1 - insets[3] / EMU_PER_POINT,
+        )
+        if inner.width <= 0:
+            return
+        wrap = body_pr is None or body_pr.get('wrap') != 'none'
+        paragraphs = self.paragraphs(body, sources, theme, default_color, scale, reduction)
+        block = _TextBlock(paragraphs, inner.width if wrap else float('inf'))
+        # Text that doesn't fit overflows downwards, as in PowerPoint
+        spare = max(inner.height - block.height, 0)
+        offset = spare / 2 if anchor == 'ctr' else spare if anchor == 'b' else 0
+        glyphs = _Glyphs()
+        glyphs.add(block, inner.x0, inner.y0 + offset)
+        glyphs.draw(device, ctm)
+
+    def paragraphs(self, body, sources, theme, default_color, scale, reduction=0.0, bold=False):
+        """The paragraphs of a txBody element, for `_TextBlock`."""
+        paragraphs, numbers = [], {}
+        for p in body.iterchildren(_qn('a:p')):
+            paragraphs.append(self.paragraph(p, sources, theme, default_color, scale, reduction, bold, numbers))
+        return paragraphs
+
+    def lookup(self, candidates, tag, attribute=None):
+        """The first `tag` element (or its `attribute`) among the level properties `candidates`."""
+        for properties in candidates:
+            if properties is None:
+                continue
+            element = _child(properties, tag) if tag else properties
+            if element is None:
+                continue
+            if attribute is None:
+                return element
+            if element.get(attribute) is not None:
+                return element.get(attribute)
+        return None
+
+    def paragraph(self, p, sources, theme, default_color, scale, reduction, bold, numbers):
+        # One pass over the children: find() on python-pptx's elements costs a few µs a call
+        p_pr = end = None
+        runs = []  # a:r and a:fld elements, None for a line break
+        for child in p.iterchildren():
+            tag = child.tag
+            if tag in (_qn('a:r'), _qn('a:fld')):
+                runs.append(child)
+            elif tag == _qn('a:br'):
+                runs.append(None)
+            elif tag == _qn('a:pPr'):
+                p_pr = child
+            elif tag == _qn('a:endParaRPr'):
+                end = child
+        level = int(p_pr.get('lvl', '0')) if p_pr is not None else 0
+        key = (tuple(sources), level)
+        if key not in self.levels:
+            inherited = [_child(source, f'a:lvl{level + 1}pPr') for source in sources]
+            self.levels[key] = inherited, [_child(c, 'a:defRPr') if c is not None else None for c in inherited]
+        inherited, run_defaults = self.levels[key]
+        candidates = [p_pr] + inherited
+        layout = self.paragraph_format(p_pr, candidates, key, scale, reduction)
+
+        pieces = []
+        for run in runs:
+            if run is None:
+                pieces.append(('\n', None))
+                continue
+            text, r_pr = '', None
+            for child in run.iterchildren():
+                if child.tag == _qn('a:t'):
+                    text = child.text or ''
+                elif child.tag == _qn('a:rPr'):
+                    r_pr = child
+            if text:
+                pieces.append((text, self.run(r_pr, run_defaults, theme, default_color, scale, bold)))
+
+        size = self.lookup([end] + run_defaults, None, 'sz')
+        size = (int(size) / 100 if size else DEFAULT_FONT_SIZE) * scale
+        first = next((style.size for _, style in pieces if style is not None), size)
+        # Gaps in points, or in lines of the paragraph's first run
+        before, after = ((value * 1.2 * first if kind == 'pct' else value) for kind, value in layout['gaps'])
+
+        # Bullets only go on paragraphs with text
+        bullet = None
+        if layout['bullet'] and any(style is not None for _, style in pieces):
+            kind, value = layout['bullet']
+            if kind == 'char':
+                bullet = value
+            else:
+                numbers[level] = numbers.get(level, value - 1) + 1
+                bullet = f'{numbers[level]}.'
+            style = self.run(_child(p, 'a:r', 'a:rPr'), run_defaults, theme, default_color, scale, bold)
+            bullet = (bullet, style._replace(underline=False, strike=False, rise=0))
+
+        return {
+            'pieces': pieces,
+            'bullet': bullet,
+            'align': layout['align'],
+            'left': layout['left'],
+            'indent': layout['indent'],
+            'before': before,
+            'after': after,
+            'spacing': layout['spacing'],
+            'size': size,
+        }
+
+    def paragraph_format(self, p_pr, candidates, level_key, scale, reduction):
+        """
+        Line spacing, gaps, bullet, alignment and indents of a paragraph with
+        level properties `candidates`. Most paragraphs only set their level,
+        so their formatting repeats across a deck and is resolved once.
+        """
+        key = None
+        if p_pr is None or not len(p_pr) and _PARAGRAPH_ATTRIBUTES.isdisjoint(p_pr.attrib):
+            key = (level_key, scale, reduction)
+            if key in self.formats:
+                return self.formats[key]
+
+        spacing = ('pct', 1.0)
+        line = self.lookup(candidates, 'a:lnSpc')
+        if line is not None and len(line):
+            value = int(line[0].get('val', '0'))
+            if line[0].tag == _qn('a:spcPts'):
+                spacing = ('pts', value / 100 * scale)
+            else:
+                spacing = ('pct', max(value / 100000 - reduction, 0.5))
+        elif reduction:
+            spacing = ('pct', 1.0 - reduction)
+        gaps = []
+        for tag in ('a:spcBef', 'a:spcAft'):
+            gap = self.lookup(candidates, tag)
+            gap = gap[0] if gap is not None and len(gap) else None
+            if gap is None:
+                gaps.append(('pts', 0))
+            elif gap.tag == _qn('a:spcPts'):
+                gaps.append(('pts', int(gap.get('val', '0')) / 100 * scale))
+            else:
+                gaps.append(('pct', int(gap.get('val', '0')) / 100000))
+
+        bullet = None
+        for properties in candidates:
+            if properties is None:
+                continue
+            if _child(properties, 'a:buNone') is not None:
+                break
+            char = _child(properties, 'a:buChar')
+            if char is not None:
+                bullet = ('char', char.get('char', '•'))
+                break
+            number = _child(properties, 'a:buAutoNum')
+            if number is not None:
+                bullet = ('number', int(number.get('startAt', '1')))
+                break
+
+        margin = self.lookup(candidates, None, 'marL')
+        indent = self.lookup(candidates, None, 'indent')
+        layout = {
+            'spacing': spacing,
+            'gaps': gaps,
+            'bullet': bullet,
+            'align': self.lookup(candidates, None, 'algn'),
+            'left': int(margin or 0) / EMU_PER_POINT,
+            'indent': int(indent or 0) / EMU_PER_POINT,
+        }
+        if key is not None:
+            self.formats[key] = layout
+        return layout
+
+    def run(self, r_pr, run_defaults, theme, default_color, scale, bold=False):
+        # Most runs only inherit, so their styles repeat across a deck
+        key = None
+        if r_pr is None or not len(r_pr) and _RUN_ATTRIBUTES.isdisjoint(r_pr.attrib):
+            key = (tuple(run_defaults), theme, default_color, scale, bold)
+            if key in self.styles:
+                return self.styles[key]
+            r_pr = None
+        style = self.resolve_run(r_pr, run_defaults, theme, default_color, scale, bold)
+        if key is not None:
+            self.styles[key] = style
+        return style
+
+    def resolve_run(self, r_pr, run_defaults, theme, default_color, scale, bold):
+        candidates = [r_pr] + run_defaults
+        bold = bold or self.lookup(candidates, None, 'b') in ('1', 'true')
+        italic = self.lookup(candidates, None, 'i') in ('1', 'true')
+        size = self.lookup(candidates, None, 'sz')
+        size = (int(size) / 100 if size else DEFAULT_FONT_SIZE) * scale
+        rise = 0
+        baseline = self.lookup(candidates, None, 'baseline')
+        if baseline and int(baseline):
+            rise = int(baseline) / 100000 * size
+            size *= 2 / 3
+        # The run's own colour, then the shape style's text colour, then the inherited one
+        color = theme.fill(r_pr) if r_pr is not None else None
+        if color is None:
+            color = default_color
+        for properties in run_defaults:
+            if color is not None:
+                break
+            if properties is not None:
+                color = theme.fill(properties)
+        typeface = self.lookup(candidates, 'a:latin', 'typeface')
+        return _Style(
+            font=_font(_family(theme.fonts.get(typeface, typeface)), bold, italic),
+            size=size,
+            color=tuple(color) if color else (0, 0, 0),
+            underline=self.lookup(candidates, None, 'u') not in (None, 'none'),
+            strike=self.lookup(candidates, None, 'strike') not in (None, 'noStrike'),
+            rise=rise,
+        )
+
+    # --- tables ---
+
+    def table(self, shape, device, rect, theme, mediabox):
+        """
+        Tables are laid out on their own grid at the widths the deck sets.
+        Each cell's text is broken into lines for its width first, rows grow
+        to fit it as in PowerPoint, and then the fills, borders and text are
+        drawn.
+        """
+        tbl = shape._element.graphic.graphicData.tbl
+        sources = [self.default_style] if self.default_style is not None else []
+        grid = _child(tbl, 'a:tblGrid')
+        lefts = [rect.x0]
+        for column in grid.iterchildren(_qn('a:gridCol')):
+            lefts.append(lefts[-1] + int(column.get('w', '0')) / EMU_PER_POINT)
+        rows = list(tbl.iterchildren(_qn('a:tr')))
+        heights = [int(tr.get('h', '0')) / EMU_PER_POINT for tr in rows]
+        bold_header = tbl.tblPr is not None and tbl.tblPr.get('firstRow') in ('1', 'true')
+
+        cells = []
+        for row_index, tr in enumerate(rows):
+            for column_index, tc in enumerate(tr.iterchildren(_qn('a:tc'))):
+                if column_index + 1 >= len(lefts) or tc.get('hMerge') in ('1', 'true') or tc.get('vMerge') in ('1', 'true'):
+                    continue
+                across = min(int(tc.get('gridSpan', '1')), len(lefts) - 1 - column_index)
+                down = min(int(tc.get('rowSpan', '1')), len(rows) - row_index)
+                tc_pr = body = None
+                for child in tc.iterchildren():
+                    if child.tag == _qn('a:tcPr'):
+                        tc_pr = child
+                    elif child.tag == _qn('a:txBody'):
+                        body = child
+                margins = _CELL_MARGINS
+                if tc_pr is not None:
+                    margins = [
+                        int(tc_pr.get(name, default)) / EMU_PER_POINT
+                        for name, default in (('marL', '91440'), ('marR', '91440'), ('marT', '45720'), ('marB', '45720'))
+                    ]
+                bold = bold_header and row_index == 0
+                paragraphs = self.paragraphs(body, sources, theme, None, 1.0, bold=bold) if body is not None else []
+                width = lefts[column_index + across] - lefts[column_index] - margins[0] - margins[1]
+                # Empty cells still hold a line, as in PowerPoint
+                block = _TextBlock(paragraphs or [_empty_paragraph()], max(width, 1))
+                cells.append((row_index, down, column_index, across, margins, tc_pr, block))
+                need = block.height + margins[2] + margins[3]
+                last = row_index + down - 1
+                spanned = sum(heights[row_index:last + 1])
+                if need > spanned:
+                    heights[last] += need - spanned
+
+        tops = [rect.y0]
+        for height in heights:
+            tops.append(tops[-1] + height)
+
+        # Cell fills, then every border and all the text over them, a path or text per colour
+        fills, borders, glyphs = {}, _Path(), _Glyphs()
+        for row_index, down, column_index, across, margins, tc_pr, block in cells:
+            box = (lefts[column_index], tops[row_index], lefts[column_index + across], tops[row_index + down])
+            fill = theme.fill(tc_pr)
+            if fill:
+                fills.setdefault(fill, _Path()).rect(*box)
+            borders.rect(*box)
+            left, right, top, below = margins
+            spare = max(box[3] - box[1] - top - below - block.height, 0)
+            anchor = tc_pr.get('anchor') if tc_pr is not None else None
+            offset = spare / 2 if anchor == 'ctr' else spare if anchor == 'b' else 0
+            glyphs.add(block, box[0] + left, box[1] + top + offset)
+        for color, path in fills.items():
+            path.draw(device, fitz.Identity, fill=color)
+        if cells:
+            borders.draw(device, fitz.Identity, line=(0.5, 0.5, 0.5), width=0.5)
+        glyphs.draw(device, fitz.Identity)
+
+
+def _empty_paragraph():
+    return {'pieces': [], 'bullet': None, 'align': None, 'left': 0, 'indent': 0, 'before': 0, 'after': 0,
+            'spacing': ('pct', 1.0), 'size': DEFAULT_FONT_SIZE}
+
+
+def convert(input_path, output_path):
+    """Convert the PPTX at `input_path` to a PDF at `output_path`. Returns the page count."""
+    from pptx import Presentation
+
+    presentation = Presentation(input_path)
+    width = (presentation.slide_width or 9144000) / EMU_PER_POINT
+    height = (presentation.slide_height or 6858000) / EMU_PER_POINT
+    mediabox = fitz.Rect(0, 0, width, height)
+
+    renderer = _Renderer(presentation)
+    with open(output_path, 'wb') as fp:
+        sink = PageSink(fp, mediabox)
+        pages = 0
+        for slide in presentation.slides:
+            if slide._element.get('show') in ('0', 'false'):
+                continue  # hidden slides are left out, as in PowerPoint's own export
+            if pages == MAX_SLIDES:
+                raise ValueError(f"The presentation is too long to convert (over {MAX_SLIDES} slides).")
+            budgets.check_pages(pages + 1)
+            renderer.slide(slide, sink.begin_page(), mediabox)
+            sink.end_page()
+            pages += 1
+        if pages == 0:
+            # An empty presentation still gets one blank page
+            sink.begin_page()
+            sink.end_page()
+        return sink.close()
@@ -0,0 +1,173 @@
+"""
+Content-addressed disk cache for free-tool outputs.
+
+Entries are keyed on the SHA-256 of the uploaded bytes plus the normalized tool
+parameters, so re-running a tool on the same file with the same options can
+stream the stored artifact without opening PyMuPDF at all. The cache is bounded
+by TOOL_CACHE_MAX_BYTES (least recently used entries go first) and entries
+expire TOOL_CACHE_TTL_SECONDS after they were written.
+
+On disk each entry is a single file named after its key. Its mtime records when
+it was stored (for the TTL) and its atime when it was last served (for LRU);
+both are set explicitly, so the mount's atime policy doesn't matter.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from . import tool_metrics, uploads
+
+logger = logging.getLogger(__name__)
+
+# Bump when a tool's output changes so stale artifacts are never served
+KEY_VERSION = 1
+
+_lock = threading.Lock()
+_index = None  # key -> (size, stored_at), least recently used first
+_total_bytes = 0
+
+
+def enabled():
+    return getattr(settings, 'TOOL_CACHE_MAX_BYTES', 0) > 0
+
+
+def cache_dir():
+    return getattr(settings, 'TOOL_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'hewor_tool_cache'))
+
+
+def digest_upload(uploaded_file):
+    """SHA-256 of an uploaded file, hashed where it already is (see `core.uploads`)."""
+    with uploads.upload_buffer(uploaded_file) as content:
+        return hashlib.sha256(content).hexdigest()
+
+
+def make_key(tool, digests, **params):
+    payload = json.dumps(
+        {'v': KEY_VERSION, 'tool': tool, 'inputs': list(digests), 'params': params},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _path(key):
+    return os.path.join(cache_dir(), key)
+
+
+def _load_index():
+    """Rebuild the in-memory index from the cache directory (once per process)."""
+    global _index, _total_bytes
+    if _index is not None:
+        return
+    os.makedirs(cache_dir(), exist_ok=True)
+    entries = []
+    for entry in os.scandir(cache_dir()):
+        if entry.is_file() and len(entry.name) == 64:
+            st = entry.stat()
+            entries.append((st.st_atime, entry.name, st.st_size, st.st_mtime))
+    entries.sort()
+    _index = OrderedDict((key, (size, stored_at)) for _, key, size, stored_at in entries)
+    _total_bytes = sum(size for size, _ in _index.values())
+
+
+def _drop(key):
+    global _total_bytes
+    size, _ = _index.pop(key)
+    _total_bytes -= size
+    try:
+        os.remove(_path(key))
+    except FileNotFoundError:
+        pass
+
+
+def get(key):
+    """Return the path of a fresh cached artifact, or None."""
+    if not enabled():
+        return None
+    with _lock:
+        _load_index()
+        entry = _index.get(key)
+        if entry is not None:
+            size, stored_at = entry
+            if time.time() - stored_at > getattr(settings, 'TOOL_CACHE_TTL_SECONDS', 86400):
+                _drop(key)
+                tool_metrics.incr('cache.expired')
+                entry = None
+        if entry is None:
+            tool_metrics.incr('cache.miss')
+            return None
+
+        _index.move_to_end(key)
+        path = _path(key)
+        try:
+            os.utime(path, (time.time(), stored_at))
+        except FileNotFoundError:
+            # Removed behind our back (tmp cleaner, another process)
+            _drop(key)
+            tool_metrics.incr('cache.miss')
+            return None
+        tool_metrics.incr('cache.hit')
+        return path
+
+
+def put(key, source_path):
+    """Copy a finished artifact into the cache, evicting LRU entries over budget."""
+    global _total_bytes
+    if not enabled():
+        return
+    max_bytes = settings.TOOL_CACHE_MAX_BYTES
+    size = os.path.getsize(source_path)
+    if size > max_bytes:
+        return
+
+    try:
+        with _lock:
+            _load_index()
+        # Copy outside the lock, then publish atomically
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir(), suffix='.part')
+        os.close(fd)
+        shutil.copyfile(source_path, tmp_path)
+        os.replace(tmp_path, _path(key))
+    except OSError as e:
+        logger.error(f"Tool cache store failed: {e}")
+        return
+
+    with _lock:
+        if key in _index:
+            _total_bytes -= _index.pop(key)[0]
+        _index[key] = (size, time.time())
+        _total_bytes += size
+        tool_metrics.incr('cache.store')
+
+        while _total_bytes > max_bytes and _index:
+            oldest = next(iter(_index))
+            _drop(oldest)
+            tool_metrics.incr('cache.evict')
+
+
+def stats():
+    with _lock:
+        if enabled():
+            _load_index()
+        return {
+            'entries': len(_index or {}),
+            'bytes': _total_bytes,
+            'max_bytes': getattr(settings, 'TOOL_CACHE_MAX_BYTES', 0),
+            'hits': tool_metrics.get('cache.hit'),
+            'misses': tool_metrics.get('cache.miss'),
+        }
+
+
+def clear():
+    global _index, _total_bytes
+    with _lock:
+        shutil.rmtree(cache_dir(), ignore_errors=True)
+        _index = None
+        _total_bytes = 0
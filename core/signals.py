@@ -5,7 +5,7 @@ Deletes all files associated with a ServiceOrder when it's marked as completed.
 from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
 from django.conf import settings
-from .models import ServiceOrder, OrderFile, FreelancerChat
+from .models import ServiceOrder, OrderFile, FreelancerChat, ToolJob, ToolJobInput
 import os
 import logging
 
@@ -52,6 +52,26 @@ def cleanup_order_files_on_delete(sender, instance, **kwargs):
     delete_order_files(instance)
 
 
+@receiver(pre_delete, sender=ToolJob)
+def cleanup_tool_job_files(sender, instance, **kwargs):
+    """Delete the stored result when a tool job is purged."""
+    if instance.result_file:
+        try:
+            instance.result_file.delete(save=False)
+        except Exception as e:
+            logger.error(f"Error deleting result for tool job {instance.id}: {e}")
+
+
+@receiver(pre_delete, sender=ToolJobInput)
+def cleanup_tool_job_input_files(sender, instance, **kwargs):
+    """Delete uploaded inputs that a failed or purged job left behind."""
+    if instance.file:
+        try:
+            instance.file.delete(save=False)
+        except Exception as e:
+            logger.error(f"Error deleting input for tool job {instance.job_id}: {e}")
+
+
 def delete_order_files(order):
     """
     Helper function to delete all files associated with a ServiceOrder.
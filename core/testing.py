@@ -0,0 +1,84 @@
+"""Fixtures and checks shared by the test modules of the free tools."""
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+import io
+import os
+import tempfile
+import zipfile
+import fitz
+
+
+def make_pdf(pages=3):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Test Page {i + 1}")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def make_photo_pdf(pages=1, size=(1600, 2000)):
+    """Pages covered by a noisy RGB image, like a phone-camera scan."""
+    pix = fitz.Pixmap(fitz.csRGB, size[0], size[1], os.urandom(size[0] * size[1] * 3), False)
+    png = pix.tobytes('png')
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        page.insert_image(page.rect, stream=png)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def make_image(fmt, size=(60, 40), mode='RGB', exif_orientation=None):
+    from PIL import Image
+    image = Image.new(mode, size, (200, 30, 30, 128)[:len(mode)])
+    buf = io.BytesIO()
+    kwargs = {}
+    if exif_orientation:
+        exif = Image.Exif()
+        exif[0x0112] = exif_orientation
+        kwargs['exif'] = exif
+    image.save(buf, fmt, **kwargs)
+    return buf.getvalue()
+
+
+class OfficeToPdfTests:
+    """
+    Checks shared by the Office-to-PDF engines. A TestCase using it sets
+    `task` (the pdf_tasks function), the input `suffix`, the tool's `url_name`
+    and upload `field`, `make_document()` and a `sample_text` it contains.
+    """
+
+    def write_input(self, data):
+        fd, input_path = tempfile.mkstemp(suffix=self.suffix)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        output_path = input_path + '.pdf'
+        self.addCleanup(os.remove, input_path)
+        self.addCleanup(lambda: os.path.exists(output_path) and os.remove(output_path))
+        return input_path, output_path
+
+    def convert(self, data):
+        input_path, output_path = self.write_input(data)
+        self.assertEqual(self.task(input_path, output_path), output_path)
+        return fitz.open(output_path)
+
+    @override_settings(TOOL_POOL_WORKERS=0)
+    def test_view_batch_with_a_bad_file(self):
+        response = Client().post(reverse(self.url_name), {self.field: [
+            SimpleUploadedFile('a' + self.suffix, self.make_document()),
+            SimpleUploadedFile('b' + self.suffix, b'not a zip'),
+        ]})
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as zf:
+            self.assertEqual(sorted(zf.namelist()), ['a.pdf', 'manifest.csv'])
+            self.assertIn(f'b{self.suffix},failed', zf.read('manifest.csv').decode())
+
+    @override_settings(TOOL_POOL_WORKERS=0)
+    def test_view_single_file(self):
+        response = Client().post(reverse(self.url_name), {self.field: SimpleUploadedFile('a' + self.suffix, self.make_document())})
+        self.assertIn('a.pdf', response['Content-Disposition'])
+        with fitz.open(stream=b''.join(response.streaming_content), filetype='pdf') as doc:
+            self.assertIn(self.sample_text, doc[0].get_text())
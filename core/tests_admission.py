@@ -0,0 +1,133 @@
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import HttpResponse
+from unittest import mock
+import gc
+import threading
+import fitz
+from . import admission, tool_metrics
+from .testing import make_pdf
+
+MB = admission.MB
+
+
+@override_settings(
+    TOOL_ADMISSION_CONCURRENCY=1, TOOL_ADMISSION_LIMITS={}, TOOL_ADMISSION_QUEUE_SIZE=1,
+    TOOL_ADMISSION_WAIT_SECONDS=5, TOOL_ADMISSION_MAX_THREADS=4,
+    TOOL_ADMISSION_MEMORY_MB=100, TOOL_ADMISSION_TOTAL_MEMORY_MB=150, TOOL_ADMISSION_BASE_MB=10,
+    TOOL_ADMISSION_UPLOAD_FACTOR=2, TOOL_POOL_WORKERS=0, TOOL_CACHE_MAX_BYTES=0,
+)
+class AdmissionTest(TestCase):
+    def setUp(self):
+        admission.reset()
+        tool_metrics.reset()
+
+    def tearDown(self):
+        admission.reset()
+
+    def wait_in_queue(self, tool, cost=MB):
+        """Start a thread that queues for `tool`; returns it and its result list."""
+        result = []
+        thread = threading.Thread(target=lambda: result.append(admission.acquire(tool, cost)))
+        thread.start()
+        for _ in range(200):
+            if admission.stats().get(tool, {}).get('waiting'):
+                break
+            thread.join(0.01)
+        return thread, result
+
+    def test_cost_is_weighted_by_upload_size(self):
+        self.assertEqual(admission.request_cost('0'), 10 * MB)
+        self.assertEqual(admission.request_cost(str(5 * MB)), 20 * MB)
+        self.assertEqual(admission.request_cost('junk'), 10 * MB)
+
+    @override_settings(TOOL_ADMISSION_CONCURRENCY=3, TOOL_ADMISSION_QUEUE_SIZE=0)
+    def test_memory_budget(self):
+        first = admission.acquire('a', 60 * MB)
+        self.assertIsNone(admission.acquire('a', 60 * MB))  # 120 MB > the tool's 100
+        self.assertIsNotNone(admission.acquire('b', 80 * MB))
+        self.assertIsNone(admission.acquire('c', 20 * MB))  # 160 MB > 150 in all
+        first.release()
+        self.assertIsNotNone(admission.acquire('c', 20 * MB))
+        self.assertEqual(tool_metrics.get('admission.rejected.queue_full'), 2)
+
+    def test_a_heavy_request_runs_alone(self):
+        ticket = admission.acquire('a', 500 * MB)
+        self.assertIsNotNone(ticket)
+        ticket.release()
+        ticket.release()  # only counted once
+        self.assertEqual(admission.stats(), {})
+
+    def test_queued_request_is_admitted_when_a_slot_frees(self):
+        ticket = admission.acquire('a', MB)
+        thread, result = self.wait_in_queue('a')
+        self.assertEqual(admission.stats()['a'], {'running': 1, 'waiting': 1, 'memory_mb': 1.0})
+        ticket.release()
+        thread.join(5)
+        self.assertIsInstance(result[0], admission.Ticket)
+        self.assertEqual(tool_metrics.get('admission.queued'), 1)
+        result[0].release()
+
+    @override_settings(TOOL_ADMISSION_WAIT_SECONDS=0.05)
+    def test_queue_wait_is_bounded(self):
+        ticket = admission.acquire('a', MB)
+        self.assertIsNone(admission.acquire('a', MB))
+        self.assertEqual(tool_metrics.get('admission.rejected.timeout'), 1)
+        ticket.release()
+
+    @override_settings(TOOL_ADMISSION_MAX_THREADS=2)
+    def test_threads_are_kept_for_other_pages(self):
+        ticket = admission.acquire('a', MB)
+        thread, result = self.wait_in_queue('a')
+        self.assertIsNone(admission.acquire('b', MB))
+        self.assertEqual(tool_metrics.get('admission.rejected.busy'), 1)
+        ticket.release()
+        thread.join(5)
+        result[0].release()
+
+    def test_full_queue_gets_a_fast_429_without_parsing(self):
+        ticket = admission.acquire('rotate_pdf_tool', MB)
+        thread, result = self.wait_in_queue('rotate_pdf_tool')
+        with mock.patch('django.core.handlers.wsgi.WSGIRequest._load_post_and_files') as load:
+            response = Client().post(reverse('rotate_pdf_tool'), {
+                'pdf_files': SimpleUploadedFile('a.pdf', make_pdf(1)), 'rotation': '90',
+            })
+        load.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+        response = Client().post(reverse('rotate_pdf_tool'), HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json()['retry_after'], int(response['Retry-After']))
+        ticket.release()
+        thread.join(5)
+        result[0].release()
+
+    def test_other_pages_are_not_admitted(self):
+        admission.acquire('rotate_pdf_tool', MB)  # the tool is full
+        self.assertIsNone(admission.tool_for(reverse('home')))
+        self.assertEqual(Client().get(reverse('rotate_pdf_tool')).status_code, 200)
+        admission.reset()
+
+    def test_slot_is_held_until_the_stream_ends(self):
+        response = Client().post(reverse('rotate_pdf_tool'), {
+            'pdf_files': SimpleUploadedFile('a.pdf', make_pdf(2)), 'rotation': '90',
+        })
+        self.assertEqual(admission.stats()['rotate_pdf_tool']['running'], 1)
+        with fitz.open(stream=b''.join(response.streaming_content), filetype='pdf') as doc:
+            self.assertEqual(doc[0].rotation, 90)
+        self.assertEqual(admission.stats(), {})
+        self.assertEqual(tool_metrics.get('admission.admitted'), 1)
+
+    def test_slot_is_freed_on_close_or_collection(self):
+        middleware = admission.ToolAdmissionMiddleware(lambda request: HttpResponse('ok'))
+        request = RequestFactory().post(reverse('rotate_pdf_tool'))
+        response = middleware(request)
+        self.assertEqual(admission.stats()['rotate_pdf_tool']['running'], 1)
+        response.close()
+        self.assertEqual(admission.stats(), {})
+        # A response nobody closes gives its slot back once it is collected
+        middleware(request)
+        gc.collect()
+        self.assertEqual(admission.stats(), {})
+        self.assertEqual(tool_metrics.get('admission.admitted'), 2)
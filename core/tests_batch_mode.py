@@ -0,0 +1,133 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from unittest import mock
+import csv
+import io
+import os
+import tempfile
+import zipfile
+import fitz
+from . import pdf_tasks, tool_pool
+from .testing import make_pdf
+
+
+@override_settings(TOOL_POOL_WORKERS=0)
+class BatchModeTest(TestCase):
+    def upload(self, name, data=None):
+        return SimpleUploadedFile(name, data or make_pdf(2), content_type='application/pdf')
+
+    def read_batch(self, response):
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        zf = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        manifest = zf.read('manifest.csv').decode('utf-8').splitlines()
+        return zf, [line.split(',') for line in manifest[1:]]
+
+    def test_every_tool_processes_every_file(self):
+        cases = [
+            ('rotate_pdf_tool', {'rotation': '90'}, '_rotated_90'),
+            ('add_watermark_tool', {'watermark_text': 'DRAFT'}, '_watermarked'),
+            ('protect_pdf_tool', {'password': 'secret'}, '_protected'),
+            ('unlock_pdf_tool', {}, '_unlocked'),
+            ('add_page_numbers_tool', {}, '_numbered'),
+            ('remove_pages_tool', {'pages_to_remove': '1'}, '_removed'),
+            ('extract_pages_tool', {'pages_to_extract': '2'}, '_extracted'),
+        ]
+        for url_name, data, suffix in cases:
+            with self.subTest(url_name):
+                data = dict(data, pdf_files=[self.upload('a.pdf'), self.upload('b.pdf')])
+                zf, rows = self.read_batch(Client().post(reverse(url_name), data))
+                self.assertEqual(sorted(zf.namelist()), sorted([f'a{suffix}.pdf', f'b{suffix}.pdf', 'manifest.csv']))
+                self.assertEqual([row[1] for row in rows], ['ok', 'ok'])
+
+    def test_failures_are_listed_in_manifest(self):
+        fd, locked_path = tempfile.mkstemp(suffix='.pdf')
+        os.close(fd)
+        self.addCleanup(os.remove, locked_path)
+        with open(locked_path + '.in', 'wb') as f:
+            f.write(make_pdf(1))
+        self.addCleanup(os.remove, locked_path + '.in')
+        pdf_tasks.protect_pdf(locked_path + '.in', locked_path, 'other')
+        with open(locked_path, 'rb') as f:
+            locked = f.read()
+
+        response = Client().post(reverse('unlock_pdf_tool'), {
+            'pdf_files': [self.upload('open.pdf'), self.upload('locked.pdf', locked)],
+            'password': 'wrong',
+        })
+        zf, rows = self.read_batch(response)
+        self.assertEqual(sorted(zf.namelist()), ['manifest.csv', 'open_unlocked.pdf'])
+        self.assertEqual(rows[0][:3], ['open.pdf', 'ok', 'open_unlocked.pdf'])
+        self.assertEqual(rows[1][:2], ['locked.pdf', 'failed'])
+        self.assertIn('password', rows[1][3])
+
+    def test_duplicate_names_get_unique_entries(self):
+        response = Client().post(reverse('add_page_numbers_tool'), {
+            'pdf_files': [self.upload('a.pdf'), self.upload('a.pdf')],
+        })
+        zf, rows = self.read_batch(response)
+        self.assertEqual(sorted(zf.namelist()), ['2_a_numbered.pdf', 'a_numbered.pdf', 'manifest.csv'])
+
+    @override_settings(TOOL_CACHE_MAX_BYTES=0)
+    def test_streamed_batches_list_failures_instead_of_breaking(self):
+        # The second file fails once the ZIP is already streaming
+        cases = [
+            ('compress_pdf_tool', {}, ['compressed_a.pdf', 'compression_report.csv', 'manifest.csv']),
+            ('split_pdf_tool', {'split_pages': '1'}, ['a_part_1.pdf', 'a_part_2.pdf', 'manifest.csv']),
+            ('pdf_to_jpg_tool', {}, ['a_page_1.jpg', 'a_page_2.jpg', 'manifest.csv']),
+        ]
+        real_result = tool_pool.result
+        for url_name, data, names in cases:
+            with self.subTest(url_name):
+                calls = []
+
+                def result(future):
+                    calls.append(future)
+                    if len(calls) == 2:
+                        raise RuntimeError('worker died')
+                    return real_result(future)
+
+                data = dict(data, pdf_files=[self.upload('a.pdf'), self.upload('b.pdf')])
+                with mock.patch.object(tool_pool, 'result', side_effect=result):
+                    zf, rows = self.read_batch(Client().post(reverse(url_name), data))
+                self.assertEqual(sorted(zf.namelist()), names)
+                self.assertEqual(rows[-1][:2], ['b.pdf', 'failed'])
+                self.assertEqual(rows[-1][3], 'worker died')
+
+    @override_settings(TOOL_CACHE_MAX_BYTES=0, TOOL_POOL_MIN_PAGES_PER_TASK=1)
+    def test_single_file_zip_gets_a_manifest_only_on_failure(self):
+        data = {'pdf_files': self.upload('a.pdf')}
+        with zipfile.ZipFile(io.BytesIO(b''.join(Client().post(reverse('pdf_to_jpg_tool'), data).streaming_content))) as zf:
+            self.assertNotIn('manifest.csv', zf.namelist())
+
+        real_result = tool_pool.result
+        calls = []
+
+        def result(future):
+            calls.append(future)
+            if len(calls) == 2:
+                raise RuntimeError('worker died')
+            return real_result(future)
+
+        data = {'pdf_files': self.upload('a.pdf')}
+        with mock.patch.object(tool_pool, 'result', side_effect=result):
+            zf, rows = self.read_batch(Client().post(reverse('pdf_to_jpg_tool'), data))
+        self.assertEqual(sorted(zf.namelist()), ['a_page_1.jpg', 'manifest.csv'])
+        self.assertEqual(rows[1][:3], ['a.pdf', 'failed', 'pages 2-2'])
+
+    def test_report_names_may_contain_commas(self):
+        response = Client().post(reverse('compress_pdf_tool'), {
+            'pdf_files': [self.upload('a, final.pdf'), self.upload('b.pdf')],
+        })
+        zf, rows = self.read_batch(response)
+        with zf.open('compression_report.csv') as f:
+            report = list(csv.reader(io.TextIOWrapper(f, encoding='utf-8')))
+        self.assertEqual([row[0] for row in report[1:]], ['a, final.pdf', 'b.pdf'])
+
+    def test_single_file_still_returns_pdf(self):
+        response = Client().post(reverse('protect_pdf_tool'), {
+            'pdf_files': self.upload('a.pdf'), 'password': 'secret',
+        })
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        with fitz.open(stream=b''.join(response.streaming_content), filetype='pdf') as doc:
+            self.assertTrue(doc.needs_pass)
@@ -0,0 +1,112 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.contrib.messages import get_messages
+from django.core.files.uploadedfile import SimpleUploadedFile
+import os
+import tempfile
+import time
+from . import budgets, pdf_tasks, tool_metrics, tool_pool
+from .testing import make_image, make_pdf
+
+
+def budget(max_pages=None, max_render_pixels=None, max_image_pixels=None, seconds=None):
+    deadline = time.time() + seconds if seconds is not None else None
+    return budgets.Budget(max_pages, max_render_pixels, max_image_pixels, deadline)
+
+
+def temp_file(data, suffix):
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    return path
+
+
+@override_settings(TOOL_POOL_WORKERS=0, TOOL_CACHE_MAX_BYTES=0)
+class BudgetTest(TestCase):
+    def setUp(self):
+        tool_metrics.reset()
+        self.pdf_path = temp_file(make_pdf(3), '.pdf')
+        self.addCleanup(os.remove, self.pdf_path)
+
+    def error_message(self, response):
+        self.assertEqual(response.status_code, 302)
+        return ' '.join(str(m) for m in get_messages(response.wsgi_request))
+
+    def test_no_active_budget_means_no_limits(self):
+        self.assertEqual(pdf_tasks.count_pages(self.pdf_path), 3)
+
+    def test_page_budget(self):
+        with budgets.applied(budget(max_pages=2)), self.assertRaises(budgets.BudgetExceeded) as caught:
+            pdf_tasks.count_pages(self.pdf_path)
+        self.assertEqual(caught.exception.kind, 'pages')
+        self.assertEqual(tool_metrics.get('budget.exceeded.pages'), 1)
+
+    def test_render_pixel_budget(self):
+        # A default page is A4, 595 x 842 pt: 1,190 x 1,684 pixels at 144 dpi
+        with budgets.applied(budget(max_render_pixels=3 * 1190 * 1684)):
+            self.assertEqual(len(pdf_tasks.render_page_images(self.pdf_path, 0, 1, dpi=144)), 1)
+            with self.assertRaises(budgets.BudgetExceeded):
+                pdf_tasks.render_page_images(self.pdf_path, 0, 1, dpi=150)
+        self.assertEqual(tool_metrics.get('budget.exceeded.render_pixels'), 1)
+
+    def test_deadline_interrupts_the_task(self):
+        started = time.monotonic()
+        with self.assertRaises(budgets.BudgetExceeded) as caught:
+            budgets.call(budget(seconds=0.2), time.sleep, 10)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(caught.exception.kind, 'wall_time')
+        with budgets.applied(budget(seconds=-1)), self.assertRaises(budgets.BudgetExceeded):
+            pdf_tasks.count_pages(self.pdf_path)
+        self.assertEqual(tool_metrics.get('budget.exceeded.wall_time'), 2)
+
+    @override_settings(TOOL_BUDGET_MAX_RENDER_PIXELS=1000)
+    def test_render_budget_is_checked_before_the_zip_streams(self):
+        response = Client().post(reverse('pdf_to_jpg_tool'), {
+            'pdf_files': SimpleUploadedFile('a.pdf', make_pdf(3)),
+        })
+        self.assertIn('too large to render', self.error_message(response))
+
+    @override_settings(TOOL_BUDGET_MAX_PAGES=2)
+    def test_tool_request_reports_the_page_budget(self):
+        response = Client().post(reverse('rotate_pdf_tool'), {
+            'pdf_files': SimpleUploadedFile('a.pdf', make_pdf(3)), 'rotation': '90',
+        })
+        self.assertIn('the limit is 2', self.error_message(response))
+        self.assertEqual(tool_metrics.get('budget.exceeded.pages'), 1)
+
+    @override_settings(TOOL_BUDGET_MAX_IMAGE_PIXELS=1000)
+    def test_images_are_measured_before_decoding(self):
+        response = Client().post(reverse('jpg_to_pdf_tool'), {
+            'jpg_files': SimpleUploadedFile('a.png', make_image('PNG', size=(50, 50))),
+        })
+        self.assertIn('50 x 50 pixels', self.error_message(response))
+        self.assertEqual(tool_metrics.get('budget.exceeded.image_pixels'), 1)
+
+
+class PoolBudgetTest(TestCase):
+    def setUp(self):
+        tool_metrics.reset()
+        tool_pool.shutdown()
+        self.addCleanup(tool_pool.shutdown)
+
+    @override_settings(TOOL_POOL_WORKERS=1)
+    def test_violation_in_a_worker_reaches_the_caller(self):
+        path = temp_file(make_pdf(3), '.pdf')
+        self.addCleanup(os.remove, path)
+        with budgets.applied(budget(max_pages=2)), self.assertRaises(budgets.BudgetExceeded) as caught:
+            tool_pool.run(pdf_tasks.count_pages, path)
+        self.assertEqual(caught.exception.kind, 'pages')
+        self.assertEqual(tool_metrics.get('budget.exceeded.pages'), 1)
+
+    @override_settings(TOOL_POOL_WORKERS=1, TOOL_BUDGET_SECONDS=0, TOOL_BUDGET_KILL_GRACE_SECONDS=0)
+    def test_stuck_worker_is_killed(self):
+        # No deadline inside the worker, so only the caller can stop it
+        future = tool_pool.submit(time.sleep, 30)
+        future.budget = budget(seconds=0.5)
+        started = time.monotonic()
+        with self.assertRaises(budgets.BudgetExceeded):
+            tool_pool.result(future)
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(tool_metrics.get('budget.killed'), 1)
+        # A fresh pool takes over
+        self.assertNotEqual(tool_pool.run(pdf_tasks.noop), os.getpid())
@@ -0,0 +1,68 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+import io
+import os
+import tempfile
+import zipfile
+import fitz
+from . import pdf_tasks
+from .testing import make_pdf, make_photo_pdf
+
+
+class CompressPresetTest(TestCase):
+    def setUp(self):
+        fd, self.input_path = tempfile.mkstemp(suffix='.pdf')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(make_photo_pdf())
+        self.addCleanup(os.remove, self.input_path)
+
+    def compress(self, preset):
+        fd, output_path = tempfile.mkstemp(suffix='.pdf')
+        os.close(fd)
+        self.addCleanup(os.remove, output_path)
+        pdf_tasks.compress_pdf(self.input_path, output_path, preset)
+        return output_path
+
+    def test_presets_downsample_images(self):
+        sizes = {preset: os.path.getsize(self.compress(preset)) for preset in ('low', 'medium', 'high')}
+        self.assertLess(sizes['low'], os.path.getsize(self.input_path))
+        self.assertLess(sizes['medium'], sizes['low'])
+        self.assertLess(sizes['high'], sizes['medium'])
+        with fitz.open(self.compress('high')) as doc:
+            xref, _, width, _, _, _, _, _, image_filter, _ = doc[0].get_images(full=True)[0]
+            self.assertEqual(image_filter, 'DCTDecode')
+            # A full A4 page at 96 dpi is about 794 px wide
+            self.assertLessEqual(width, 800)
+
+    def test_output_never_grows(self):
+        fd, text_path = tempfile.mkstemp(suffix='.pdf')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(make_pdf(2))
+        self.addCleanup(os.remove, text_path)
+        self.input_path = text_path
+        self.assertLessEqual(os.path.getsize(self.compress('high')), os.path.getsize(text_path))
+
+    def test_view_reports_sizes(self):
+        with open(self.input_path, 'rb') as f:
+            data = f.read()
+        with override_settings(TOOL_CACHE_MAX_BYTES=0):
+            response = Client().post(reverse('compress_pdf_tool'), {
+                'pdf_files': SimpleUploadedFile('scan.pdf', data, content_type='application/pdf'),
+                'level': 'high',
+            })
+        self.assertEqual(int(response['X-Original-Size']), len(data))
+        self.assertEqual(int(response['X-Compressed-Size']), len(response.content))
+        self.assertLess(float(response['X-Compression-Ratio']), 0.5)
+
+    def test_batch_includes_report(self):
+        response = Client().post(reverse('compress_pdf_tool'), {
+            'pdf_files': [
+                SimpleUploadedFile('a.pdf', make_pdf(1), content_type='application/pdf'),
+                SimpleUploadedFile('b.pdf', make_pdf(1), content_type='application/pdf'),
+            ],
+        })
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as zf:
+            report = zf.read('compression_report.csv').decode().splitlines()
+        self.assertEqual(report[0], 'file,original_bytes,compressed_bytes,ratio')
+        self.assertEqual([line.split(',')[0] for line in report[1:]], ['a.pdf', 'b.pdf'])
@@ -0,0 +1,82 @@
+from django.test import TestCase
+import io
+from unittest import mock
+from . import docx_layout, pdf_tasks
+from .testing import OfficeToPdfTests, make_image
+
+
+def make_docx(paragraphs=3, page_break=False, image=False):
+    import docx
+    from docx.enum.text import WD_BREAK
+    from docx.shared import Inches, Pt
+    document = docx.Document()
+    document.add_heading('Contract', 1)
+    for i in range(paragraphs):
+        paragraph = document.add_paragraph(f'Clause {i + 1} ')
+        run = paragraph.add_run('in bold')
+        run.bold = True
+        run.font.size = Pt(14)
+    document.add_paragraph('First item', style='List Bullet')
+    document.add_paragraph('Second item', style='List Bullet')
+    table = document.add_table(rows=2, cols=2)
+    table.cell(0, 0).text, table.cell(0, 1).text = 'Party', 'Share'
+    table.cell(1, 0).text, table.cell(1, 1).text = 'Acme', '60%'
+    if image:
+        document.add_picture(io.BytesIO(make_image('PNG', size=(200, 100))), width=Inches(2))
+    if page_break:
+        document.add_paragraph('Before the break').add_run().add_break(WD_BREAK.PAGE)
+        document.add_paragraph('Signatures')
+    buf = io.BytesIO()
+    document.save(buf)
+    return buf.getvalue()
+
+
+class WordToPdfTest(OfficeToPdfTests, TestCase):
+    task = staticmethod(pdf_tasks.docx_to_pdf)
+    suffix = '.docx'
+    url_name, field = 'word_to_pdf_tool', 'word_files'
+    make_document = staticmethod(make_docx)
+    sample_text = 'Clause 1'
+
+    def test_structure_is_kept(self):
+        with self.convert(make_docx(image=True, page_break=True)) as doc:
+            self.assertEqual(doc.page_count, 2)
+            page = doc[0]
+            spans = {span['text'].strip(): span for block in page.get_text('dict')['blocks']
+                     for line in block.get('lines', []) for span in line['spans']}
+            self.assertGreater(spans['Contract']['size'], 11)
+            self.assertEqual(spans['in bold']['size'], 14)
+            self.assertIn('Bold', spans['in bold']['font'])
+            self.assertIn('First item', page.get_text())
+            party, share = page.search_for('Party')[0], page.search_for('Share')[0]
+            self.assertAlmostEqual(party.y0, share.y0, places=1)
+            self.assertEqual(len(page.get_images()), 1)
+            self.assertEqual(doc[1].get_text().strip(), 'Signatures')
+            # Page size and margins come from the document's section
+            self.assertEqual((page.rect.width, page.rect.height), (612, 792))
+
+    def test_batches_continue_on_the_same_page(self):
+        data = make_docx(paragraphs=400)
+        with self.convert(data) as doc:
+            expected = [page.get_text() for page in doc]
+        with mock.patch.object(docx_layout, 'BLOCKS_PER_STORY', 7):
+            with self.convert(data) as doc:
+                self.assertEqual([page.get_text() for page in doc], expected)
+                self.assertGreater(len(doc), 5)
+
+    def test_pages_are_streamed_with_each_image_once(self):
+        import docx
+        from docx.enum.text import WD_BREAK
+        from docx.shared import Inches
+        picture = make_image('JPEG', size=(200, 100))
+        document = docx.Document()
+        for i in range(3):
+            document.add_picture(io.BytesIO(picture), width=Inches(2))
+            document.add_paragraph(f'Page {i + 1}').add_run().add_break(WD_BREAK.PAGE)
+        buf = io.BytesIO()
+        document.save(buf)
+        with self.convert(buf.getvalue()) as doc:
+            self.assertEqual(doc.page_count, 3)
+            xrefs = {page.get_images()[0][0] for page in doc}
+            self.assertEqual(len(xrefs), 1)
+            self.assertEqual(doc.xref_stream_raw(xrefs.pop()), picture)
@@ -0,0 +1,55 @@
+from django.test import TestCase
+import os
+import tempfile
+import fitz
+from . import pdf_tasks
+from .testing import make_image
+
+
+class HtmlToPdfTest(TestCase):
+    def convert(self, html, images=None):
+        fd, output_path = tempfile.mkstemp(suffix='.pdf')
+        os.close(fd)
+        self.addCleanup(os.remove, output_path)
+        pages = pdf_tasks.html_to_pdf(html, output_path, images)
+        doc = fitz.open(output_path)
+        self.assertEqual(doc.page_count, pages)
+        return doc
+
+    def test_structure_is_kept(self):
+        html = (
+            '<h1>Report</h1><ul><li>First point</li><li>Second point</li></ul>'
+            '<table><tr><th>Name</th><th>Value</th></tr><tr><td>alpha</td><td>42</td></tr></table>'
+            '<script>document.write("hidden")</script>'
+        )
+        with self.convert(html) as doc:
+            text = doc[0].get_text()
+            heading = [span for block in doc[0].get_text('dict')['blocks'] for line in block['lines']
+                       for span in line['spans'] if span['text'] == 'Report'][0]
+        self.assertIn('First point', text)
+        self.assertIn('alpha', text)
+        self.assertNotIn('hidden', text)
+        self.assertGreater(heading['size'], 20)
+        # Table cells stay on one row, side by side
+        with self.convert(html) as doc:
+            alpha, value = doc[0].search_for('alpha')[0], doc[0].search_for('42')[0]
+        self.assertAlmostEqual(alpha.y0, value.y0, places=1)
+        self.assertGreater(value.x0, alpha.x1)
+
+    def test_long_document_paginates(self):
+        with self.convert('<p>A paragraph of body text.</p>' * 2000) as doc:
+            self.assertGreater(doc.page_count, 20)
+            self.assertIn('A paragraph', doc[-1].get_text())
+
+    def test_images_from_dict(self):
+        with self.convert('<p>Logo:</p><img src="image0">', {'image0': make_image('JPEG')}) as doc:
+            self.assertEqual(doc[0].get_images()[0][-1], 'DCTDecode')
+
+    def test_repeated_image_is_stored_once(self):
+        logo = make_image('JPEG')
+        html = ('<img src="logo">' + '<p>A paragraph of body text.</p>' * 80) * 3
+        with self.convert(html, {'logo': logo}) as doc:
+            xrefs = {image[0] for page in doc for image in page.get_images()}
+            self.assertGreater(doc.page_count, 2)
+            self.assertEqual(len(xrefs), 1)
+            self.assertEqual(doc.xref_stream_raw(xrefs.pop()), logo)
@@ -0,0 +1,56 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+import os
+import tempfile
+import fitz
+from . import pdf_tasks
+from .testing import make_image
+
+
+class ImagesToPdfTest(TestCase):
+    def convert(self, *images):
+        paths = []
+        for data in images:
+            fd, path = tempfile.mkstemp()
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            self.addCleanup(os.remove, path)
+            paths.append(path)
+        fd, output_path = tempfile.mkstemp(suffix='.pdf')
+        os.close(fd)
+        self.addCleanup(os.remove, output_path)
+        pdf_tasks.images_to_pdf(paths, output_path)
+        return fitz.open(output_path)
+
+    def test_jpeg_is_embedded_byte_for_byte(self):
+        jpeg = make_image('JPEG')
+        with self.convert(jpeg) as doc:
+            xref = doc[0].get_images()[0][0]
+            self.assertEqual(doc.xref_stream_raw(xref), jpeg)
+            self.assertAlmostEqual(doc[0].rect.width, 60 * 72 / pdf_tasks.IMAGE_PAGE_DPI, places=3)
+
+    def test_exif_orientation_swaps_page_size(self):
+        with self.convert(make_image('JPEG', exif_orientation=6)) as doc:
+            self.assertGreater(doc[0].rect.height, doc[0].rect.width)
+
+    def test_png_with_alpha_and_mixed_formats(self):
+        with self.convert(make_image('PNG', mode='RGBA'), make_image('JPEG', size=(30, 30))) as doc:
+            self.assertEqual(doc.page_count, 2)
+            pix = doc[0].get_pixmap()
+            # Half-transparent red flattened onto white
+            r, g, b = pix.pixel(pix.width // 2, pix.height // 2)
+            self.assertGreater(g, 100)
+            self.assertGreater(r, g)
+
+    def test_jpg_to_pdf_view(self):
+        response = Client().post(reverse('jpg_to_pdf_tool'), {
+            'jpg_files': [
+                SimpleUploadedFile('a.jpg', make_image('JPEG'), content_type='image/jpeg'),
+                SimpleUploadedFile('b.png', make_image('PNG'), content_type='image/png'),
+            ],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('hewor_images_combined.pdf', response['Content-Disposition'])
+        with fitz.open(stream=b''.join(response.streaming_content), filetype='pdf') as doc:
+            self.assertEqual(doc.page_count, 2)
@@ -0,0 +1,105 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+import io
+import os
+import tempfile
+import fitz
+from . import pdf_tasks
+from .testing import make_pdf
+
+
+class IncrementalEditTest(TestCase):
+    def write_input(self, data):
+        fd, path = tempfile.mkstemp(suffix='.pdf')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        self.addCleanup(lambda: os.path.exists(path) and os.remove(path))
+        output_path = path + '.out'
+        self.addCleanup(lambda: os.path.exists(output_path) and os.remove(output_path))
+        return path, output_path
+
+    def test_rotate_appends_an_update(self):
+        original = make_pdf(3)
+        input_path, output_path = self.write_input(original)
+        pdf_tasks.rotate_pages(input_path, output_path, 90)
+        with open(output_path, 'rb') as f:
+            data = f.read()
+        # The original bytes are untouched; only the changed pages follow them
+        self.assertTrue(data.startswith(original))
+        self.assertLess(len(data) - len(original), 2000)
+        with fitz.open(output_path) as doc:
+            self.assertEqual([page.rotation for page in doc], [90, 90, 90])
+
+    def test_input_and_its_links_are_left_alone(self):
+        # Uploads are hard links to Django's temp files (uploads.upload_path)
+        original = make_pdf(2)
+        input_path, output_path = self.write_input(original)
+        link = input_path + '.link'
+        os.link(input_path, link)
+        self.addCleanup(os.remove, link)
+        pdf_tasks.rotate_pages(input_path, output_path, 90)
+        for path in (input_path, link):
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), original)
+
+    def test_xref_stream_input_appends_an_update(self):
+        original = make_pdf(2)
+        with fitz.open(stream=original, filetype='pdf') as doc:
+            original = doc.tobytes(use_objstms=1)
+        self.assertIn(b'/XRef', original)
+        input_path, output_path = self.write_input(original)
+        pdf_tasks.rotate_pages(input_path, output_path, 270)
+        with open(input_path, 'rb') as f:
+            self.assertEqual(f.read(), original)
+        with open(output_path, 'rb') as f:
+            self.assertTrue(f.read().startswith(original))
+        with fitz.open(output_path) as doc:
+            self.assertEqual([page.rotation for page in doc], [270, 270])
+
+    def test_page_numbers_append_an_update(self):
+        original = make_pdf(2)
+        input_path, output_path = self.write_input(original)
+        pdf_tasks.add_page_numbers(input_path, output_path)
+        with open(output_path, 'rb') as f:
+            self.assertTrue(f.read().startswith(original))
+        with fitz.open(output_path) as doc:
+            self.assertIn('Page 2 of 2', doc[1].get_text())
+
+    def test_encrypted_input_is_rewritten(self):
+        import pikepdf
+        plain_path, encrypted_path = self.write_input(make_pdf(2))
+        with pikepdf.Pdf.open(plain_path) as pdf:
+            pdf.save(encrypted_path, encryption=pikepdf.Encryption(owner='owner', user=''))
+        output_path = encrypted_path + '.rotated'
+        self.addCleanup(os.remove, output_path)
+
+        pdf_tasks.rotate_pages(encrypted_path, output_path, 180)
+        self.assertTrue(os.path.exists(encrypted_path))
+        with fitz.open(output_path) as doc:
+            self.assertEqual([page.rotation for page in doc], [180, 180])
+
+    def test_repaired_input_is_rewritten(self):
+        # A wrong startxref offset makes MuPDF rebuild the xref table
+        original = make_pdf(2)
+        broken = original[:original.rindex(b'startxref')] + b'startxref\n12\n%%EOF\n'
+        input_path, output_path = self.write_input(broken)
+        pdf_tasks.rotate_pages(input_path, output_path, 90)
+        self.assertTrue(os.path.exists(input_path))
+        with fitz.open(output_path) as doc:
+            self.assertFalse(doc.is_repaired)
+            self.assertEqual([page.rotation for page in doc], [90, 90])
+
+    def test_sign_view(self):
+        import base64
+        from PIL import Image
+        buf = io.BytesIO()
+        Image.new('RGBA', (300, 160), (0, 0, 0, 255)).save(buf, 'PNG')
+        response = Client().post(reverse('sign_pdf_tool'), {
+            'pdf_file': SimpleUploadedFile('contract.pdf', make_pdf(2), content_type='application/pdf'),
+            'signature_data': 'data:image/png;base64,' + base64.b64encode(buf.getvalue()).decode('ascii'),
+        })
+        self.assertIn('contract_signed.pdf', response['Content-Disposition'])
+        with fitz.open(stream=b''.join(response.streaming_content), filetype='pdf') as doc:
+            self.assertEqual(len(doc[0].get_images()), 0)
+            self.assertEqual(len(doc[1].get_images()), 1)
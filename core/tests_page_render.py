@@ -0,0 +1,105 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from unittest import mock
+from concurrent.futures import Future
+import io
+import os
+import tempfile
+import zipfile
+from . import page_render, pdf_tasks, tool_pool
+from .testing import make_pdf
+
+
+class ParallelRenderTest(TestCase):
+    def test_page_ranges_cover_document_in_order(self):
+        with override_settings(TOOL_POOL_WORKERS=4, TOOL_POOL_MIN_PAGES_PER_TASK=8):
+            self.assertEqual(tool_pool.page_ranges(200), [(0, 50), (50, 100), (100, 150), (150, 200)])
+            self.assertEqual(tool_pool.page_ranges(20), [(0, 10), (10, 20)])
+            self.assertEqual(tool_pool.page_ranges(3), [(0, 3)])
+        with override_settings(TOOL_POOL_WORKERS=0):
+            self.assertEqual(tool_pool.page_ranges(200), [(0, 200)])
+
+    def test_streamed_ranges_stay_one_per_worker_ahead(self):
+        submitted = []
+
+        def submit(fn, input_path, start, stop, **kwargs):
+            submitted.append(start)
+            future = Future()
+            future.set_result(start)
+            return future
+
+        with override_settings(TOOL_POOL_WORKERS=3, TOOL_POOL_MIN_PAGES_PER_TASK=2), \
+                mock.patch.object(tool_pool, 'submit', side_effect=submit):
+            stream = tool_pool.stream_page_ranges(pdf_tasks.render_page_images, 'a.pdf', 11)
+            self.assertEqual(submitted, [])
+            self.assertEqual(next(stream)[0], (0, 2))
+            self.assertEqual(submitted, [0, 2, 4])
+            self.assertEqual(next(stream)[0], (2, 4))
+            self.assertEqual(submitted, [0, 2, 4, 6])
+            rest = [page_range for page_range, future in stream]
+        self.assertEqual(rest, [(4, 6), (6, 8), (8, 10), (10, 11)])
+
+    def test_ranges_render_in_workers_and_come_back_in_page_order(self):
+        tool_pool.shutdown()
+        fd, pdf_path = tempfile.mkstemp(suffix='.pdf')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(make_pdf(7))
+        self.addCleanup(os.remove, pdf_path)
+
+        with override_settings(TOOL_POOL_WORKERS=2, TOOL_POOL_MIN_PAGES_PER_TASK=2):
+            try:
+                done = []
+                images = page_render.render_images(pdf_path, progress=done.append)
+            finally:
+                tool_pool.shutdown()
+        self.assertEqual(images, pdf_tasks.render_page_images(pdf_path, 0, 7))
+        self.assertEqual(done[-1], 7)
+
+    def test_pdf_to_ppt_single_file(self):
+        with override_settings(TOOL_POOL_WORKERS=0):
+            response = Client().post(reverse('pdf_to_ppt_tool'), {
+                'pdf_files': SimpleUploadedFile('deck.pdf', make_pdf(3), content_type='application/pdf')
+            })
+        self.assertEqual(response.status_code, 200)
+        from pptx import Presentation
+        self.assertEqual(len(Presentation(io.BytesIO(response.content)).slides), 3)
+
+    def test_pdf_to_ppt_slide_image_settings(self):
+        sizes = {}
+        for image_format, dpi in (('png', '144'), ('jpeg', '144'), ('jpeg', '96')):
+            with override_settings(TOOL_POOL_WORKERS=0):
+                response = Client().post(reverse('pdf_to_ppt_tool'), {
+                    'pdf_files': SimpleUploadedFile('deck.pdf', make_pdf(2), content_type='application/pdf'),
+                    'image_format': image_format,
+                    'dpi': dpi,
+                })
+            from pptx import Presentation
+            picture = Presentation(io.BytesIO(response.content)).slides[0].shapes[0]
+            self.assertEqual(picture.image.ext, 'png' if image_format == 'png' else 'jpg')
+            sizes[image_format, dpi] = len(response.content)
+        self.assertLess(sizes['jpeg', '144'], sizes['png', '144'])
+        self.assertLess(sizes['jpeg', '96'], sizes['jpeg', '144'])
+
+
+class InMemoryJpegTest(TestCase):
+    def test_render_page_images_returns_encoded_images(self):
+        fd, pdf_path = tempfile.mkstemp(suffix='.pdf')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(make_pdf(2))
+        self.addCleanup(os.remove, pdf_path)
+
+        low = pdf_tasks.render_page_images(pdf_path, 0, 2, quality=30)
+        high = pdf_tasks.render_page_images(pdf_path, 0, 2, quality=95)
+        self.assertEqual(len(low), 2)
+        self.assertTrue(all(image.startswith(b'\xff\xd8') for image in low))
+        self.assertLess(len(low[0]), len(high[0]))
+
+    def test_pdf_to_jpg_stores_jpegs_uncompressed(self):
+        response = Client().post(reverse('pdf_to_jpg_tool'), {
+            'pdf_files': SimpleUploadedFile('doc.pdf', make_pdf(2), content_type='application/pdf'),
+            'quality': '60',
+        })
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as zf:
+            self.assertEqual(zf.namelist(), ['doc_page_1.jpg', 'doc_page_2.jpg'])
+            self.assertTrue(all(zf.getinfo(name).compress_type == zipfile.ZIP_STORED for name in zf.namelist()))
@@ -0,0 +1,107 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+import io
+import zipfile
+import fitz
+from .page_selection import parse
+from .testing import make_pdf
+
+
+def pages(spec, page_count=10):
+    return [p + 1 for p in parse(spec).pages(page_count)]
+
+
+class PageSelectionTest(TestCase):
+    def test_numbers_and_ranges(self):
+        self.assertEqual(pages('1, 3-5, 8'), [1, 3, 4, 5, 8])
+        self.assertEqual(pages('3-1'), [3, 2, 1])
+        self.assertEqual(pages('2,2'), [2, 2])
+
+    def test_open_ranges_last_and_negative(self):
+        self.assertEqual(pages('8-'), [8, 9, 10])
+        self.assertEqual(pages('last'), [10])
+        self.assertEqual(pages('-1'), [10])
+        self.assertEqual(pages('-3-last'), [8, 9, 10])
+        self.assertEqual(pages('-3--2'), [8, 9])
+
+    def test_odd_and_even(self):
+        self.assertEqual(pages('odd'), [1, 3, 5, 7, 9])
+        self.assertEqual(pages('even'), [2, 4, 6, 8, 10])
+        self.assertEqual(pages('4-9 odd'), [5, 7, 9])
+        self.assertEqual(pages('10-1 even'), [10, 8, 6, 4, 2])
+
+    def test_out_of_range_is_clipped(self):
+        self.assertEqual(pages('9-20, 50, -50'), [9, 10])
+        self.assertEqual(parse('1-1000000000').resolve(10), [range(0, 10)])
+        self.assertEqual(parse('1-1000000000').count(10), 10)
+
+    def test_merged_and_complement(self):
+        selection = parse('7-9, 1, 2-3, 8')
+        self.assertEqual(selection.merged(10), [range(0, 3), range(6, 9)])
+        self.assertEqual(selection.complement(10), [range(3, 6), range(9, 10)])
+        self.assertEqual(parse('odd, 2').merged(5), [range(0, 3), range(4, 5)])
+
+    def test_merged_parity_runs(self):
+        for spec in ('odd, 2-6', '1-9 odd, 10-3 even, last', '4-17 even, 6-13 odd, 1', 'even, 3, 9-1 odd', '-5-last odd, 1-6 even'):
+            for page_count in (1, 2, 9, 12, 20):
+                selection = parse(spec)
+                expected = sorted(set(selection.pages(page_count)))
+                merged = selection.merged(page_count)
+                self.assertEqual([page for r in merged for page in r], expected, msg=(spec, page_count))
+                self.assertTrue(all(a.stop < b.start for a, b in zip(merged, merged[1:])), msg=(spec, page_count))
+        # Odd and even runs over the same stretch are one interval, without visiting every page
+        self.assertEqual(parse('odd, even').merged(10 ** 12), [range(0, 10 ** 12)])
+        self.assertEqual(parse('1-10 odd, 4-12 even').merged(20), [range(0, 1), range(2, 10), range(11, 12)])
+
+    def test_invalid_specs(self):
+        for spec in ('', ' , ', '0', 'abc', '1-x', '3 odd even', '1--'):
+            with self.assertRaises(ValueError, msg=spec):
+                parse(spec)
+
+    def test_canonical_form(self):
+        self.assertEqual(str(parse(' 1 ,3 - 5, 10-, LAST, even, 2-8 odd')), '1,3-5,10-,last,even,2-8 odd')
+        self.assertEqual(parse('1,3-5'), parse(' 1 , 3-5 '))
+
+
+@override_settings(TOOL_POOL_WORKERS=0)
+class PageSelectionToolsTest(TestCase):
+    def post(self, url_name, **data):
+        data['pdf_files'] = SimpleUploadedFile('doc.pdf', make_pdf(6), content_type='application/pdf')
+        return Client().post(reverse(url_name), data)
+
+    def page_texts(self, response):
+        with fitz.open(stream=b''.join(response.streaming_content), filetype='pdf') as doc:
+            return [page.get_text().strip() for page in doc]
+
+    def test_extract_keeps_written_order(self):
+        response = self.post('extract_pages_tool', pages_to_extract='last, 1-2')
+        self.assertEqual(self.page_texts(response), ['Test Page 6', 'Test Page 1', 'Test Page 2'])
+
+    def test_remove_even_pages(self):
+        response = self.post('remove_pages_tool', pages_to_remove='even')
+        self.assertEqual(self.page_texts(response), ['Test Page 1', 'Test Page 3', 'Test Page 5'])
+
+    def test_remove_all_pages_is_refused(self):
+        response = self.post('remove_pages_tool', pages_to_remove='1-')
+        self.assertEqual(response.status_code, 302)
+
+    def test_invalid_selection_redirects(self):
+        response = self.post('extract_pages_tool', pages_to_extract='first')
+        self.assertEqual(response.status_code, 302)
+
+    def test_rotate_selected_pages(self):
+        response = self.post('rotate_pdf_tool', rotation='90', pages='2, -2-')
+        with fitz.open(stream=b''.join(response.streaming_content), filetype='pdf') as doc:
+            self.assertEqual([page.rotation for page in doc], [0, 90, 0, 0, 90, 90])
+
+    def test_rotate_defaults_to_all_pages(self):
+        response = self.post('rotate_pdf_tool', rotation='180')
+        with fitz.open(stream=b''.join(response.streaming_content), filetype='pdf') as doc:
+            self.assertEqual({page.rotation for page in doc}, {180})
+
+    def test_split_after_open_range(self):
+        response = self.post('split_pdf_tool', split_pages='2, 4-')
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as zf:
+            counts = [fitz.open(stream=zf.read(name), filetype='pdf').page_count for name in sorted(zf.namelist())]
+        self.assertEqual(counts, [2, 2, 1, 1])
@@ -0,0 +1,41 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+import io
+import fitz
+from .testing import make_pdf
+
+
+class TableEngineTest(TestCase):
+    def setUp(self):
+        doc = fitz.open()
+        page = doc.new_page()
+        for r in range(3):
+            for c in range(2):
+                cell = fitz.Rect(72 + c * 100, 100 + r * 20, 172 + c * 100, 120 + r * 20)
+                page.draw_rect(cell, color=(0, 0, 0), width=0.5)
+                page.insert_text((cell.x0 + 3, cell.y1 - 6), f"R{r}C{c}", fontsize=9)
+        self.pdf_content = doc.tobytes()
+        doc.close()
+
+    def convert(self, engine):
+        response = Client().post(reverse('pdf_to_excel_tool'), {
+            'pdf_files': SimpleUploadedFile('table.pdf', self.pdf_content, content_type='application/pdf'),
+            'engine': engine,
+        })
+        self.assertEqual(response.status_code, 200)
+        from openpyxl import load_workbook
+        wb = load_workbook(io.BytesIO(response.content))
+        return wb.sheetnames, [list(row) for row in wb.active.iter_rows(values_only=True)]
+
+    def test_engines_agree(self):
+        expected = [[f"R{r}C{c}" for c in range(2)] for r in range(3)]
+        for engine in ('pymupdf', 'pdfplumber'):
+            sheets, rows = self.convert(engine)
+            self.assertEqual(sheets, ['Page_1_Table_1'])
+            self.assertEqual(rows, expected)
+
+    def test_no_tables_gives_info_sheet(self):
+        self.pdf_content = make_pdf(2)
+        sheets, rows = self.convert('pymupdf')
+        self.assertEqual(sheets, ['Info'])
@@ -0,0 +1,58 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+import io
+import os
+import tempfile
+from . import page_render, tool_pool
+from .testing import make_pdf
+
+
+class PdfToWordTest(TestCase):
+    def docx_text(self, data):
+        from docx import Document
+        return '\n'.join(p.text for p in Document(io.BytesIO(data)).paragraphs)
+
+    def test_page_range(self):
+        with override_settings(TOOL_POOL_WORKERS=0):
+            response = Client().post(reverse('pdf_to_word_tool'), {
+                'pdf_files': SimpleUploadedFile('thesis.pdf', make_pdf(4), content_type='application/pdf'),
+                'page_from': '2',
+                'page_to': '3',
+            })
+        text = self.docx_text(response.content)
+        self.assertIn('Test Page 2', text)
+        self.assertIn('Test Page 3', text)
+        self.assertNotIn('Test Page 1', text)
+        self.assertNotIn('Test Page 4', text)
+
+    def test_invalid_page_range(self):
+        response = Client().post(reverse('pdf_to_word_tool'), {
+            'pdf_files': SimpleUploadedFile('thesis.pdf', make_pdf(2), content_type='application/pdf'),
+            'page_from': '3',
+            'page_to': '1',
+        })
+        self.assertEqual(response.status_code, 302)
+
+    def test_long_document_uses_pdf2docx_multiprocessing(self):
+        tool_pool.shutdown()
+        fd, input_path = tempfile.mkstemp(suffix='.pdf')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(make_pdf(6))
+        output_path = input_path + '.docx'
+        self.addCleanup(os.remove, input_path)
+        self.addCleanup(os.remove, output_path)
+        cwd = os.getcwd()
+
+        with override_settings(TOOL_POOL_WORKERS=1, TOOL_WORD_MP_MIN_PAGES=4, TOOL_WORD_PROCESSES=2):
+            try:
+                done = []
+                page_render.pdf_to_docx(input_path, output_path, progress=done.append)
+            finally:
+                tool_pool.shutdown()
+        with open(output_path, 'rb') as f:
+            text = self.docx_text(f.read())
+        self.assertIn('Test Page 1', text)
+        self.assertIn('Test Page 6', text)
+        self.assertEqual(done, [6])
+        self.assertEqual(os.getcwd(), cwd)
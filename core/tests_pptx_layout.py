@@ -0,0 +1,112 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+import io
+import fitz
+from . import pdf_tasks
+from .testing import OfficeToPdfTests, make_image
+
+
+def make_pptx(slides=1, hidden=False):
+    from pptx import Presentation
+    from pptx.dml.color import RGBColor
+    from pptx.enum.shapes import MSO_SHAPE
+    from pptx.util import Inches, Pt
+    presentation = Presentation()
+    for i in range(slides):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+        slide.shapes.title.text = f'Quarterly review {i + 1}'
+        slide.placeholders[1].text_frame.text = 'Revenue up'
+        slide.shapes.add_picture(io.BytesIO(make_image('JPEG', size=(120, 80))), Inches(5), Inches(1.5), Inches(2))
+        oval = slide.shapes.add_shape(MSO_SHAPE.OVAL, Inches(5), Inches(4), Inches(2), Inches(1))
+        oval.fill.solid()
+        oval.fill.fore_color.rgb = RGBColor(0x20, 0x60, 0xC0)
+        table = slide.shapes.add_table(2, 3, Inches(0.5), Inches(4), Inches(4), Inches(0.8)).table
+        for column, text in enumerate(['Party', 'Share', 'Note']):
+            table.cell(0, column).text = text
+        table.cell(1, 0).text, table.cell(1, 1).text = 'Acme', '50%'
+        box = slide.shapes.add_textbox(Inches(0.5), Inches(6), Inches(4), Inches(0.5)).text_frame
+        box.text = 'Red bold'
+        box.paragraphs[0].runs[0].font.bold = True
+        box.paragraphs[0].runs[0].font.size = Pt(14)
+        box.paragraphs[0].runs[0].font.color.rgb = RGBColor(0xFF, 0, 0)
+    if hidden:
+        slide = presentation.slides.add_slide(presentation.slide_layouts[5])
+        slide.shapes.title.text = 'Hidden slide'
+        slide._element.set('show', '0')
+    buf = io.BytesIO()
+    presentation.save(buf)
+    return buf.getvalue()
+
+
+class PptxToPdfTest(OfficeToPdfTests, TestCase):
+    task = staticmethod(pdf_tasks.pptx_to_pdf)
+    suffix = '.pptx'
+    url_name, field = 'ppt_to_pdf_tool', 'ppt_files'
+    make_document = staticmethod(make_pptx)
+    sample_text = 'Quarterly review 1'
+
+    def test_one_page_per_visible_slide(self):
+        with self.convert(make_pptx(slides=2, hidden=True)) as doc:
+            self.assertEqual(doc.page_count, 2)
+            self.assertEqual((doc[0].rect.width, doc[0].rect.height), (720, 540))
+            self.assertIn('Quarterly review 2', doc[1].get_text())
+            self.assertNotIn('Hidden slide', ''.join(page.get_text() for page in doc))
+
+    def test_shapes_keep_their_places(self):
+        with self.convert(make_pptx()) as doc:
+            page = doc[0]
+            # The title is centred in its placeholder, above the bullet
+            title, bullet = page.search_for('Quarterly review 1')[0], page.search_for('Revenue up')[0]
+            self.assertAlmostEqual((title.x0 + title.x1) / 2, 360, delta=5)
+            self.assertLess(title.y1, bullet.y0)
+            self.assertIn('•', page.get_text())
+            spans = {span['text'].strip(): span for block in page.get_text('dict')['blocks']
+                     for line in block.get('lines', []) for span in line['spans']}
+            self.assertEqual(spans['Red bold']['size'], 14)
+            self.assertIn('Bold', spans['Red bold']['font'])
+            self.assertEqual(spans['Red bold']['color'] & 0xFFFFFF, 0xFF0000)
+            # Table cells sit on one row, in their grid columns
+            party, share = page.search_for('Party')[0], page.search_for('Share')[0]
+            self.assertAlmostEqual(party.y0, share.y0, places=1)
+            self.assertAlmostEqual(share.x0 - party.x0, 96, delta=1)
+            # The oval's fill
+            fills = [tuple(round(c * 255) for c in drawing['fill']) for drawing in page.get_drawings() if drawing['fill']]
+            self.assertIn((0x20, 0x60, 0xC0), fills)
+
+    @override_settings(TOOL_POOL_WORKERS=0, TOOL_CACHE_MAX_BYTES=0)
+    def test_view_draws_slides_only_when_enabled(self):
+        sizes = {}
+        for enabled in (False, True):
+            with override_settings(TOOL_PPTX_SLIDE_RENDERER=enabled):
+                response = Client().post(reverse(self.url_name), {self.field: SimpleUploadedFile('a.pptx', make_pptx())})
+            with fitz.open(stream=b''.join(response.streaming_content), filetype='pdf') as doc:
+                sizes[enabled] = (doc[0].rect.width, doc[0].rect.height)
+        # Platypus lays the text out on letter pages; the renderer keeps the slide size
+        self.assertEqual(sizes, {False: (612, 792), True: (720, 540)})
+
+    def test_jpeg_goes_in_unchanged_and_once(self):
+        with self.convert(make_pptx(slides=2)) as doc:
+            images = doc[0].get_images()
+            self.assertEqual(len(images), 1)
+            self.assertEqual(images[0][-1], 'DCTDecode')
+            self.assertEqual(doc.xref_stream_raw(images[0][0]), make_image('JPEG', size=(120, 80)))
+            self.assertAlmostEqual(doc[0].get_image_rects(images[0][0])[0].x0, 360, delta=1)
+            # The second slide's copy of the picture refers to the same object
+            self.assertEqual(doc[1].get_images()[0][0], images[0][0])
+
+    def test_long_text_wraps_inside_its_shape(self):
+        from pptx import Presentation
+        from pptx.util import Inches
+        presentation = Presentation()
+        slide = presentation.slides.add_slide(presentation.slide_layouts[6])
+        box = slide.shapes.add_textbox(Inches(1), Inches(1), Inches(3), Inches(1)).text_frame
+        box.word_wrap = True
+        box.text = 'word ' * 60
+        buf = io.BytesIO()
+        presentation.save(buf)
+        with self.convert(buf.getvalue()) as doc:
+            words = doc[0].search_for('word')
+            self.assertEqual(len(words), 60)
+            self.assertLessEqual(max(rect.x1 for rect in words), 4 * 72)
+            self.assertGreater(len({round(rect.y0) for rect in words}), 5)
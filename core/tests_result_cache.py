@@ -0,0 +1,122 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth.models import User
+import os
+import shutil
+import tempfile
+from . import result_cache, tool_metrics
+from .testing import make_pdf
+
+
+class ResultCacheTest(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.override = override_settings(TOOL_CACHE_DIR=self.cache_dir, TOOL_CACHE_MAX_BYTES=1024)
+        self.override.enable()
+        result_cache.clear()
+        tool_metrics.reset()
+
+    def tearDown(self):
+        result_cache.clear()
+        self.override.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def write_artifact(self, size):
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b'x' * size)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_key_depends_on_inputs_and_params(self):
+        key = result_cache.make_key('rotate_pdf', ['abc'], rotation=90)
+        self.assertEqual(key, result_cache.make_key('rotate_pdf', ['abc'], rotation=90))
+        self.assertNotEqual(key, result_cache.make_key('rotate_pdf', ['abc'], rotation=180))
+        self.assertNotEqual(key, result_cache.make_key('rotate_pdf', ['abd'], rotation=90))
+        self.assertNotEqual(key, result_cache.make_key('compress_pdf', ['abc'], rotation=90))
+
+    def test_put_then_get(self):
+        key = result_cache.make_key('compress_pdf', ['abc'])
+        self.assertIsNone(result_cache.get(key))
+        result_cache.put(key, self.write_artifact(100))
+        path = result_cache.get(key)
+        with open(path, 'rb') as f:
+            self.assertEqual(len(f.read()), 100)
+        self.assertEqual(tool_metrics.get('cache.hit'), 1)
+        self.assertEqual(tool_metrics.get('cache.miss'), 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        keys = [result_cache.make_key('compress_pdf', [str(i)]) for i in range(3)]
+        result_cache.put(keys[0], self.write_artifact(400))
+        result_cache.put(keys[1], self.write_artifact(400))
+        result_cache.get(keys[0])  # keys[1] is now the oldest
+        result_cache.put(keys[2], self.write_artifact(400))
+
+        self.assertIsNotNone(result_cache.get(keys[0]))
+        self.assertIsNone(result_cache.get(keys[1]))
+        self.assertIsNotNone(result_cache.get(keys[2]))
+        self.assertLessEqual(result_cache.stats()['bytes'], 1024)
+
+    def test_expired_entry_is_dropped(self):
+        key = result_cache.make_key('compress_pdf', ['abc'])
+        result_cache.put(key, self.write_artifact(10))
+        with override_settings(TOOL_CACHE_TTL_SECONDS=-1):
+            self.assertIsNone(result_cache.get(key))
+        self.assertEqual(tool_metrics.get('cache.expired'), 1)
+
+    def test_index_is_rebuilt_from_disk(self):
+        key = result_cache.make_key('compress_pdf', ['abc'])
+        result_cache.put(key, self.write_artifact(10))
+        result_cache._index = None  # fresh process
+        self.assertIsNotNone(result_cache.get(key))
+
+    def test_disabled_cache_stores_nothing(self):
+        with override_settings(TOOL_CACHE_MAX_BYTES=0):
+            key = result_cache.make_key('compress_pdf', ['abc'])
+            result_cache.put(key, self.write_artifact(10))
+            self.assertIsNone(result_cache.get(key))
+
+
+class CachedToolViewTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.cache_dir = tempfile.mkdtemp()
+        self.override = override_settings(TOOL_CACHE_DIR=self.cache_dir, TOOL_POOL_WORKERS=0)
+        self.override.enable()
+        result_cache.clear()
+        tool_metrics.reset()
+        self.pdf_content = make_pdf(3)
+
+    def tearDown(self):
+        result_cache.clear()
+        self.override.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_repeat_compress_is_served_from_cache(self):
+        first = self.client.post(reverse('compress_pdf_tool'), {'pdf_files': SimpleUploadedFile('a.pdf', self.pdf_content)})
+        second = self.client.post(reverse('compress_pdf_tool'), {'pdf_files': SimpleUploadedFile('a.pdf', self.pdf_content)})
+        self.assertEqual(second.status_code, 200)
+        self.assertIn('compressed_a.pdf', second['Content-Disposition'])
+        self.assertEqual(b''.join(second.streaming_content), first.content)
+        self.assertEqual(tool_metrics.get('cache.hit'), 1)
+
+    def test_different_parameters_miss(self):
+        for angle in ('90', '180'):
+            self.client.post(reverse('rotate_pdf_tool'), {
+                'pdf_files': SimpleUploadedFile('a.pdf', self.pdf_content),
+                'rotation': angle,
+            })
+        self.assertEqual(tool_metrics.get('cache.hit'), 0)
+        self.assertEqual(result_cache.stats()['entries'], 2)
+
+    def test_metrics_endpoint_is_staff_only(self):
+        user = User.objects.create_user('viewer', password='pw')
+        self.client.login(username='viewer', password='pw')
+        self.assertEqual(self.client.get(reverse('order_panel_tool_metrics')).status_code, 404)
+
+        user.is_staff = True
+        user.save()
+        data = self.client.get(reverse('order_panel_tool_metrics')).json()
+        self.assertIn('cache', data)
+        self.assertIn('counters', data)
@@ -0,0 +1,73 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+import io
+import os
+import tempfile
+import zipfile
+import fitz
+from . import pdf_tasks
+from .testing import make_pdf, make_image
+
+
+@override_settings(TOOL_POOL_WORKERS=0)
+class SignPdfTest(TestCase):
+    def signature(self):
+        return make_image('PNG', size=(120, 60))
+
+    def sign(self, data, placements=None, selection=None):
+        fd, input_path = tempfile.mkstemp(suffix='.pdf')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        output_path = input_path + '.signed'
+        self.addCleanup(lambda: os.path.exists(input_path) and os.remove(input_path))
+        self.addCleanup(lambda: os.path.exists(output_path) and os.remove(output_path))
+        pdf_tasks.sign_pdf(input_path, output_path, self.signature(), placements, selection)
+        return fitz.open(output_path)
+
+    def test_every_page_shares_one_image(self):
+        from .page_selection import parse
+        placements = pdf_tasks.parse_placements('50,60; 300,700,100,50')
+        with self.sign(make_pdf(6), placements, parse('1-')) as doc:
+            xrefs = {image[0] for page in doc for image in page.get_images()}
+            self.assertEqual(len(xrefs), 1)
+            self.assertEqual(len(doc[3].get_image_rects(xrefs.pop())), 2)
+            images = [x for x in range(1, doc.xref_length()) if doc.xref_get_key(x, 'Subtype')[1] == '/Image']
+            self.assertEqual(len(images), 1)
+
+    def test_default_is_last_page_bottom_right(self):
+        with self.sign(make_pdf(3)) as doc:
+            self.assertEqual([len(page.get_images()) for page in doc], [0, 0, 1])
+            rect = doc[2].get_image_rects(doc[2].get_images()[0][0])[0]
+            self.assertAlmostEqual(rect.x1, doc[2].rect.width - pdf_tasks.SIGNATURE_MARGIN, places=3)
+
+    def test_placement_on_rotated_page(self):
+        source = fitz.open(stream=make_pdf(1), filetype='pdf')
+        source[0].set_rotation(90)
+        with self.sign(source.tobytes(), [(10, 20, 100, 50)]) as doc:
+            # get_image_rects is unrotated; map it onto the page as displayed
+            rect = doc[0].get_image_rects(doc[0].get_images()[0][0])[0] * doc[0].rotation_matrix
+            self.assertEqual([round(v) for v in rect], [10, 20, 110, 70])
+
+    def test_parse_placements(self):
+        self.assertEqual(pdf_tasks.parse_placements(' 10,20 ;; 1.5,2,30,40 '), [(10, 20, 150, 80), (1.5, 2, 30, 40)])
+        for spec in ('10', '10,x', '1,2,0,5', '1,2,3', 'nan,1'):
+            with self.assertRaises(ValueError, msg=spec):
+                pdf_tasks.parse_placements(spec)
+
+    def post(self, files, **data):
+        import base64
+        data['pdf_file'] = [SimpleUploadedFile(name, make_pdf(2), content_type='application/pdf') for name in files]
+        data['signature_data'] = 'data:image/png;base64,' + base64.b64encode(self.signature()).decode('ascii')
+        return Client().post(reverse('sign_pdf_tool'), data)
+
+    def test_batch_view(self):
+        response = self.post(['a.pdf', 'b.pdf'], pages='1', placements='72,72')
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as zf:
+            self.assertEqual(sorted(zf.namelist()), ['a_signed.pdf', 'b_signed.pdf', 'manifest.csv'])
+            with fitz.open(stream=zf.read('a_signed.pdf'), filetype='pdf') as doc:
+                self.assertEqual([len(page.get_images()) for page in doc], [1, 0])
+
+    def test_invalid_placement_redirects(self):
+        response = self.post(['a.pdf'], placements='top right')
+        self.assertEqual(response.status_code, 302)
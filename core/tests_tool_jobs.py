@@ -0,0 +1,131 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
+import shutil
+import tempfile
+import zipfile
+import io
+from unittest import mock
+from . import budgets, tool_jobs
+from .models import ToolJob, ToolJobInput
+from .testing import make_pdf
+
+TEMP_MEDIA = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA, TOOL_JOB_WORKER=True)
+class ToolJobTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.pdf_content = make_pdf(2)
+
+    def submit(self, url_name, files):
+        return self.client.post(reverse(url_name), {'pdf_files': files, 'mode': 'job'})
+
+    def run_worker(self):
+        call_command('run_tool_jobs', '--once', stdout=StringIO())
+
+    def test_upload_returns_job_immediately(self):
+        response = self.submit('pdf_to_excel_tool', SimpleUploadedFile('t.pdf', self.pdf_content))
+        self.assertEqual(response.status_code, 202)
+        data = response.json()
+        self.assertEqual(data['status'], 'queued')
+        job = ToolJob.objects.get(id=data['job_id'])
+        self.assertEqual(job.inputs.count(), 1)
+
+    def test_switch_is_offered_off_and_only_with_a_worker(self):
+        page = self.client.get(reverse('pdf_to_word_tool')).content.decode()
+        self.assertIn('id="jobModeSwitch">', page)
+        with override_settings(TOOL_JOB_WORKER=False):
+            page = self.client.get(reverse('pdf_to_word_tool')).content.decode()
+        self.assertNotIn('jobModeSwitch', page)
+
+    @override_settings(TOOL_JOB_WORKER=False, TOOL_POOL_WORKERS=0)
+    def test_without_a_worker_the_file_is_converted_right_away(self):
+        response = self.submit('pdf_to_excel_tool', SimpleUploadedFile('t.pdf', self.pdf_content))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('t.xlsx', response['Content-Disposition'])
+        self.assertFalse(ToolJob.objects.exists())
+
+    def test_worker_completes_job_and_serves_result(self):
+        response = self.submit('pdf_to_ppt_tool', SimpleUploadedFile('slides.pdf', self.pdf_content))
+        status_url = response.json()['status_url']
+
+        self.run_worker()
+
+        data = self.client.get(status_url).json()
+        self.assertEqual(data['status'], 'done')
+        self.assertEqual(data['progress'], 2)
+        self.assertEqual(data['total'], 2)
+        # Inputs are dropped once processed
+        self.assertFalse(ToolJobInput.objects.exists())
+
+        download = self.client.get(data['download_url'])
+        self.assertEqual(download.status_code, 200)
+        self.assertIn('slides.pptx', download['Content-Disposition'])
+
+    def test_batch_job_produces_zip(self):
+        response = self.submit('pdf_to_excel_tool', [
+            SimpleUploadedFile('a.pdf', self.pdf_content),
+            SimpleUploadedFile('b.pdf', self.pdf_content),
+        ])
+        self.run_worker()
+        data = self.client.get(response.json()['status_url']).json()
+        download = self.client.get(data['download_url'])
+        content = b''.join(download.streaming_content)
+        with zipfile.ZipFile(io.BytesIO(content)) as zf:
+            self.assertEqual(sorted(zf.namelist()), ['a.xlsx', 'b.xlsx'])
+
+    def test_corrupt_input_fails_job(self):
+        response = self.submit('pdf_to_word_tool', SimpleUploadedFile('bad.pdf', b'not a pdf'))
+        self.run_worker()
+        data = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(data['status'], 'failed')
+        # Users get a plain message, not the exception's text
+        self.assertEqual(data['error'], tool_jobs.FAILED_ERROR)
+        self.assertNotIn('download_url', data)
+
+    def test_budget_message_is_kept(self):
+        def too_long(*args, **kwargs):
+            raise budgets.exceeded('wall_time', budgets.TOO_LONG)
+
+        response = self.submit('pdf_to_word_tool', SimpleUploadedFile('a.pdf', self.pdf_content))
+        with mock.patch.dict(tool_jobs.JOB_TOOLS, {'pdf_to_word': (too_long, '.docx', 'word.zip')}):
+            self.run_worker()
+        self.assertEqual(self.client.get(response.json()['status_url']).json()['error'], budgets.TOO_LONG)
+
+    def test_oversized_upload_is_refused_before_queueing(self):
+        big = SimpleUploadedFile('big.pdf', self.pdf_content + b'\0' * (100 * 1024 * 1024))
+        response = self.submit('pdf_to_ppt_tool', [SimpleUploadedFile('small.pdf', self.pdf_content), big])
+        self.assertRedirects(response, reverse('pdf_to_ppt_tool'), fetch_redirect_response=False)
+        self.assertFalse(ToolJob.objects.exists())
+
+    @override_settings(TOOL_JOB_BUDGET_SECONDS=60, TOOL_JOB_STALE_GRACE_SECONDS=30)
+    def test_job_left_running_by_a_dead_worker_is_failed(self):
+        stale_id = self.submit('pdf_to_word_tool', SimpleUploadedFile('a.pdf', self.pdf_content)).json()['job_id']
+        live_id = self.submit('pdf_to_word_tool', SimpleUploadedFile('b.pdf', self.pdf_content)).json()['job_id']
+        ToolJob.objects.filter(id=stale_id).update(status='running', started_at=timezone.now() - timedelta(seconds=91))
+        ToolJob.objects.filter(id=live_id).update(status='running', started_at=timezone.now() - timedelta(seconds=60))
+
+        self.run_worker()
+
+        stale = ToolJob.objects.get(id=stale_id)
+        self.assertEqual(stale.status, 'failed')
+        self.assertIn('interrupted', stale.error)
+        self.assertFalse(stale.inputs.exists())
+        self.assertEqual(ToolJob.objects.get(id=live_id).status, 'running')
+
+    def test_download_before_done_is_404(self):
+        response = self.submit('pdf_to_word_tool', SimpleUploadedFile('t.pdf', self.pdf_content))
+        job_id = response.json()['job_id']
+        download = self.client.get(reverse('tool_job_download', args=[job_id]))
+        self.assertEqual(download.status_code, 404)
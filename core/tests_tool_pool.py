@@ -0,0 +1,133 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from unittest import mock
+from concurrent.futures.process import BrokenProcessPool
+import io
+import os
+import subprocess
+import sys
+import time
+import zipfile
+import fitz
+from . import pdf_tasks, tool_pool
+from .testing import make_pdf
+
+
+class ToolPoolTest(TestCase):
+    def test_worker_modules_import_without_django(self):
+        modules = 'pdf_tasks', 'budgets', 'pdf_writer', 'page_selection', 'docx_layout', 'xlsx_layout', 'pptx_layout'
+        code = (
+            'import sys\n'
+            + ''.join(f'import core.{name}\n' for name in modules)
+            + 'print(sorted(name for name in sys.modules if name.split(".")[0] == "django"))'
+        )
+        env = {key: value for key, value in os.environ.items() if key != 'DJANGO_SETTINGS_MODULE'}
+        cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run([sys.executable, '-c', code], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), '[]')
+
+    def test_inline_mode_runs_on_calling_process(self):
+        with override_settings(TOOL_POOL_WORKERS=0):
+            self.assertEqual(tool_pool.run(pdf_tasks.noop), os.getpid())
+
+    def test_inline_mode_propagates_errors(self):
+        with override_settings(TOOL_POOL_WORKERS=0):
+            future = tool_pool.submit(pdf_tasks.compress_pdf, '/nonexistent.pdf', '/tmp/out.pdf')
+            with self.assertRaises(Exception):
+                future.result()
+
+    def test_pool_mode_runs_in_child_process(self):
+        tool_pool.shutdown()
+        with override_settings(TOOL_POOL_WORKERS=1, TOOL_POOL_MAX_TASKS_PER_CHILD=2):
+            try:
+                pids = {tool_pool.run(pdf_tasks.noop) for _ in range(4)}
+            finally:
+                tool_pool.shutdown()
+        self.assertNotIn(os.getpid(), pids)
+        # Children are recycled after two jobs each
+        self.assertGreater(len(pids), 1)
+
+    def test_killing_a_stuck_pool(self):
+        tool_pool.shutdown()
+        self.addCleanup(tool_pool.shutdown)
+        with override_settings(TOOL_POOL_WORKERS=1):
+            future = tool_pool.submit(time.sleep, 30)
+            pool = future.pool
+            # Only a task already handed to a child is stuck; a queued one is just cancelled
+            while not future.running():
+                time.sleep(0.01)
+            children = list(pool._processes.values())
+            started = time.monotonic()
+            tool_pool._kill_pool(pool)
+            with self.assertRaises(BrokenProcessPool):
+                future.result(timeout=10)
+            self.assertLess(time.monotonic() - started, 10)
+            for child in children:
+                child.join(5)
+                self.assertFalse(child.is_alive())
+            # The next task gets a fresh pool
+            self.assertNotEqual(tool_pool.run(pdf_tasks.noop), os.getpid())
+            self.assertIsNot(tool_pool.get_pool(), pool)
+
+    def test_pool_without_reachable_children_is_abandoned(self):
+        tool_pool.shutdown()
+        self.addCleanup(tool_pool.shutdown)
+        with override_settings(TOOL_POOL_WORKERS=1):
+            pool = tool_pool.get_pool()
+            with mock.patch.object(pool, '_processes', None):
+                tool_pool._kill_pool(pool)
+            self.assertIsNot(tool_pool.get_pool(), pool)
+
+
+class PoolBackedToolsTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.pdf_content = make_pdf(3)
+
+    def get_pdf_file(self, name='test.pdf'):
+        return SimpleUploadedFile(name, self.pdf_content, content_type='application/pdf')
+
+    def test_merge_pdf(self):
+        response = self.client.post(reverse('merge_pdf_tool'), {
+            'pdf_files': [self.get_pdf_file('a.pdf'), self.get_pdf_file('b.pdf')]
+        })
+        self.assertEqual(response.status_code, 200)
+        with fitz.open(stream=b''.join(response.streaming_content), filetype='pdf') as doc:
+            self.assertEqual(doc.page_count, 6)
+
+    def test_merge_pdf_large_job_uses_bounded_merge(self):
+        with override_settings(TOOL_MERGE_BATCH_SIZE=2, TOOL_POOL_WORKERS=0):
+            response = self.client.post(reverse('merge_pdf_tool'), {
+                'pdf_files': [self.get_pdf_file(f'{i}.pdf') for i in range(9)]
+            })
+        with fitz.open(stream=b''.join(response.streaming_content), filetype='pdf') as doc:
+            self.assertEqual(doc.page_count, 27)
+            self.assertEqual(doc[3].get_text().strip(), 'Test Page 1')
+
+    def test_split_pdf(self):
+        response = self.client.post(reverse('split_pdf_tool'), {
+            'pdf_files': self.get_pdf_file(),
+            'split_pages': '1'
+        })
+        self.assertEqual(response.status_code, 200)
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as zf:
+            self.assertEqual(sorted(zf.namelist()), ['test_part_1.pdf', 'test_part_2.pdf'])
+
+    def test_compress_pdf_batch(self):
+        response = self.client.post(reverse('compress_pdf_tool'), {
+            'pdf_files': [self.get_pdf_file('a.pdf'), self.get_pdf_file('b.pdf')]
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        # Reading the stream to the end closes the response, which frees its admission slot
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as zf:
+            self.assertIn('compressed_a.pdf', zf.namelist())
+
+    def test_pdf_to_jpg(self):
+        response = self.client.post(reverse('pdf_to_jpg_tool'), {
+            'pdf_files': self.get_pdf_file()
+        })
+        self.assertEqual(response.status_code, 200)
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as zf:
+            self.assertEqual(len(zf.namelist()), 3)
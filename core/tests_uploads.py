@@ -0,0 +1,98 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from unittest import mock
+import os
+import fitz
+import io
+from . import pdf_tasks, tool_metrics, uploads
+from .testing import make_pdf
+
+DATA = b'%PDF-1.4 stand-in bytes ' * 1000
+
+
+def spooled_upload(data=DATA, name='a.pdf'):
+    upload = TemporaryUploadedFile(name, 'application/pdf', len(data), None)
+    upload.write(data)
+    upload.seek(0)
+    return upload
+
+
+class UploadsTest(TestCase):
+    def setUp(self):
+        tool_metrics.reset()
+        self.temp_files = []
+
+    def tearDown(self):
+        for path in self.temp_files:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_spooled_upload_is_linked_not_copied(self):
+        upload = spooled_upload()
+        path = uploads.upload_path(upload, '.pdf', self.temp_files)
+        self.assertEqual(self.temp_files, [path])
+        self.assertTrue(path.endswith('.pdf'))
+        self.assertTrue(os.path.samefile(path, upload.temporary_file_path()))
+        self.assertEqual(tool_metrics.get('upload.linked'), 1)
+        # Still there once Django has closed (and deleted) its own file
+        upload.close()
+        self.assertEqual(self.read(path), DATA)
+
+    def test_editing_tools_leave_the_upload_alone(self):
+        from PIL import Image
+        buf = io.BytesIO()
+        Image.new('RGB', (30, 20)).save(buf, 'PNG')
+        original = make_pdf(2)
+        edits = (
+            (pdf_tasks.rotate_pages, (90,)),
+            (pdf_tasks.add_page_numbers, ()),
+            (pdf_tasks.sign_pdf, (buf.getvalue(),)),
+        )
+        for task, args in edits:
+            upload = spooled_upload(original)
+            path = uploads.upload_path(upload, '.pdf', self.temp_files)
+            output_path = path + '.out'
+            self.temp_files.append(output_path)
+            task(path, output_path, *args)
+            self.assertEqual(self.read(upload.temporary_file_path()), original, task.__name__)
+            self.assertNotEqual(self.read(output_path), original)
+            upload.close()
+
+    def test_copy_when_the_link_fails(self):
+        upload = spooled_upload()
+        with mock.patch.object(uploads.os, 'link', side_effect=OSError('cross-device link')):
+            path = uploads.upload_path(upload, '.pdf', self.temp_files)
+        self.assertFalse(os.path.samefile(path, upload.temporary_file_path()))
+        self.assertEqual(self.read(path), DATA)
+        self.assertEqual(tool_metrics.get('upload.copied'), 1)
+        upload.close()
+
+    def test_in_memory_upload_is_written_once(self):
+        upload = SimpleUploadedFile('a.pdf', DATA)
+        path = uploads.upload_path(upload, '.pdf', self.temp_files)
+        self.assertEqual(self.read(path), DATA)
+        self.assertEqual(tool_metrics.get('upload.spooled'), 1)
+        upload.close()  # no buffer left exported
+
+    def test_buffers(self):
+        for upload in (SimpleUploadedFile('a.pdf', DATA), spooled_upload(), spooled_upload(b'')):
+            expected = DATA if upload.size else b''
+            with uploads.upload_buffer(upload) as content:
+                self.assertTrue(content.readonly)
+                self.assertEqual(bytes(content), expected)
+            upload.close()
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0, TOOL_POOL_WORKERS=0, TOOL_CACHE_MAX_BYTES=0)
+    def test_tool_view_reads_the_spooled_upload(self):
+        response = Client().post(reverse('rotate_pdf_tool'), {
+            'pdf_files': SimpleUploadedFile('a.pdf', make_pdf(2)), 'rotation': '90',
+        })
+        with fitz.open(stream=b''.join(response.streaming_content), filetype='pdf') as doc:
+            self.assertEqual(doc[0].rotation, 90)
+        self.assertEqual(tool_metrics.get('upload.linked'), 1)
+        self.assertEqual(tool_metrics.get('upload.spooled'), 0)
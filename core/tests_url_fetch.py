@@ -0,0 +1,169 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+import fitz
+from . import url_fetch
+from .testing import make_image
+
+PAGE = '<html><body><h1>Stand-in page</h1><p>Fetched over HTTP.</p></body></html>'.encode('utf-8')
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so connection reuse is visible
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, body, status=200, content_type='text/html; charset=utf-8', **headers):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name.replace('_', '-'), value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.client_address[1], dict(self.headers)))
+        if self.path == '/etag':
+            if self.headers.get('If-None-Match') == '"v1"':
+                self.send_response(304)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_body(PAGE, ETag='"v1"')
+        elif self.path == '/modified':
+            if self.headers.get('If-Modified-Since') == 'Wed, 01 Jan 2025 00:00:00 GMT':
+                self.send_response(304)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_body(PAGE, Last_Modified='Wed, 01 Jan 2025 00:00:00 GMT')
+        elif self.path == '/with-images':
+            self.send_body(b'<h1>Gallery</h1><img src="pixel.png"><img src=\'/pixel.png\'><img src="/missing.png">')
+        elif self.path == '/pixel.png':
+            self.send_body(make_image('PNG'), content_type='image/png')
+        elif self.path == '/no-store':
+            self.send_body(PAGE, Cache_Control='no-store')
+        elif self.path == '/declared-large':
+            self.send_body(b'x' * 4096)
+        elif self.path == '/chunked-large':
+            self.send_response(200)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for _ in range(8):
+                self.wfile.write(b'400\r\n' + b'x' * 1024 + b'\r\n')
+            self.wfile.write(b'0\r\n\r\n')
+        elif self.path == '/slow':
+            self.send_response(200)
+            self.send_header('Content-Length', '100')
+            self.end_headers()
+            try:
+                for _ in range(100):
+                    self.wfile.write(b'x')
+                    self.wfile.flush()
+                    time.sleep(0.05)
+            except OSError:
+                pass
+        else:
+            self.send_body(b'missing', status=404)
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # the fetcher hangs up on oversized and slow responses on purpose
+
+
+@override_settings(TOOL_FETCH_MAX_BYTES=2048, TOOL_FETCH_DEADLINE_SECONDS=5, TOOL_FETCH_CACHE_MAX_BYTES=1024 * 1024)
+class UrlFetchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = StandInServer(('127.0.0.1', 0), StandInHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        url_fetch.clear()
+        self.server.requests = []
+
+    def test_fresh_page_skips_the_network(self):
+        first = url_fetch.fetch(self.base + '/etag')
+        second = url_fetch.fetch(self.base + '/etag')
+        self.assertIn('Stand-in page', second.text())
+        self.assertIs(first, second)
+        self.assertEqual(len(self.server.requests), 1)
+
+    @override_settings(TOOL_FETCH_FRESH_SECONDS=0)
+    def test_stale_page_is_revalidated_by_etag(self):
+        url_fetch.fetch(self.base + '/etag')
+        page = url_fetch.fetch(self.base + '/etag')
+        self.assertEqual(page.content, PAGE)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.server.requests[1][2].get('If-None-Match'), '"v1"')
+
+    @override_settings(TOOL_FETCH_FRESH_SECONDS=0)
+    def test_stale_page_is_revalidated_by_last_modified(self):
+        url_fetch.fetch(self.base + '/modified')
+        self.assertEqual(url_fetch.fetch(self.base + '/modified').content, PAGE)
+        self.assertIn('If-Modified-Since', self.server.requests[1][2])
+
+    def test_no_store_is_not_cached(self):
+        url_fetch.fetch(self.base + '/no-store')
+        url_fetch.fetch(self.base + '/no-store')
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_connections_are_reused(self):
+        url_fetch.fetch(self.base + '/no-store')
+        url_fetch.fetch(self.base + '/modified')
+        ports = {port for _, port, _ in self.server.requests}
+        self.assertEqual(len(ports), 1)
+
+    def test_size_limit(self):
+        for path in ('/declared-large', '/chunked-large'):
+            with self.assertRaisesRegex(ValueError, 'larger than', msg=path):
+                url_fetch.fetch(self.base + path)
+
+    @override_settings(TOOL_FETCH_DEADLINE_SECONDS=0.5)
+    def test_deadline(self):
+        start = time.monotonic()
+        with self.assertRaisesRegex(ValueError, 'too long'):
+            url_fetch.fetch(self.base + '/slow')
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            url_fetch.fetch('file:///etc/passwd')
+        with self.assertRaises(url_fetch.requests.HTTPError):
+            url_fetch.fetch(self.base + '/missing')
+
+    def test_fetch_images(self):
+        html, images = url_fetch.fetch_images(
+            '<img src="pixel.png"><img src=\'/pixel.png\'><img src="/missing.png"><img src="data:,">',
+            self.base + '/with-images',
+        )
+        self.assertEqual(list(images), ['image0'])
+        self.assertEqual(html, '<img src="image0"><img src=\'image0\'><img src="/missing.png"><img src="data:,">')
+        self.assertEqual([path for path, _, _ in self.server.requests], ['/pixel.png', '/missing.png'])
+
+    def test_html_to_pdf_view_keeps_images(self):
+        response = Client().post(reverse('html_to_pdf_tool'), {'conversion_type': 'url', 'url': self.base + '/with-images'})
+        with fitz.open(stream=b''.join(response.streaming_content), filetype='pdf') as doc:
+            # Both references to pixel.png; the missing image is left out
+            self.assertEqual(len(doc[0].get_image_info()), 2)
+
+    def test_html_to_pdf_view(self):
+        response = Client().post(reverse('html_to_pdf_tool'), {'conversion_type': 'url', 'url': self.base + '/etag'})
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        with fitz.open(stream=b''.join(response.streaming_content), filetype='pdf') as doc:
+            self.assertIn('Stand-in page', doc[0].get_text())
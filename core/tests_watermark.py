@@ -0,0 +1,80 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+import os
+import tempfile
+import fitz
+from . import pdf_tasks
+from .testing import make_pdf
+
+
+class WatermarkTest(TestCase):
+    def write_pdf(self, data):
+        fd, path = tempfile.mkstemp(suffix='.pdf')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def watermark(self, input_path, **options):
+        output_path = self.write_pdf(b'')
+        pdf_tasks.add_watermark(input_path, output_path, **options)
+        return output_path
+
+    def test_every_page_is_stamped_upright(self):
+        doc = fitz.open(stream=make_pdf(4), filetype='pdf')
+        doc[2].set_rotation(90)
+        input_path = self.write_pdf(doc.tobytes())
+        with fitz.open(self.watermark(input_path, text='DRAFT', rotation=0, opacity=0.5)) as out:
+            directions = []
+            for page in out:
+                lines = [line for block in page.get_text('dict')['blocks'] for line in block.get('lines', [])
+                         if ''.join(span['text'] for span in line['spans']) == 'DRAFT']
+                self.assertEqual(len(lines), 1)
+                # Text directions are reported in unrotated page space
+                m = page.rotation_matrix
+                direction = fitz.Point(lines[0]['dir']) * m - fitz.Point(0, 0) * m
+                directions.append((round(direction.x, 3) + 0.0, round(direction.y, 3) + 0.0))
+            self.assertEqual(set(directions), {(1.0, 0.0)})
+
+    def test_output_growth_is_flat(self):
+        growth = {}
+        for pages in (20, 200):
+            input_path = self.write_pdf(make_pdf(pages))
+            plain_path = self.write_pdf(b'')
+            with fitz.open(input_path) as doc:
+                doc.save(plain_path, garbage=1, deflate=True)
+            growth[pages] = os.path.getsize(self.watermark(input_path, text='DRAFT', tile=True)) - os.path.getsize(plain_path)
+        # The stamp itself is stored once; each extra page only adds references to it
+        self.assertLess((growth[200] - growth[20]) / 180, 100)
+
+    def test_image_watermark_is_stored_once(self):
+        from PIL import Image
+        image_path = self.write_pdf(b'')
+        Image.new('RGBA', (120, 60), (0, 0, 200, 255)).save(image_path, 'PNG')
+        output = self.watermark(self.write_pdf(make_pdf(5)), image_path=image_path, opacity=0.5, tile=True)
+        with fitz.open(output) as doc:
+            images = [x for x in range(1, doc.xref_length()) if doc.xref_get_key(x, 'Subtype')[1] == '/Image']
+            # One image plus its soft mask (the alpha channel)
+            self.assertEqual(len(images), 2)
+            self.assertEqual(len([x for x in images if doc.xref_get_key(x, 'SMask')[0] == 'xref']), 1)
+            # Half-transparent blue over white
+            pix = doc[4].get_pixmap()
+            colours = {pix.pixel(x, y) for x in range(0, pix.width, 7) for y in range(0, pix.height, 7)}
+            self.assertTrue(any(b > 200 and 100 < r < 160 for r, g, b in colours))
+
+    def test_view_accepts_style_options(self):
+        response = Client().post(reverse('add_watermark_tool'), {
+            'pdf_files': SimpleUploadedFile('a.pdf', make_pdf(2), content_type='application/pdf'),
+            'watermark_text': 'SAMPLE', 'rotation': '-45', 'opacity': '0.6', 'tile': 'on',
+        })
+        self.assertEqual(response.status_code, 200)
+        with fitz.open(stream=b''.join(response.streaming_content), filetype='pdf') as doc:
+            self.assertIn('SAMPLE', doc[1].get_text())
+
+    def test_view_rejects_bad_opacity(self):
+        response = Client().post(reverse('add_watermark_tool'), {
+            'pdf_files': SimpleUploadedFile('a.pdf', make_pdf(1), content_type='application/pdf'),
+            'opacity': '3',
+        })
+        self.assertEqual(response.status_code, 302)
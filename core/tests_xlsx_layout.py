@@ -0,0 +1,81 @@
+from django.test import TestCase
+import io
+from . import pdf_tasks, xlsx_layout
+from .testing import OfficeToPdfTests
+
+
+def make_xlsx(rows=3, wide=False):
+    import datetime
+    import openpyxl
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Orders')
+    extra = [f'Extra column {i}' for i in range(12)] if wide else []
+    sheet.append(['Id', 'Customer', 'Amount', 'Ordered', 'Note'] + extra)
+    for i in range(rows):
+        sheet.append([i + 1, f'Customer {i + 1}', 12.5 * (i + 1), datetime.datetime(2024, 1, 1), 'x' * 300]
+                     + [f'value {i}-{j}' for j in range(len(extra))])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+class ExcelToPdfTest(OfficeToPdfTests, TestCase):
+    task = staticmethod(pdf_tasks.xlsx_to_pdf)
+    suffix = '.xlsx'
+    url_name, field = 'excel_to_pdf_tool', 'excel_files'
+    make_document = staticmethod(make_xlsx)
+    sample_text = 'Customer 3'
+
+    def test_header_repeats_on_every_page(self):
+        rows = xlsx_layout.ROWS_PER_PAGE * 2 + 1
+        with self.convert(make_xlsx(rows=rows)) as doc:
+            self.assertEqual(doc.page_count, 3)
+            for page in doc:
+                self.assertTrue(page.search_for('Customer'), page.number)
+            self.assertIn(f'Customer {rows}', doc[2].get_text())
+            self.assertIn('Orders - page 3', doc[2].get_text())
+
+    def test_cells(self):
+        with self.convert(make_xlsx(rows=1)) as doc:
+            page = doc[0]
+            text = page.get_text()
+            self.assertIn('2024-01-01', text)
+            # Long text is cut to its column
+            self.assertIn('…', text)
+            self.assertNotIn('x' * 300, text)
+            # Numbers are right-aligned under their header
+            header, amount = page.search_for('Amount')[0], page.search_for('12.5')[0]
+            self.assertGreater(amount.x0, header.x0 + 5)
+            self.assertAlmostEqual(amount.x1, header.x1, delta=1)
+
+    def test_wide_sheet_continues_on_more_pages(self):
+        with self.convert(make_xlsx(rows=2, wide=True)) as doc:
+            self.assertEqual(doc.page_count, 2)
+            self.assertIn('(columns A-', doc[0].get_text())
+            self.assertIn('Extra column 11', doc[1].get_text())
+            self.assertIn('value 1-11', doc[1].get_text())
+
+    def test_non_latin_text(self):
+        from openpyxl import Workbook
+        wb = Workbook()
+        ws = wb.active
+        ws.title = 'बिक्री'
+        ws.append(['नाम', 'City', 'Сумма'])
+        ws.append(['राहुल शर्मा', '北京', 120])
+        ws.append(['Ünïcödé €5', 'Αθήνα', 7])
+        buf = io.BytesIO()
+        wb.save(buf)
+        with self.convert(buf.getvalue()) as doc:
+            text = doc[0].get_text()
+            for value in ('बिक्री - page 1', 'नाम', 'Сумма', 'राहुल शर्मा', '北京', 'Ünïcödé €5', 'Αθήνα'):
+                self.assertIn(value, text)
+            self.assertNotIn('?', text)
+            fonts = {font[3] for font in doc[0].get_fonts()}
+            self.assertIn('Helvetica', fonts)
+            self.assertTrue(any('Devanagari' in name for name in fonts), fonts)
+            # The glyphs are really drawn, not just mapped to text
+            self.assertGreater(len(doc[0].get_texttrace()), 3)
+
+    def test_row_count(self):
+        input_path, output_path = self.write_input(make_xlsx(rows=500))
+        self.assertEqual(xlsx_layout.convert(input_path, output_path), 500)
@@ -0,0 +1,90 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from . import zipstream
+from .models import ServiceOrder, OrderFile
+
+
+class ZipStreamTest(TestCase):
+    def test_members_round_trip_with_per_type_compression(self):
+        fd, path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b'notes ' * 50000)
+        self.addCleanup(os.remove, path)
+
+        members = [('a.pdf', b'%PDF-1.7 fake'), ('notes.txt', path), ('page.jpg', b'\xff\xd8jpeg')]
+        data = b''.join(zipstream.ZipStream(iter(members)))
+
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(zf.namelist(), ['a.pdf', 'notes.txt', 'page.jpg'])
+            self.assertEqual(zf.getinfo('a.pdf').compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(zf.getinfo('page.jpg').compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(zf.getinfo('notes.txt').compress_type, zipfile.ZIP_DEFLATED)
+            self.assertEqual(zf.read('notes.txt'), b'notes ' * 50000)
+
+    def test_members_are_pulled_lazily(self):
+        produced = []
+
+        def members():
+            for i in range(3):
+                produced.append(i)
+                yield f'{i}.bin', b'x' * 10
+
+        chunks = iter(zipstream.ZipStream(members()))
+        next(chunks)
+        self.assertEqual(produced, [0])
+
+    def test_large_file_is_emitted_in_chunks(self):
+        fd, path = tempfile.mkstemp(suffix='.pdf')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(os.urandom(zipstream.CHUNK_SIZE * 8))
+        self.addCleanup(os.remove, path)
+
+        chunks = list(zipstream.ZipStream(iter([('big.pdf', path)])))
+        self.assertGreater(len(chunks), 8)
+        self.assertLessEqual(max(len(c) for c in chunks), zipstream.CHUNK_SIZE + 1024)
+
+    def test_close_hooks(self):
+        events = []
+        fd, spool_path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, spool_path)
+        stream = zipstream.ZipStream(
+            iter([('a.txt', b'hello')]), spool_path=spool_path,
+            on_complete=lambda: events.append('complete'), on_close=lambda: events.append('close'),
+        )
+        data = b''.join(stream)
+        stream.close()
+        stream.close()
+        self.assertEqual(events, ['complete', 'close'])
+        with open(spool_path, 'rb') as f:
+            self.assertEqual(f.read(), data)
+
+
+class StreamingOrderDownloadTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_download_order_files_streams_zip(self):
+        user = User.objects.create_user('student', password='pw')
+        order = ServiceOrder.objects.create(user=user, service_type='other', title='T', description='D')
+        order_file = OrderFile(order=order, file_type='delivery')
+        order_file.file.save('report.pdf', ContentFile(b'%PDF-1.7 report'))
+
+        self.client.login(username='student', password='pw')
+        response = self.client.get(reverse('download_order_files', args=[order.id, 'delivery']))
+        self.assertTrue(response.streaming)
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as zf:
+            self.assertEqual(len(zf.namelist()), 1)
+            self.assertEqual(zf.read(zf.namelist()[0]), b'%PDF-1.7 report')
@@ -0,0 +1,200 @@
+"""
+Background job mode for the long-running free tools.
+
+A tool view that receives `mode=job` stores the uploads as a `ToolJob` and
+answers immediately with the job id. The `run_tool_jobs` management command
+picks queued jobs up, runs the matching `core.pdf_tasks` function and stores
+the result, reporting page progress as it goes. Clients poll
+`tool_job_status` and fetch the output from `tool_job_download`.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.urls import reverse
+from django.utils import timezone
+
+from . import budgets, page_render, pdf_tasks, tool_pool
+from .models import ToolJob
+
+logger = logging.getLogger(__name__)
+
+# tool -> (task, output extension, batch zip name)
+JOB_TOOLS = {
+    'pdf_to_word': (page_render.pdf_to_docx, '.docx', 'hewor_converted_word_files.zip'),
+    'pdf_to_ppt': (page_render.pdf_to_pptx, '.pptx', 'hewor_converted_ppt_batch.zip'),
+    'pdf_to_excel': (page_render.pdf_to_xlsx, '.xlsx', 'hewor_converted_excel_files.zip'),
+}
+
+# Don't write progress to the database more often than this (seconds)
+PROGRESS_INTERVAL = 0.5
+
+STALE_ERROR = "The job was interrupted before it finished. Please submit the file again."
+FAILED_ERROR = "The file could not be converted. Please check that it is a valid PDF and try again."
+
+
+def wants_job_mode(request):
+    """
+    Without a worker (TOOL_JOB_WORKER) a job would stay queued for good, so
+    the request is converted right away instead.
+    """
+    return request.POST.get('mode') == 'job' and getattr(settings, 'TOOL_JOB_WORKER', False)
+
+
+def create_job(request, tool, files, options=None):
+    job = ToolJob.objects.create(
+        tool=tool,
+        user=request.user if request.user.is_authenticated else None,
+        options=options or {},
+    )
+    for f in files:
+        job.inputs.create(file=f, original_filename=f.name)
+    return job
+
+
+def job_payload(job):
+    payload = {
+        'job_id': str(job.id),
+        'tool': job.tool,
+        'status': job.status,
+        'progress': job.progress,
+        'total': job.total,
+        'status_url': reverse('tool_job_status', args=[job.id]),
+    }
+    if job.status == 'done':
+        payload['download_url'] = reverse('tool_job_download', args=[job.id])
+    if job.status == 'failed':
+        payload['error'] = job.error
+    return payload
+
+
+def fail_stale_jobs():
+    """
+    Mark failed the jobs left 'running' by a worker that died mid-job. A live
+    worker stops a job at its budget (TOOL_JOB_BUDGET_SECONDS), so one that is
+    still running TOOL_JOB_STALE_GRACE_SECONDS after that never will finish.
+    They are failed rather than queued again, since the job itself may be what
+    killed the worker. Returns how many there were.
+    """
+    cutoff = timezone.now() - timedelta(
+        seconds=settings.TOOL_JOB_BUDGET_SECONDS + settings.TOOL_JOB_STALE_GRACE_SECONDS
+    )
+    count = 0
+    for job in ToolJob.objects.filter(status='running', started_at__lt=cutoff):
+        failed = ToolJob.objects.filter(pk=job.pk, status='running').update(
+            status='failed', error=STALE_ERROR, finished_at=timezone.now()
+        )
+        if failed:
+            logger.error(f"Tool job {job.id} ({job.tool}) lost its worker; marked failed")
+            for item in job.inputs.all():
+                item.delete()
+            count += 1
+    return count
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest queued job to 'running' and return it, after
+    failing any stale ones (see `fail_stale_jobs`).
+    The conditional UPDATE makes this safe with several workers on any database.
+    """
+    fail_stale_jobs()
+    for job in ToolJob.objects.filter(status='queued').order_by('created_at')[:10]:
+        claimed = ToolJob.objects.filter(pk=job.pk, status='queued').update(
+            status='running', started_at=timezone.now()
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+class _ProgressReporter:
+    def __init__(self, job):
+        self.job = job
+        self.offset = 0
+        self.last_write = 0.0
+
+    def __call__(self, pages_done):
+        now = time.monotonic()
+        if now - self.last_write < PROGRESS_INTERVAL:
+            return
+        self.last_write = now
+        ToolJob.objects.filter(pk=self.job.pk).update(progress=self.offset + pages_done)
+
+    def file_done(self, page_count):
+        self.offset += page_count
+        ToolJob.objects.filter(pk=self.job.pk).update(progress=self.offset)
+
+
+def process_job(job):
+    # Every file of the job counts against one budget, with a longer deadline
+    # than a tool request gets
+    with budgets.applied(tool_pool.new_budget(settings.TOOL_JOB_BUDGET_SECONDS)):
+        _run_job(job)
+
+
+def _run_job(job):
+    task, extension, zip_name = JOB_TOOLS[job.tool]
+    inputs = list(job.inputs.all())
+    work_dir = tempfile.mkdtemp(prefix='hewor_job_')
+
+    try:
+        page_counts = [pdf_tasks.count_pages(item.file.path) for item in inputs]
+        ToolJob.objects.filter(pk=job.pk).update(total=sum(page_counts))
+
+        reporter = _ProgressReporter(job)
+        outputs = []
+        for item, page_count in zip(inputs, page_counts):
+            output_path = os.path.join(work_dir, f"{len(outputs)}{extension}")
+            task(item.file.path, output_path, progress=reporter, **job.options)
+            reporter.file_done(page_count)
+            outputs.append((f"{os.path.splitext(item.original_filename)[0]}{extension}", output_path))
+
+        if len(outputs) == 1:
+            result_name, result_path = outputs[0]
+        else:
+            result_name = zip_name
+            result_path = os.path.join(work_dir, zip_name)
+            with zipfile.ZipFile(result_path, 'w') as zipf:
+                for arcname, path in outputs:
+                    zipf.write(path, arcname=arcname)
+
+        job.refresh_from_db()
+        with open(result_path, 'rb') as f:
+            job.result_file.save(result_name, File(f), save=False)
+        job.result_name = result_name
+        job.status = 'done'
+        job.finished_at = timezone.now()
+        job.save()
+
+    except Exception as e:
+        logger.exception(f"Tool job {job.id} ({job.tool}) failed")
+        # Budget messages are written for users; anything else may carry paths or internals
+        error = str(e) if isinstance(e, budgets.BudgetExceeded) else FAILED_ERROR
+        ToolJob.objects.filter(pk=job.pk).update(
+            status='failed', error=error, finished_at=timezone.now()
+        )
+
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        # Inputs are never needed again once the job has run;
+        # the pre_delete signal removes their files
+        for item in inputs:
+            item.delete()
+
+
+def purge_finished_jobs(max_age_hours):
+    cutoff = timezone.now() - timedelta(hours=max_age_hours)
+    old_jobs = ToolJob.objects.filter(status__in=['done', 'failed'], finished_at__lt=cutoff)
+    count = 0
+    for job in old_jobs:
+        job.delete()
+        count += 1
+    return count
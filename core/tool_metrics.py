@@ -0,0 +1,30 @@
+"""
+In-process counters for the free tools (cache hits, rejections, budget
+violations, ...). Gunicorn runs a single worker, so process-local counters
+give the full picture; they reset on restart.
+"""
+import threading
+from collections import defaultdict
+
+_counters = defaultdict(int)
+_lock = threading.Lock()
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+
+def get(name):
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def snapshot():
+    with _lock:
+        return dict(sorted(_counters.items()))
+
+
+def reset():
+    with _lock:
+        _counters.clear()
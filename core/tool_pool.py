@@ -0,0 +1,225 @@
+"""
+Shared process pool for the CPU-heavy free tools.
+
+Gunicorn runs one worker with several threads, so PyMuPDF, pdfplumber and
+pdf2docx work done on a request thread holds the same GIL as every other
+request. Tool views submit that work here instead. Children are forked from
+a forkserver that has already imported `core.pdf_tasks` (and therefore the PDF
+stack), and each child is replaced after TOOL_POOL_MAX_TASKS_PER_CHILD jobs
+so MuPDF memory growth stays bounded.
+
+Every task runs under the budget of its job (see `core.budgets`): the active
+one, or a fresh one from the TOOL_BUDGET_* settings. Wait for results with
+`result`, which enforces the job's deadline even when a worker is stuck.
+
+Set TOOL_POOL_WORKERS = 0 to run tasks inline on the calling thread.
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from . import budgets, pdf_tasks, tool_metrics
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool_size():
+    return getattr(settings, 'TOOL_POOL_WORKERS', 0)
+
+
+def _create_pool():
+    workers = pool_size()
+    ctx = multiprocessing.get_context('forkserver')
+    ctx.set_forkserver_preload(['core.pdf_tasks'])
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=pdf_tasks.warm_up,
+        max_tasks_per_child=getattr(settings, 'TOOL_POOL_MAX_TASKS_PER_CHILD', 50),
+    )
+    # Start every child now so the first real job doesn't pay for the fork
+    for _ in range(workers):
+        pool.submit(pdf_tasks.noop)
+    logger.info(f"Tool pool started with {workers} workers")
+    return pool
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _create_pool()
+    return _pool
+
+
+def _reset_pool(broken):
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _kill_pool(pool):
+    """
+    Kill every child of `pool`; the next `submit` starts a new pool. A running
+    task can't be cancelled on its own, and one dead child breaks the whole
+    pool anyway. The executor has no public handle on its children, so this
+    reads its private `_processes`; should that ever go away, the stuck child
+    is only abandoned along with its pool.
+    """
+    processes = getattr(pool, '_processes', None)
+    if processes is None:
+        logger.error("Can't reach the tool pool's children to kill them; abandoning the pool")
+    for process in list((processes or {}).values()):
+        process.kill()
+    _reset_pool(pool)
+
+
+def new_budget(seconds=None):
+    """
+    A job budget from the TOOL_BUDGET_* settings, due `seconds` from now
+    (default TOOL_BUDGET_SECONDS).
+    """
+    if seconds is None:
+        seconds = getattr(settings, 'TOOL_BUDGET_SECONDS', None)
+    return budgets.Budget(
+        max_pages=getattr(settings, 'TOOL_BUDGET_MAX_PAGES', None),
+        max_render_pixels=getattr(settings, 'TOOL_BUDGET_MAX_RENDER_PIXELS', None),
+        max_image_pixels=getattr(settings, 'TOOL_BUDGET_MAX_IMAGE_PIXELS', None),
+        deadline=time.time() + seconds if seconds else None,
+    )
+
+
+def submit(fn, *args, **kwargs):
+    """
+    Schedule `fn(*args, **kwargs)` on the pool and return a Future.
+    `fn` must be a module-level function from `core.pdf_tasks`.
+    """
+    budget = budgets.active() or new_budget()
+    if pool_size() <= 0:
+        future = Future()
+        try:
+            future.set_result(budgets.call(budget, fn, *args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        future.budget, future.pool = budget, None
+        return future
+
+    pool = get_pool()
+    try:
+        future = pool.submit(budgets.call, budget, fn, *args, **kwargs)
+    except BrokenProcessPool:
+        # A child died (OOM kill, segfault in MuPDF); start over once
+        logger.error("Tool pool was broken, restarting it")
+        _reset_pool(pool)
+        pool = get_pool()
+        future = pool.submit(budgets.call, budget, fn, *args, **kwargs)
+    future.budget, future.pool = budget, pool
+    return future
+
+
+def wait_timeout(future):
+    """How long to wait for a `submit` future before its job is out of time (None: no limit)."""
+    remaining = budgets.time_left(future.budget)
+    if remaining is None or future.pool is None:
+        return None
+    return max(remaining, 0) + getattr(settings, 'TOOL_BUDGET_KILL_GRACE_SECONDS', 5)
+
+
+def result(future):
+    """
+    The result of a `submit` future. A task still running TOOL_BUDGET_KILL_GRACE_SECONDS
+    after its job's deadline is stuck where the worker's own timer can't stop
+    it, so the pool is killed; tasks of other jobs on it fail as well.
+    """
+    try:
+        return future.result(timeout=wait_timeout(future))
+    except FutureTimeout:
+        logger.error("Tool task overran its deadline, killing the pool")
+        _kill_pool(future.pool)
+        tool_metrics.incr('budget.killed')
+        raise budgets.exceeded('wall_time', budgets.TOO_LONG) from None
+    except budgets.BudgetExceeded as e:
+        if future.pool is not None:
+            # Raised in a worker, whose counters are its own
+            tool_metrics.incr(f'budget.exceeded.{e.kind}')
+        raise
+
+
+def run(fn, *args, **kwargs):
+    """Run `fn` on the pool and block until its result is ready."""
+    return result(submit(fn, *args, **kwargs))
+
+
+def page_ranges(page_count):
+    """
+    Split pages [0, page_count) into contiguous (start, stop) ranges, one per
+    worker, never smaller than TOOL_POOL_MIN_PAGES_PER_TASK pages.
+    """
+    min_pages = max(1, getattr(settings, 'TOOL_POOL_MIN_PAGES_PER_TASK', 8))
+    parts = max(1, min(pool_size(), page_count // min_pages))
+    bounds = [page_count * i // parts for i in range(parts + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def map_page_ranges(fn, input_path, page_count, *args, **kwargs):
+    """
+    Fan `fn(input_path, start, stop, *args, **kwargs)` out over the pool, one
+    call per page range. Returns the futures in page order; each worker opens
+    the document itself, so only the path crosses the process boundary.
+    """
+    return [
+        submit(fn, input_path, start, stop, *args, **kwargs)
+        for start, stop in page_ranges(page_count)
+    ]
+
+
+def stream_page_ranges(fn, input_path, page_count, *args, **kwargs):
+    """
+    `map_page_ranges` for results too big to hold all at once: ranges of
+    TOOL_POOL_MIN_PAGES_PER_TASK pages, with only one per worker submitted
+    ahead of the caller, the next going in as each is taken. Yields
+    ((start, stop), future) in page order; `result()` each before asking for
+    the next. The ranges keep the budget active now, even when they are
+    submitted later, while a response streams.
+    """
+    budget = budgets.active() or new_budget()
+    step = max(1, getattr(settings, 'TOOL_POOL_MIN_PAGES_PER_TASK', 8))
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    return _stream_ranges(budget, fn, input_path, ranges, args, kwargs)
+
+
+def _stream_ranges(budget, fn, input_path, ranges, args, kwargs):
+    ahead = max(1, pool_size())
+    pending = deque()
+    try:
+        for start, stop in ranges:
+            with budgets.applied(budget):
+                pending.append(((start, stop), submit(fn, input_path, start, stop, *args, **kwargs)))
+            if len(pending) >= ahead:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+    finally:
+        # The caller stopped early (e.g. the download was cancelled)
+        for _, future in pending:
+            future.cancel()
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
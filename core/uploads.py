@@ -0,0 +1,96 @@
+"""
+Uploaded files handed to the free tools without copying them again.
+
+Django keeps uploads up to FILE_UPLOAD_MAX_MEMORY_SIZE in memory and spools
+larger ones to a temp file of its own while the request body is read.
+`upload_path` gives a tool a path for either kind:
+
+- a spooled upload is hard-linked under a name of our own, so the bytes on
+  disk are shared rather than written a second time. The link also outlives
+  Django deleting its file at the end of the request, so pool workers and
+  streamed batches can keep reading it. Only when linking fails (the temp
+  directories are on different filesystems) is the file copied.
+- an in-memory upload is written out once, straight from its buffer.
+
+Either way the path is read-only for the tools: a linked path *is* Django's
+file, so writing to it would change the upload under Django (and under any
+other request reading the same bytes). Tools write their results to paths of
+their own; the ones that edit a PDF in place (rotate, page numbers, sign) go
+through `pdf_tasks.save_edit`, which copies the input to the output path
+before appending its update.
+
+`upload_buffer` gives the bytes as a memoryview with no copy: the in-memory
+buffer itself, or a read-only map of the spooled file.
+"""
+import mmap
+import os
+import secrets
+import shutil
+import tempfile
+
+from . import tool_metrics
+
+LINK_ATTEMPTS = 10
+
+
+def upload_path(uploaded_file, suffix, temp_files_to_clean):
+    """
+    A path to the upload's bytes ending in `suffix`, for tools that open
+    files by name. The path is added to `temp_files_to_clean`.
+
+    The file may be shared with Django's own temp file, so it must only be
+    read: never write to, truncate or rename it. A task that needs to change
+    the bytes works on a copy.
+    """
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        source = uploaded_file.temporary_file_path()
+        uploaded_file.file.flush()
+        directory = os.path.dirname(source)
+        for _ in range(LINK_ATTEMPTS):
+            path = os.path.join(directory, f'tool-{secrets.token_hex(8)}{suffix}')
+            try:
+                os.link(source, path)
+            except FileExistsError:
+                continue
+            except OSError:
+                break  # another filesystem, or links not allowed
+            temp_files_to_clean.append(path)
+            tool_metrics.incr('upload.linked')
+            return path
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+            temp_files_to_clean.append(tmp.name)
+            shutil.copyfile(source, tmp.name)
+            tool_metrics.incr('upload.copied')
+            return tmp.name
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        temp_files_to_clean.append(tmp.name)
+        if hasattr(uploaded_file.file, 'getbuffer'):
+            with uploaded_file.file.getbuffer() as content:
+                tmp.write(content)
+        else:
+            for chunk in uploaded_file.chunks():
+                tmp.write(chunk)
+        tool_metrics.incr('upload.spooled')
+        return tmp.name
+
+
+def upload_buffer(uploaded_file):
+    """
+    The upload's bytes as a read-only memoryview, without copying them.
+    Release it (`with upload_buffer(f) as content: ...`) before the request
+    ends: Django can't close an in-memory upload while a view of it exists.
+    """
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        uploaded_file.file.flush()
+        with open(uploaded_file.temporary_file_path(), 'rb') as fp:
+            if os.fstat(fp.fileno()).st_size == 0:
+                return memoryview(b'')
+            # The map stays valid after the file is closed
+            return memoryview(mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ))
+    if hasattr(uploaded_file.file, 'getbuffer'):
+        return uploaded_file.file.getbuffer().toreadonly()
+    uploaded_file.seek(0)
+    content = uploaded_file.read()
+    uploaded_file.seek(0)
+    return memoryview(content)
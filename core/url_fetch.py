@@ -0,0 +1,223 @@
+"""
+Bounded URL fetching for the free tools (HTML to PDF).
+
+All fetches share one `requests.Session`, so connections to a host are kept
+alive and reused. A body is streamed and abandoned as soon as it passes
+TOOL_FETCH_MAX_BYTES (after decompression) or the whole fetch passes
+TOOL_FETCH_DEADLINE_SECONDS, so a slow or huge page can neither hold a thread
+for long nor fill memory.
+
+Fetched documents are kept in a process-local LRU cache bounded by
+TOOL_FETCH_CACHE_MAX_BYTES. Within its freshness lifetime (the response's
+max-age, else TOOL_FETCH_FRESH_SECONDS) a cached page is served without
+touching the network; after that it is revalidated with If-None-Match /
+If-Modified-Since and a 304 keeps the stored body.
+"""
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from html import unescape
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from django.conf import settings
+
+from . import tool_metrics
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+CHUNK_SIZE = 64 * 1024
+MAX_REDIRECTS = 5
+
+_IMG_SRC = re.compile(r'''(<img\b[^>]*?\bsrc\s*=\s*)(["'])(.*?)\2''', re.IGNORECASE | re.DOTALL)
+
+_session = None
+_session_lock = threading.Lock()
+
+_lock = threading.Lock()
+_cache = OrderedDict()  # url -> FetchedPage, least recently used first
+_cache_bytes = 0
+
+
+class FetchedPage:
+    def __init__(self, url, content, encoding=None, etag=None, last_modified=None, fresh_until=0.0):
+        self.url = url  # after redirects
+        self.content = content
+        self.encoding = encoding  # charset from Content-Type, if any
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fresh_until = fresh_until
+
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+
+def get_session():
+    """The shared session, created on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            size = getattr(settings, 'TOOL_FETCH_POOL_SIZE', 10)
+            adapter = requests.adapters.HTTPAdapter(pool_connections=size, pool_maxsize=size, max_retries=0)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['User-Agent'] = USER_AGENT
+            session.max_redirects = MAX_REDIRECTS
+            _session = session
+        return _session
+
+
+def fetch(url, deadline=None):
+    """
+    Return a `FetchedPage` for `url`, from the cache when possible. Raises
+    ValueError for unsupported URLs and pages over the size or time budget,
+    and `requests.RequestException` for network and HTTP errors. `deadline`
+    (a time.monotonic() value) lets several fetches share one time budget.
+    """
+    if urlsplit(url).scheme not in ('http', 'https'):
+        raise ValueError("Only http:// and https:// URLs are supported.")
+
+    with _lock:
+        cached = _cache.get(url)
+        if cached is not None:
+            _cache.move_to_end(url)
+    if cached is not None and time.time() < cached.fresh_until:
+        tool_metrics.incr('fetch.cache.hit')
+        return cached
+
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+
+    if deadline is None:
+        deadline = time.monotonic() + getattr(settings, 'TOOL_FETCH_DEADLINE_SECONDS', 15)
+    elif time.monotonic() >= deadline:
+        raise ValueError("The page took too long to download.")
+    max_bytes = getattr(settings, 'TOOL_FETCH_MAX_BYTES', 5 * 1024 * 1024)
+    with get_session().get(url, headers=headers, stream=True, timeout=_timeout(deadline)) as response:
+        if response.status_code == 304 and cached is not None:
+            tool_metrics.incr('fetch.cache.revalidated')
+            cached.fresh_until = _fresh_until(response.headers)
+            return cached
+        response.raise_for_status()
+        tool_metrics.incr('fetch.network')
+
+        declared = response.headers.get('Content-Length')
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise _over_size(max_bytes)
+        # read1 returns whatever has arrived, so a trickling server can't
+        # stretch one read past the deadline the way read(CHUNK_SIZE) would
+        chunks, size = [], 0
+        while True:
+            chunk = response.raw.read1(CHUNK_SIZE, decode_content=True)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise _over_size(max_bytes)
+            if time.monotonic() > deadline:
+                tool_metrics.incr('fetch.timeout')
+                raise ValueError("The page took too long to download.")
+            chunks.append(chunk)
+
+        page = FetchedPage(
+            response.url, b''.join(chunks),
+            encoding=_charset(response.headers.get('Content-Type', '')),
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            fresh_until=_fresh_until(response.headers),
+        )
+    if 'no-store' not in response.headers.get('Cache-Control', '').lower():
+        _store(url, page)
+    return page
+
+
+def fetch_images(html, base_url):
+    """
+    Fetch the images `html` references, up to TOOL_FETCH_MAX_IMAGES of them
+    and all within one TOOL_FETCH_DEADLINE_SECONDS budget. Returns the HTML
+    with each fetched src replaced by a local name, and a {name: bytes} dict
+    for `pdf_tasks.html_to_pdf`. Images that can't be fetched keep their src;
+    the renderer leaves them out.
+    """
+    deadline = time.monotonic() + getattr(settings, 'TOOL_FETCH_DEADLINE_SECONDS', 15)
+    limit = getattr(settings, 'TOOL_FETCH_MAX_IMAGES', 20)
+    images = {}
+    names = {}  # absolute URL -> local name, or None once it failed
+
+    def replace(match):
+        src = unescape(match.group(3).strip())
+        if not src or src.startswith('data:'):
+            return match.group(0)
+        url = urljoin(base_url, src)
+        if url not in names:
+            names[url] = None
+            if len(names) > limit:
+                return match.group(0)
+            try:
+                content = fetch(url, deadline).content
+            except (ValueError, requests.RequestException) as e:
+                logger.warning(f"Skipping image {url}: {e}")
+                return match.group(0)
+            names[url] = f'image{len(images)}'
+            images[names[url]] = content
+        if names[url] is None:
+            return match.group(0)
+        return f'{match.group(1)}{match.group(2)}{names[url]}{match.group(2)}'
+
+    return _IMG_SRC.sub(replace, html), images
+
+
+def _timeout(deadline):
+    """(connect, read) socket timeouts that never outlast the deadline."""
+    remaining = max(deadline - time.monotonic(), 0.1)
+    return (min(getattr(settings, 'TOOL_FETCH_CONNECT_TIMEOUT', 5), remaining), remaining)
+
+
+def _over_size(max_bytes):
+    tool_metrics.incr('fetch.too_large')
+    return ValueError(f"The page is larger than {max_bytes // (1024 * 1024)} MB.")
+
+
+def _charset(content_type):
+    match = re.search(r'charset="?([\w.:-]+)', content_type, re.IGNORECASE)
+    return match.group(1) if match else None
+
+
+def _fresh_until(headers):
+    cache_control = headers.get('Cache-Control', '').lower()
+    if 'no-cache' in cache_control:
+        return 0.0
+    match = re.search(r'max-age=(\d+)', cache_control)
+    lifetime = int(match.group(1)) if match else getattr(settings, 'TOOL_FETCH_FRESH_SECONDS', 300)
+    return time.time() + lifetime
+
+
+def _store(url, page):
+    global _cache_bytes
+    max_bytes = getattr(settings, 'TOOL_FETCH_CACHE_MAX_BYTES', 0)
+    if len(page.content) > max_bytes:
+        return
+    with _lock:
+        old = _cache.pop(url, None)
+        if old is not None:
+            _cache_bytes -= len(old.content)
+        _cache[url] = page
+        _cache_bytes += len(page.content)
+        while _cache_bytes > max_bytes:
+            _, evicted = _cache.popitem(last=False)
+            _cache_bytes -= len(evicted.content)
+
+
+def clear():
+    global _cache_bytes
+    with _lock:
+        _cache.clear()
+        _cache_bytes = 0
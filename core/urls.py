@@ -33,6 +33,7 @@ urlpatterns = [
     path('order-panel/freelancer/<int:freelancer_id>/', views.order_panel_freelancer_detail, name='order_panel_freelancer_detail'),
     path('order-panel/send-notification/', views.order_panel_send_notification, name='order_panel_send_notification'),
     path('order-panel/chat/<int:order_id>/', views.order_panel_freelancer_chat, name='order_panel_freelancer_chat'),
+    path('order-panel/tool-metrics/', views.order_panel_tool_metrics, name='order_panel_tool_metrics'),
     
     # Freelancer Portal
     path('freelancer/login/', views.freelancer_login, name='freelancer_login'),
@@ -66,6 +67,8 @@ urlpatterns = [
     path('tools/remove-pages/', views.remove_pages_tool, name='remove_pages_tool'),
     path('tools/extract-pages/', views.extract_pages_tool, name='extract_pages_tool'),
     path('tools/whiteboard/', views.whiteboard_tool, name='whiteboard_tool'),
+    path('tools/jobs/<uuid:job_id>/', views.tool_job_status, name='tool_job_status'),
+    path('tools/jobs/<uuid:job_id>/download/', views.tool_job_download, name='tool_job_download'),
     
     # Blog (Content Marketing & SEO)
     path('blog/', views.blog_list, name='blog_list'),
@@ -3,14 +3,15 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.cache import cache_page
 import zipfile
 import io
-from django.http import HttpResponse
+import csv
+from django.http import HttpResponse, FileResponse, Http404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import ServiceOrder, OrderFile, Profile, SiteSetting, ContactMessage, OrderChat, Review, CaseStudy, AgencyStat, TeamMember, Freelancer, FreelancerChat, FreelancerNotification
+from .models import ServiceOrder, OrderFile, Profile, SiteSetting, ContactMessage, OrderChat, Review, CaseStudy, AgencyStat, TeamMember, Freelancer, FreelancerChat, FreelancerNotification, ToolJob
 from django.conf import settings
 from django.core.mail import send_mail
 from django.utils import timezone
@@ -20,14 +21,10 @@ import logging
 # Re-import firebase_admin for Google Auth
 import firebase_admin
 from firebase_admin import auth as firebase_auth
-import fitz  # PyMuPDF
 import tempfile
 import os
-from pptx import Presentation
-import pdfplumber
-import pandas as pd
-import openpyxl
-from pptx.util import Inches
+import shutil
+from . import admission, page_render, page_selection, pdf_tasks, result_cache, tool_jobs, tool_metrics, tool_pool, uploads, url_fetch, zipstream
 
 logger = logging.getLogger(__name__)
 
@@ -447,20 +444,16 @@ def download_order_files(request, order_id, file_type):
         messages.error(request, "No files found.")
         return redirect('order_detail', order_id=order.id)
         
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w') as zip_file:
+    def members():
         for f in files:
-            try:
-                file_path = f.file.path
-                file_name = f.file.name.split('/')[-1]
-                zip_file.write(file_path, file_name)
-            except FileNotFoundError:
+            file_path = f.file.path
+            if not os.path.exists(file_path):
                 continue # Skip missing files
-    
-    zip_buffer.seek(0)
-    response = HttpResponse(zip_buffer, content_type='application/zip')
-    response['Content-Disposition'] = f'attachment; filename="{file_type}_files_{order.id}.zip"'
-    return response
+            yield f.file.name.split('/')[-1], file_path
+
+    return zipstream.streaming_response(
+        zipstream.ZipStream(members()), f"{file_type}_files_{order.id}.zip"
+    )
 
 # --- CHATBOT API ---
 from django.http import JsonResponse
@@ -504,6 +497,18 @@ def order_panel_dashboard(request):
     freelancers = Freelancer.objects.all().order_by('name')
     return render(request, 'core/order_panel_dashboard.html', {'orders': orders, 'freelancers': freelancers})
 
+@login_required(login_url='order_panel_login')
+def order_panel_tool_metrics(request):
+    """Free-tool engine counters (cache, pool, admission) for staff."""
+    if not request.user.is_staff:
+        raise Http404()
+    return JsonResponse({
+        'counters': tool_metrics.snapshot(),
+        'cache': result_cache.stats(),
+        'pool_workers': tool_pool.pool_size(),
+        'admission': admission.stats(),
+    })
+
 @login_required(login_url='order_panel_login')
 def order_panel_upload(request, order_id):
     if request.method == 'POST':
@@ -1060,11 +1065,168 @@ def freelancer_profile(request):
 
 # --- FREE TOOLS ---
 
+def new_temp_path(suffix, temp_files_to_clean):
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        temp_files_to_clean.append(tmp.name)
+        return tmp.name
+
+def cached_tool_response(cache_key, content_type, filename):
+    """Serve a previously produced artifact straight from the result cache."""
+    cached_path = result_cache.get(cache_key)
+    if cached_path is None:
+        return None
+    return FileResponse(open(cached_path, 'rb'), as_attachment=True, filename=filename, content_type=content_type)
+
+def stream_zip_response(members, filename, temp_files_to_clean, cache_key=None, manifest=None):
+    """
+    Stream `members` ((arcname, bytes or path) pairs, produced lazily) as a ZIP.
+    The response takes over the temp files collected so far and deletes them
+    once it is closed; with a cache key the archive is also spooled to disk and
+    stored in the result cache when it completes, unless its `manifest` (a
+    BatchManifest) lists failures, which may not happen again.
+    """
+    owned_files = list(temp_files_to_clean)
+    temp_files_to_clean.clear()
+
+    spool_path = on_complete = None
+    if cache_key and result_cache.enabled():
+        spool_path = new_temp_path('.zip', owned_files)
+
+        def on_complete():
+            if manifest is None or not manifest.failures:
+                result_cache.put(cache_key, spool_path)
+
+    stream = zipstream.ZipStream(
+        members, spool_path=spool_path, on_complete=on_complete,
+        on_close=lambda: cleanup_temp_files(owned_files),
+    )
+    return zipstream.streaming_response(stream, filename)
+
+class BatchManifest:
+    """
+    The manifest.csv of a streamed batch ZIP: a row per output, and one per
+    input (or part of one) that failed. Members are produced after the
+    response has started, so a failure can't become an error page any more;
+    it is logged and listed here instead of cutting the ZIP short. The ZIP of
+    a single input only gets the manifest when something failed.
+    """
+    def __init__(self, tool, inputs):
+        self.tool = tool
+        self.inputs = inputs
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.writer.writerow(['file', 'status', 'output', 'error'])
+        self.failures = 0
+
+    def ok(self, name, arcname):
+        self.writer.writerow([name, 'ok', arcname, ''])
+
+    def failed(self, name, error, output=''):
+        logger.error(f"{self.tool} failed for {name}: {error}")
+        self.failures += 1
+        self.writer.writerow([name, 'failed', output, str(error)])
+
+    def members(self):
+        if self.inputs > 1 or self.failures:
+            yield "manifest.csv", self.buffer.getvalue().encode('utf-8')
+
+def per_file_tool_response(files, tool, task, args, suffix, temp_files_to_clean, cache_params=None,
+                           input_suffix='.pdf'):
+    """
+    Run `task(input_path, output_path, *args)` on every uploaded file
+    (`input_suffix` files, PDFs by default); the results are PDFs.
+
+    A single upload is answered with the resulting PDF. Several uploads are
+    submitted to the tool pool together (so at most TOOL_POOL_WORKERS run at
+    once) and streamed back as one ZIP. The ZIP contains each result plus a
+    manifest.csv that says which files succeeded and why any failed; one bad
+    file doesn't sink the batch. Results are cached under `cache_params`.
+    Pass None for tools whose parameters are secrets.
+    """
+    def output_name(name):
+        return name.replace(input_suffix, '') + suffix + ".pdf"
+
+    digests = [result_cache.digest_upload(f) for f in files] if cache_params is not None else None
+
+    if len(files) == 1:
+        uploaded_file = files[0]
+        output_filename = output_name(uploaded_file.name)
+        cache_key = result_cache.make_key(tool, digests, **cache_params) if digests else None
+        if cache_key:
+            cached = cached_tool_response(cache_key, 'application/pdf', output_filename)
+            if cached:
+                return cached
+
+        input_path = uploads.upload_path(uploaded_file, input_suffix, temp_files_to_clean)
+        output_path = new_temp_path('.pdf', temp_files_to_clean)
+        tool_pool.run(task, input_path, output_path, *args)
+        if cache_key:
+            result_cache.put(cache_key, output_path)
+
+        return FileResponse(
+            open(output_path, 'rb'), as_attachment=True,
+            filename=output_filename, content_type='application/pdf',
+        )
+
+    batch_filename = f"hewor_{tool}_batch.zip"
+    cache_key = None
+    if digests:
+        cache_key = result_cache.make_key(tool, digests, names=[f.name for f in files], **cache_params)
+        cached = cached_tool_response(cache_key, 'application/zip', batch_filename)
+        if cached:
+            return cached
+
+    jobs = []
+    for file in files:
+        input_path = uploads.upload_path(file, input_suffix, temp_files_to_clean)
+        output_path = new_temp_path('.pdf', temp_files_to_clean)
+        jobs.append((file.name, tool_pool.submit(task, input_path, output_path, *args)))
+
+    manifest = BatchManifest(tool, len(files))
+
+    def members():
+        used_names = set()
+        for index, (name, job) in enumerate(jobs, start=1):
+            try:
+                output_path = tool_pool.result(job)
+            except Exception as e:
+                manifest.failed(name, e)
+                continue
+            arcname = output_name(name)
+            if arcname in used_names:
+                arcname = f"{index}_{arcname}"
+            used_names.add(arcname)
+            manifest.ok(name, arcname)
+            yield arcname, output_path
+        yield from manifest.members()
+
+    return stream_zip_response(members(), batch_filename, temp_files_to_clean, cache_key, manifest)
+
+def compression_ratio(original_size, final_size):
+    return f"{final_size / original_size:.3f}" if original_size else "1.000"
+
+def add_compression_headers(response, original_size, final_size):
+    """Report what compression achieved, for clients that want to show it."""
+    response['X-Original-Size'] = str(original_size)
+    response['X-Compressed-Size'] = str(final_size)
+    response['X-Compression-Ratio'] = compression_ratio(original_size, final_size)
+
+def cleanup_temp_files(temp_files_to_clean):
+    for path in temp_files_to_clean:
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                os.remove(path)
+        except OSError:
+            pass
+
 def merge_pdf_tool(request):
     """
     Highly optimized PDF Merging logic.
     Addresses user reports of 'useless' logic and 'slowness'.
     """
+    temp_files_to_clean = []
     try:
         if request.method == 'POST':
             files = request.FILES.getlist('pdf_files')
@@ -1079,37 +1241,40 @@ def merge_pdf_tool(request):
                 messages.error(request, f"Total payload exceeds {MAX_TOTAL_SIZE_MB}MB limit.")
                 return redirect('merge_pdf_tool')
 
-            # 2. Optimized Merge Logic using PyMuPDF (fitz)
-            merged_doc = fitz.open()
-            try:
-                for f in files:
-                    # Reset stream position just in case
-                    f.seek(0)
-                    with fitz.open(stream=f.read(), filetype="pdf") as part_doc:
-                        merged_doc.insert_pdf(part_doc)
-                
-                # Use optimized write for smaller output and faster download
-                # garbage=4: deduplicate objects, deflate=True: compress streams
-                pdf_bytes = merged_doc.write(garbage=4, deflate=True)
-            finally:
-                merged_doc.close()
+            # 2. Optimized Merge Logic using PyMuPDF (fitz), off the request thread
+            input_paths = [uploads.upload_path(f, '.pdf', temp_files_to_clean) for f in files]
+            output_path = new_temp_path('.pdf', temp_files_to_clean)
+            large_job = (
+                total_size_bytes > settings.TOOL_MERGE_BOUNDED_THRESHOLD_MB * 1024 * 1024
+                or len(files) > settings.TOOL_MERGE_BATCH_SIZE * 4
+            )
+            if large_job:
+                # Append in batches through the output file so memory stays flat
+                tool_pool.run(pdf_tasks.merge_pdfs_bounded, input_paths, output_path, settings.TOOL_MERGE_BATCH_SIZE)
+            else:
+                tool_pool.run(pdf_tasks.merge_pdfs, input_paths, output_path)
 
-            # 3. Stream response to user
-            response = HttpResponse(pdf_bytes, content_type='application/pdf')
-            response['Content-Disposition'] = 'attachment; filename="hewor_combined_document.pdf"'
-            return response
+            # 3. Stream response to user straight from the spool file. The open
+            # handle keeps the data readable after cleanup unlinks the path.
+            return FileResponse(
+                open(output_path, 'rb'), as_attachment=True,
+                filename='hewor_combined_document.pdf', content_type='application/pdf',
+            )
 
         return render(request, 'core/merge_pdf.html')
     except Exception as e:
         logger.error(f"ENGINE ERROR in merge_pdf_tool: {str(e)}")
         messages.error(request, f"Processing failed: {str(e)}. Try a smaller file.")
         return redirect('merge_pdf_tool')
+    finally:
+        cleanup_temp_files(temp_files_to_clean)
 
 def split_pdf_tool(request):
     """
     Optimized PDF Splitting logic.
     Addresses user reports of tool not working in production.
     """
+    temp_files_to_clean = []
     try:
         if request.method == 'POST':
             files = request.FILES.getlist('pdf_files')
@@ -1119,56 +1284,56 @@ def split_pdf_tool(request):
                 messages.error(request, "Please select a PDF file.")
                 return redirect('split_pdf_tool')
 
-            # Parse and sanitize split points
+            # Split points are a page selection ("5, 10", "2-", "even", ...), resolved per file
             try:
-                split_at_pages = sorted(list(set([int(p.strip()) for p in split_pages_str.split(',') if p.strip().isdigit() and int(p.strip()) > 0])))
-            except ValueError:
-                messages.error(request, "Invalid page numbers provided.")
-                return redirect('split_pdf_tool')
-            
-            if not split_at_pages:
-                messages.error(request, "Please enter valid page numbers (e.g., 5, 10).")
+                selection = page_selection.parse(split_pages_str)
+            except ValueError as e:
+                messages.error(request, f"{e} Please enter page numbers such as 5, 10.")
                 return redirect('split_pdf_tool')
 
-            zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                for file in files:
-                    file.seek(0)
-                    with fitz.open(stream=file.read(), filetype="pdf") as source_doc:
-                        total_pages = source_doc.page_count
-                        # Filter split points that are within range
-                        valid_splits = [p for p in split_at_pages if p < total_pages]
-                        
-                        ranges = []
-                        last_split = 0
-                        for split_point in valid_splits:
-                            ranges.append((last_split, split_point))
-                            last_split = split_point
-                        if last_split < total_pages:
-                            ranges.append((last_split, total_pages))
-                            
-                        base_name = os.path.splitext(file.name)[0]
-                        for part_idx, (r_start, r_end) in enumerate(ranges):
-                            if r_start >= r_end: continue
-                            
-                            part_doc = fitz.open()
-                            try:
-                                part_doc.insert_pdf(source_doc, from_page=r_start, to_page=r_end - 1)
-                                part_bytes = part_doc.write(garbage=4, deflate=True)
-                                zip_file.writestr(f"{base_name}_part_{part_idx + 1}.pdf", part_bytes)
-                            finally:
-                                part_doc.close()
-
-            zip_buffer.seek(0)
-            response = HttpResponse(zip_buffer.getvalue(), content_type='application/zip')
-            response['Content-Disposition'] = 'attachment; filename="hewor_split_package.zip"'
-            return response
+            cache_key = result_cache.make_key(
+                'split_pdf', [result_cache.digest_upload(f) for f in files],
+                split_at=str(selection), names=[f.name for f in files],
+            )
+            cached = cached_tool_response(cache_key, 'application/zip', 'hewor_split_package.zip')
+            if cached:
+                return cached
+
+            # Split every file in parallel on the tool pool
+            jobs = []
+            for file in files:
+                input_path = uploads.upload_path(file, '.pdf', temp_files_to_clean)
+                # Fail here, while we can still redirect, rather than mid-stream
+                pdf_tasks.count_pages(input_path)
+                output_dir = tempfile.mkdtemp()
+                temp_files_to_clean.append(output_dir)
+                base_name = os.path.splitext(file.name)[0]
+                jobs.append((file.name, tool_pool.submit(pdf_tasks.split_pdf, input_path, selection, output_dir, base_name)))
+
+            # Parts are streamed as soon as each file's split finishes
+            manifest = BatchManifest('split_pdf', len(files))
+
+            def members():
+                for name, job in jobs:
+                    try:
+                        parts = tool_pool.result(job)
+                    except Exception as e:
+                        manifest.failed(name, e)
+                        continue
+                    for arcname, part_path in parts:
+                        manifest.ok(name, arcname)
+                        yield arcname, part_path
+                yield from manifest.members()
+
+            return stream_zip_response(members(), 'hewor_split_package.zip', temp_files_to_clean, cache_key, manifest)
 
         return render(request, 'core/split_pdf.html')
     except Exception as e:
         logger.error(f"ENGINE ERROR in split_pdf_tool: {str(e)}")
         messages.error(request, "Split failed. Check if your PDF is corrupted or encrypted.")
         return redirect('split_pdf_tool')
+    finally:
+        cleanup_temp_files(temp_files_to_clean)
 
 def compress_pdf_tool(request):
     """
@@ -1183,8 +1348,13 @@ def compress_pdf_tool(request):
             return redirect('compress_pdf_tool')
 
         MAX_SIZE_MB = 100
+        # low / medium / high: how hard embedded images are downsampled and re-encoded
+        level = request.POST.get('level', 'medium')
+        if level not in pdf_tasks.COMPRESS_PRESETS:
+            level = 'medium'
         # Check total size logic if desired, or per file. 
         # Using per file for now or simple sum.
+        temp_files_to_clean = []
         
         try:
             # If single file -> return PDF
@@ -1193,44 +1363,80 @@ def compress_pdf_tool(request):
                 if file.size > MAX_SIZE_MB * 1024 * 1024:
                     messages.error(request, f"File size exceeds {MAX_SIZE_MB}MB limit.")
                     return redirect('compress_pdf_tool')
+
+                cache_key = result_cache.make_key('compress_pdf', [result_cache.digest_upload(file)], level=level)
+                response = cached_tool_response(cache_key, 'application/pdf', f"compressed_{file.name}")
+                if response:
+                    add_compression_headers(response, file.size, int(response['Content-Length']))
+                    return response
                 
-                doc = fitz.open(stream=file.read(), filetype="pdf")
-                # Compress
-                # garbage=4 (deduplicate), deflate=True (compress streams)
-                out_bytes = doc.write(garbage=4, deflate=True)
-                doc.close()
+                input_path = uploads.upload_path(file, '.pdf', temp_files_to_clean)
+                output_path = new_temp_path('.pdf', temp_files_to_clean)
+                tool_pool.run(pdf_tasks.compress_pdf, input_path, output_path, level)
+                result_cache.put(cache_key, output_path)
+
+                with open(output_path, 'rb') as f:
+                    out_bytes = f.read()
                 
                 response = HttpResponse(out_bytes, content_type='application/pdf')
                 response['Content-Disposition'] = f'attachment; filename="compressed_{file.name}"'
+                add_compression_headers(response, file.size, len(out_bytes))
                 return response
             
             # If multiple files -> return ZIP
             else:
-                zip_buffer = io.BytesIO()
-                with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                    for file in files:
-                        doc = fitz.open(stream=file.read(), filetype="pdf")
-                        out_bytes = doc.write(garbage=4, deflate=True)
-                        zip_file.writestr(f"compressed_{file.name}", out_bytes)
-                        doc.close()
-                
-                zip_buffer.seek(0)
-                response = HttpResponse(zip_buffer, content_type='application/zip')
-                response['Content-Disposition'] = 'attachment; filename="hewor_compressed_batch.zip"'
-                return response
+                cache_key = result_cache.make_key(
+                    'compress_pdf', [result_cache.digest_upload(f) for f in files],
+                    names=[f.name for f in files], level=level,
+                )
+                cached = cached_tool_response(cache_key, 'application/zip', 'hewor_compressed_batch.zip')
+                if cached:
+                    return cached
+
+                jobs = []
+                for file in files:
+                    input_path = uploads.upload_path(file, '.pdf', temp_files_to_clean)
+                    # Fail here, while we can still redirect, rather than mid-stream
+                    pdf_tasks.count_pages(input_path)
+                    output_path = new_temp_path('.pdf', temp_files_to_clean)
+                    jobs.append((file, tool_pool.submit(pdf_tasks.compress_pdf, input_path, output_path, level)))
+
+                manifest = BatchManifest('compress_pdf', len(files))
+
+                def members():
+                    report = io.StringIO()
+                    writer = csv.writer(report)
+                    writer.writerow(['file', 'original_bytes', 'compressed_bytes', 'ratio'])
+                    for file, job in jobs:
+                        try:
+                            output_path = tool_pool.result(job)
+                        except Exception as e:
+                            manifest.failed(file.name, e)
+                            continue
+                        final_size = os.path.getsize(output_path)
+                        writer.writerow([file.name, file.size, final_size, compression_ratio(file.size, final_size)])
+                        manifest.ok(file.name, f"compressed_{file.name}")
+                        yield f"compressed_{file.name}", output_path
+                    yield "compression_report.csv", report.getvalue().encode('utf-8')
+                    yield from manifest.members()
+
+                return stream_zip_response(
+                    members(), 'hewor_compressed_batch.zip', temp_files_to_clean, cache_key, manifest,
+                )
 
         except Exception as e:
             logger.error(f"Error compressing PDF: {e}")
             messages.error(request, f"Error processing file: {str(e)}")
             return redirect('compress_pdf_tool')
+        finally:
+            cleanup_temp_files(temp_files_to_clean)
 
     return render(request, 'core/compress_pdf.html')
 
 def pdf_to_word_tool(request):
     """
     View to handle Free PDF to Word tool.
-    Note: pdf2docx library removed due to deployment issues.
-    This tool is temporarily disabled.
+    Converts with pdf2docx on the tool pool; batch members convert in parallel.
     """
     if request.method == 'POST':
         files = request.FILES.getlist('pdf_files')
@@ -1239,85 +1445,69 @@ def pdf_to_word_tool(request):
             messages.error(request, "Please upload a PDF file.")
             return redirect('pdf_to_word_tool')
 
-        temp_files_to_clean = []
-        
+        # Optional page range, 1-based and inclusive in the form
         try:
-            from pdf2docx import Converter
-
-            def convert_single_pdf_to_word(pdf_file, output_docx_path):
-                # Save input PDF to temp file
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-                    for chunk in pdf_file.chunks():
-                        tmp_pdf.write(chunk)
-                    temp_pdf_path = tmp_pdf.name
-                    temp_files_to_clean.append(temp_pdf_path)
+            page_from = int(request.POST.get('page_from') or 1)
+            page_to = int(request.POST['page_to']) if request.POST.get('page_to') else None
+            if page_from < 1 or (page_to is not None and page_to < page_from):
+                raise ValueError
+        except ValueError:
+            messages.error(request, "Invalid page range.")
+            return redirect('pdf_to_word_tool')
+        page_range = {'start': page_from - 1, 'end': page_to}
 
-                # Convert using pdf2docx
-                cv = Converter(temp_pdf_path)
-                cv.convert(output_docx_path)
-                cv.close()
+        if tool_jobs.wants_job_mode(request):
+            job = tool_jobs.create_job(request, 'pdf_to_word', files, options=page_range)
+            return JsonResponse(tool_jobs.job_payload(job), status=202)
 
+        temp_files_to_clean = []
+        
+        try:
             if len(files) == 1:
                 uploaded_file = files[0]
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp_out:
-                    output_path = tmp_out.name
-                    temp_files_to_clean.append(output_path)
-                
-                convert_single_pdf_to_word(uploaded_file, output_path)
+                input_path = uploads.upload_path(uploaded_file, '.pdf', temp_files_to_clean)
+                output_path = new_temp_path('.docx', temp_files_to_clean)
+                # One document: pdf2docx spreads long ranges over several processes
+                page_render.pdf_to_docx(input_path, output_path, **page_range)
                 
                 with open(output_path, 'rb') as f:
                     file_data = f.read()
                     
                 response = HttpResponse(file_data, content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
                 response['Content-Disposition'] = f'attachment; filename="{uploaded_file.name.replace(".pdf", "")}.docx"'
-                
-                # Cleanup
-                for path in temp_files_to_clean:
-                    if os.path.exists(path):
-                        os.remove(path)
-                        
                 return response
             
             else:
                 # Batch Processing
                 zip_filename = "hewor_converted_word_files.zip"
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp_zip:
-                    zip_path = tmp_zip.name
-                    temp_files_to_clean.append(zip_path)
-                
+                jobs = []
+                for uploaded_file in files:
+                    input_path = uploads.upload_path(uploaded_file, '.pdf', temp_files_to_clean)
+                    output_path = new_temp_path('.docx', temp_files_to_clean)
+                    # Members convert concurrently, one process each
+                    jobs.append((uploaded_file.name, tool_pool.submit(pdf_tasks.pdf_to_docx, input_path, output_path, **page_range)))
+
+                zip_path = new_temp_path('.zip', temp_files_to_clean)
                 with zipfile.ZipFile(zip_path, 'w') as zipf:
-                    for uploaded_file in files:
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp_out:
-                            output_path = tmp_out.name
-                            temp_files_to_clean.append(output_path)
-                        
+                    for name, job in jobs:
                         try:
-                            convert_single_pdf_to_word(uploaded_file, output_path)
-                            zipf.write(output_path, arcname=f"{uploaded_file.name.replace('.pdf', '')}.docx")
+                            zipf.write(tool_pool.result(job), arcname=f"{name.replace('.pdf', '')}.docx")
                         except Exception as e:
-                            logger.error(f"Failed to convert {uploaded_file.name}: {e}")
+                            logger.error(f"Failed to convert {name}: {e}")
 
                 with open(zip_path, 'rb') as f:
                     zip_data = f.read()
                     
                 response = HttpResponse(zip_data, content_type='application/zip')
                 response['Content-Disposition'] = f'attachment; filename="{zip_filename}"'
-                
-                for path in temp_files_to_clean:
-                    if os.path.exists(path):
-                        os.remove(path)
-                        
                 return response
 
         except Exception as e:
             logger.error(f"Error converting PDF to Word: {e}")
             messages.error(request, f"Error processing file: {str(e)}")
-            # Clean up on error
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    try: os.remove(path)
-                    except: pass
             return redirect('pdf_to_word_tool')
+        finally:
+            cleanup_temp_files(temp_files_to_clean)
 
     return render(request, 'core/pdf_to_word.html')
         
@@ -1337,65 +1527,38 @@ def pdf_to_ppt_tool(request):
             messages.error(request, "Please upload a PDF file.")
             return redirect('pdf_to_ppt_tool')
 
-        MAX_SIZE_MB = 100
-        temp_files_to_clean = []
-        
+        # Slide image settings: resolution, format and JPEG quality
         try:
-            def convert_single_pdf_to_pptx(pdf_file, output_pptx_path):
-                # Save input PDF to temp file
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-                    for chunk in pdf_file.chunks():
-                        tmp_pdf.write(chunk)
-                    temp_pdf_path = tmp_pdf.name
-                    temp_files_to_clean.append(temp_pdf_path)
-
-                doc = fitz.open(temp_pdf_path)
-                prs = Presentation()
-                
-                # Standard slide size (10x7.5 inches) or Wide (13.33x7.5)
-                # We can try to match PDF aspect ratio or just use standard
-                # Let's set slide size to match the first page of PDF if possible
-                if len(doc) > 0:
-                    page = doc[0]
-                    # PyMuPDF uses points. 1 inch = 72 points.
-                    # python-pptx uses EMU. Inches(1)
-                    width_pt = page.rect.width
-                    height_pt = page.rect.height
-                    
-                    prs.slide_width = int(width_pt * 914400 / 72)
-                    prs.slide_height = int(height_pt * 914400 / 72)
-
-                blank_slide_layout = prs.slide_layouts[6] 
+            slide_options = {
+                'dpi': min(300, max(72, int(request.POST.get('dpi', 144)))),
+                'image_format': 'png' if request.POST.get('image_format') == 'png' else 'jpeg',
+                'quality': min(95, max(30, int(request.POST.get('quality', 80)))),
+            }
+        except ValueError:
+            messages.error(request, "Invalid slide image settings.")
+            return redirect('pdf_to_ppt_tool')
 
-                for page_num in range(len(doc)):
-                    page = doc[page_num]
-                    # Render high quality image (zoom=2)
-                    mat = fitz.Matrix(2, 2)
-                    pix = page.get_pixmap(matrix=mat)
-                    
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp_img:
-                        pix.save(tmp_img.name)
-                        tmp_img_path = tmp_img.name
-                        temp_files_to_clean.append(tmp_img_path)
-                    
-                    slide = prs.slides.add_slide(blank_slide_layout)
-                    slide.shapes.add_picture(tmp_img_path, 0, 0, width=prs.slide_width, height=prs.slide_height)
+        # Checked before anything is queued or stored, in every mode
+        MAX_SIZE_MB = 100
+        for file in files:
+            if file.size > MAX_SIZE_MB * 1024 * 1024:
+                messages.error(request, f"{file.name} exceeds the {MAX_SIZE_MB}MB limit.")
+                return redirect('pdf_to_ppt_tool')
 
-                prs.save(output_pptx_path)
-                doc.close()
+        if tool_jobs.wants_job_mode(request):
+            job = tool_jobs.create_job(request, 'pdf_to_ppt', files, options=slide_options)
+            return JsonResponse(tool_jobs.job_payload(job), status=202)
 
+        temp_files_to_clean = []
+        
+        try:
             # Single File Case
             if len(files) == 1:
                 file = files[0]
-                if file.size > MAX_SIZE_MB * 1024 * 1024:
-                     messages.error(request, f"File size exceeds {MAX_SIZE_MB}MB limit.")
-                     return redirect('pdf_to_ppt_tool')
-
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx') as tmp_pptx:
-                    temp_pptx_path = tmp_pptx.name
-                    temp_files_to_clean.append(temp_pptx_path)
-                
-                convert_single_pdf_to_pptx(file, temp_pptx_path)
+                input_path = uploads.upload_path(file, '.pdf', temp_files_to_clean)
+                temp_pptx_path = new_temp_path('.pptx', temp_files_to_clean)
+                # One document: spread its pages over every pool worker
+                page_render.pdf_to_pptx(input_path, temp_pptx_path, **slide_options)
 
                 with open(temp_pptx_path, 'rb') as pptx_file:
                     response = HttpResponse(pptx_file.read(), content_type='application/vnd.openxmlformats-officedocument.presentationml.presentation')
@@ -1406,20 +1569,20 @@ def pdf_to_ppt_tool(request):
             
             # Batch Case
             else:
+                jobs = []
+                for file in files:
+                    input_path = uploads.upload_path(file, '.pdf', temp_files_to_clean)
+                    temp_pptx_path = new_temp_path('.pptx', temp_files_to_clean)
+                    jobs.append((file.name, tool_pool.submit(pdf_tasks.pdf_to_pptx, input_path, temp_pptx_path, **slide_options)))
+
                 zip_buffer = io.BytesIO()
                 with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                    for file in files:
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx') as tmp_pptx:
-                            temp_pptx_path = tmp_pptx.name
-                            temp_files_to_clean.append(temp_pptx_path)
-                        
+                    for name, job in jobs:
                         try:
-                            convert_single_pdf_to_pptx(file, temp_pptx_path)
-                            base_name = os.path.splitext(file.name)[0]
-                            zip_file.write(temp_pptx_path, f"{base_name}.pptx")
+                            base_name = os.path.splitext(name)[0]
+                            zip_file.write(tool_pool.result(job), f"{base_name}.pptx")
                         except Exception as sub_e:
-                            logger.error(f"Error in batch pdf2pptx for {file.name}: {sub_e}")
-                            pass
+                            logger.error(f"Error in batch pdf2pptx for {name}: {sub_e}")
 
                 zip_buffer.seek(0)
                 response = HttpResponse(zip_buffer, content_type='application/zip')
@@ -1432,16 +1595,12 @@ def pdf_to_ppt_tool(request):
             return redirect('pdf_to_ppt_tool')
         
         finally:
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    try:
-                        os.remove(path)
-                    except:
-                        pass
+            cleanup_temp_files(temp_files_to_clean)
 
     return render(request, 'core/pdf_to_powerpoint.html')
 
 
+
 @login_required(login_url='freelancer_login')
 def freelancer_reject_order(request, order_id):
     try:
@@ -1461,7 +1620,7 @@ def freelancer_reject_order(request, order_id):
 def pdf_to_excel_tool(request):
     """
     View to handle Free PDF to Excel tool.
-    Uses pdfplumber to extract tables and pandas to save as Excel.
+    Finds tables with PyMuPDF (default) or pdfplumber and writes them with openpyxl.
     """
     if request.method == 'POST':
         files = request.FILES.getlist('pdf_files')
@@ -1470,53 +1629,24 @@ def pdf_to_excel_tool(request):
             messages.error(request, "Please upload a PDF file.")
             return redirect('pdf_to_excel_tool')
 
+        engine = request.POST.get('engine', 'pymupdf')
+        if engine not in pdf_tasks.TABLE_ENGINES:
+            engine = 'pymupdf'
+
+        if tool_jobs.wants_job_mode(request):
+            job = tool_jobs.create_job(request, 'pdf_to_excel', files, options={'engine': engine})
+            return JsonResponse(tool_jobs.job_payload(job), status=202)
+
         temp_files_to_clean = []
         
         try:
-            def convert_single_pdf_to_excel(pdf_file, output_excel_path):
-                # Save input PDF to temp file
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-                    for chunk in pdf_file.chunks():
-                        tmp_pdf.write(chunk)
-                    temp_pdf_path = tmp_pdf.name
-                    temp_files_to_clean.append(temp_pdf_path)
-
-                # Extract and write to Excel
-                # Extract all tables first
-                all_tables_data = []
-                with pdfplumber.open(temp_pdf_path) as pdf:
-                    for i, page in enumerate(pdf.pages):
-                        tables = page.extract_tables()
-                        for j, table in enumerate(tables):
-                            if table:
-                                all_tables_data.append({
-                                    'sheet_name': f'Page_{i+1}_Table_{j+1}',
-                                    'data': table
-                                })
-                
-                # Write to Excel
-                if not all_tables_data:
-                    # Create a dummy sheet if no tables found to avoid error
-                    with pd.ExcelWriter(output_excel_path, engine='openpyxl') as writer:
-                        pd.DataFrame(["No tables found in this PDF"]).to_excel(writer, sheet_name="Info", index=False, header=False)
-                else:
-                    with pd.ExcelWriter(output_excel_path, engine='openpyxl') as writer:
-                        for item in all_tables_data:
-                            sheet_name = item['sheet_name']
-                            if len(sheet_name) > 31:
-                                sheet_name = sheet_name[:31]
-                            pd.DataFrame(item['data']).to_excel(writer, sheet_name=sheet_name, index=False, header=False)
-
-            results = []
-            
             if len(files) == 1:
                 # Single file case
                 uploaded_file = files[0]
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_out:
-                    output_path = tmp_out.name
-                    temp_files_to_clean.append(output_path)
-                
-                convert_single_pdf_to_excel(uploaded_file, output_path)
+                input_path = uploads.upload_path(uploaded_file, '.pdf', temp_files_to_clean)
+                output_path = new_temp_path('.xlsx', temp_files_to_clean)
+                # One document: spread its pages over every pool worker
+                page_render.pdf_to_xlsx(input_path, output_path, engine=engine)
                 
                 # Serve file
                 with open(output_path, 'rb') as f:
@@ -1524,55 +1654,55 @@ def pdf_to_excel_tool(request):
                     
                 response = HttpResponse(file_data, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
                 response['Content-Disposition'] = f'attachment; filename="{uploaded_file.name.replace(".pdf", "")}.xlsx"'
-                
-                # Cleanup
-                for path in temp_files_to_clean:
-                    if os.path.exists(path):
-                        os.remove(path)
-                        
                 return response
             
             else:
                 # Batch processing
                 zip_filename = "hewor_converted_excel_files.zip"
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp_zip:
-                    zip_path = tmp_zip.name
-                    temp_files_to_clean.append(zip_path)
-                
+                jobs = []
+                for uploaded_file in files:
+                    input_path = uploads.upload_path(uploaded_file, '.pdf', temp_files_to_clean)
+                    output_path = new_temp_path('.xlsx', temp_files_to_clean)
+                    jobs.append((uploaded_file.name, tool_pool.submit(pdf_tasks.pdf_to_xlsx, input_path, output_path, engine=engine)))
+
+                zip_path = new_temp_path('.zip', temp_files_to_clean)
                 with zipfile.ZipFile(zip_path, 'w') as zipf:
-                    for uploaded_file in files:
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_out:
-                            output_path = tmp_out.name
-                            temp_files_to_clean.append(output_path)
-                        
-                        convert_single_pdf_to_excel(uploaded_file, output_path)
-                        zipf.write(output_path, arcname=f"{uploaded_file.name.replace('.pdf', '')}.xlsx")
+                    for name, job in jobs:
+                        zipf.write(tool_pool.result(job), arcname=f"{name.replace('.pdf', '')}.xlsx")
                 
                 with open(zip_path, 'rb') as f:
                     zip_data = f.read()
                     
                 response = HttpResponse(zip_data, content_type='application/zip')
                 response['Content-Disposition'] = f'attachment; filename="{zip_filename}"'
-                
-                for path in temp_files_to_clean:
-                    if os.path.exists(path):
-                        os.remove(path)
-                        
                 return response
 
         except Exception as e:
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
             messages.error(request, f"Error converting files: {str(e)}")
             return redirect('pdf_to_excel_tool')
+        finally:
+            cleanup_temp_files(temp_files_to_clean)
 
     return render(request, 'core/pdf_to_excel.html')
 
+def tool_job_status(request, job_id):
+    """Polling endpoint for background tool jobs."""
+    job = get_object_or_404(ToolJob, id=job_id)
+    return JsonResponse(tool_jobs.job_payload(job))
+
+def tool_job_download(request, job_id):
+    """Serve the result of a finished background tool job."""
+    job = get_object_or_404(ToolJob, id=job_id)
+    if job.status != 'done' or not job.result_file:
+        raise Http404("Result is not ready.")
+    return FileResponse(job.result_file.open('rb'), as_attachment=True, filename=job.result_name)
+
 def word_to_pdf_tool(request):
     """
     View to handle Free Word to PDF tool.
-    Tries docx2pdf first (best quality), falls back to python-docx + xhtml2pdf.
+    DOCX files are laid out in pure Python (python-docx + PyMuPDF, see
+    core/docx_layout.py) on the tool pool; several files convert concurrently
+    and come back as one ZIP.
     """
     if request.method == 'POST':
         files = request.FILES.getlist('word_files')
@@ -1584,127 +1714,25 @@ def word_to_pdf_tool(request):
         temp_files_to_clean = []
         
         try:
-            def convert_single_word_to_pdf(docx_file, output_pdf_path):
-                # Save input DOCX to temp file
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp_docx:
-                    for chunk in docx_file.chunks():
-                        tmp_docx.write(chunk)
-                    temp_docx_path = tmp_docx.name
-                    temp_files_to_clean.append(temp_docx_path)
-
-                # Conversion Logic
-                conversion_success = False
-                
-                # Method 1: docx2pdf (Requires MS Word installed)
-                # We skip this for now on server environments usually, but let's try safely
-                try:
-                    from docx2pdf import convert
-                    # Note: docx2pdf might fail if no Word is installed or on Linux headless
-                    # convert(temp_docx_path, output_pdf_path) 
-                    # Commented out to prefer the safe method for now to avoid hanging
-                    pass
-                except:
-                    pass
-
-                if not conversion_success:
-                    # Method 2: python-docx -> HTML -> xhtml2pdf (Disabled due to build issues)
-                    try:
-                        # import docx
-                        # from xhtml2pdf import pisa
-                        messages.warning(request, "Word to PDF conversion is undergoing maintenance for server-side optimization. Please try again later.")
-                        return redirect('word_to_pdf_tool')
-                        
-                        doc = docx.Document(temp_docx_path)
-                        html_content = "<html><head><style>body { font-family: Helvetica, sans-serif; }</style></head><body>"
-                        
-                        for para in doc.paragraphs:
-                            # Basic styling handling
-                            style = para.style.name.lower()
-                            text = para.text.strip()
-                            if not text:
-                                continue
-                                
-                            if 'heading' in style:
-                                level = style.replace('heading ', '')
-                                html_content += f"<h{level}>{text}</h{level}>"
-                            else:
-                                html_content += f"<p>{text}</p>"
-                                
-                        html_content += "</body></html>"
-                        
-                        with open(output_pdf_path, "wb") as pdf_file:
-                            pisa_status = pisa.CreatePDF(html_content, dest=pdf_file)
-                            
-                        if pisa_status.err:
-                            raise Exception("PDF generation failed")
-                        
-                        conversion_success = True
-                    except Exception as e:
-                        logger.error(f"Word conversion failed: {e}")
-                        raise e
-
-            # Batch processing logic
-            if len(files) == 1:
-                uploaded_file = files[0]
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_out:
-                    output_path = tmp_out.name
-                    temp_files_to_clean.append(output_path)
-                
-                convert_single_word_to_pdf(uploaded_file, output_path)
-                
-                with open(output_path, 'rb') as f:
-                    file_data = f.read()
-                    
-                response = HttpResponse(file_data, content_type='application/pdf')
-                response['Content-Disposition'] = f'attachment; filename="{uploaded_file.name.replace(".docx", "").replace(".doc", "")}.pdf"'
-                
-                for path in temp_files_to_clean:
-                    if os.path.exists(path):
-                        os.remove(path)
-                return response
-            
-            else:
-                zip_filename = "hewor_converted_pdf_files.zip"
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp_zip:
-                    zip_path = tmp_zip.name
-                    temp_files_to_clean.append(zip_path)
-                
-                with zipfile.ZipFile(zip_path, 'w') as zipf:
-                    for uploaded_file in files:
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_out:
-                            output_path = tmp_out.name
-                            temp_files_to_clean.append(output_path)
-                        
-                        try:
-                            convert_single_word_to_pdf(uploaded_file, output_path)
-                            zipf.write(output_path, arcname=f"{uploaded_file.name.replace('.docx', '').replace('.doc', '')}.pdf")
-                        except Exception as e:
-                             logger.error(f"Failed to convert {uploaded_file.name}: {e}")
-                
-                with open(zip_path, 'rb') as f:
-                    zip_data = f.read()
-                    
-                response = HttpResponse(zip_data, content_type='application/zip')
-                response['Content-Disposition'] = f'attachment; filename="{zip_filename}"'
-                
-                for path in temp_files_to_clean:
-                    if os.path.exists(path):
-                        os.remove(path)
-                return response
-
+            return per_file_tool_response(
+                files, 'word_to_pdf', pdf_tasks.docx_to_pdf, (), '', temp_files_to_clean,
+                cache_params={}, input_suffix='.docx',
+            )
         except Exception as e:
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
+            logger.error(f"Word conversion failed: {e}")
             messages.error(request, f"Error converting files: {str(e)}")
             return redirect('word_to_pdf_tool')
+        finally:
+            cleanup_temp_files(temp_files_to_clean)
 
     return render(request, 'core/word_to_pdf.html')
 
 def excel_to_pdf_tool(request):
     """
     View to handle Free Excel to PDF tool.
-    Uses pandas to read Excel and xhtml2pdf to generate PDF.
+    XLSX workbooks are streamed row by row into table pages (openpyxl in
+    read-only mode, see core/xlsx_layout.py) on the tool pool, so memory stays
+    flat however many rows a sheet has; several files come back as one ZIP.
     """
     if request.method == 'POST':
         files = request.FILES.getlist('excel_files')
@@ -1716,115 +1744,26 @@ def excel_to_pdf_tool(request):
         temp_files_to_clean = []
         
         try:
-            def convert_single_excel_to_pdf(xlsx_file, output_pdf_path):
-                # Save input XLSX to temp file
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_xlsx:
-                    for chunk in xlsx_file.chunks():
-                        tmp_xlsx.write(chunk)
-                    temp_xlsx_path = tmp_xlsx.name
-                    temp_files_to_clean.append(temp_xlsx_path)
-
-                try:
-                    import pandas as pd
-                    # from xhtml2pdf import pisa
-                    messages.warning(request, "Excel to PDF conversion is undergoing maintenance for server-side optimization. Please try again later.")
-                    return redirect('excel_to_pdf_tool')
-
-                    
-                    # Read all sheets
-                    xls = pd.ExcelFile(temp_xlsx_path)
-                    html_content = "<html><head><style>"
-                    html_content += "@page { size: A4 landscape; margin: 1cm; }"
-                    html_content += "table { border-collapse: collapse; width: 100%; margin-bottom: 20px; font-size: 10px; }"
-                    html_content += "th, td { border: 1px solid #ddd; padding: 5px; text-align: left; }"
-                    html_content += "th { background-color: #f2f2f2; font-weight: bold; }"
-                    html_content += "h2 { font-family: sans-serif; color: #333; }"
-                    html_content += "</style></head><body>"
-                    
-                    for sheet_name in xls.sheet_names:
-                        df = pd.read_excel(xls, sheet_name=sheet_name)
-                        if not df.empty:
-                            html_content += f"<h2>Sheet: {sheet_name}</h2>"
-                            # Convert to HTML
-                            table_html = df.to_html(index=False, classes='table')
-                            html_content += table_html
-                            html_content += "<br/>"
-                            
-                    html_content += "</body></html>"
-                    
-                    with open(output_pdf_path, "wb") as pdf_file:
-                        pisa_status = pisa.CreatePDF(html_content, dest=pdf_file)
-                        
-                    if pisa_status.err:
-                        raise Exception("PDF generation failed")
-
-                except Exception as e:
-                    logger.error(f"Excel conversion failed: {e}")
-                    raise e
-
-            # Batch processing logic
-            if len(files) == 1:
-                uploaded_file = files[0]
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_out:
-                    output_path = tmp_out.name
-                    temp_files_to_clean.append(output_path)
-                
-                convert_single_excel_to_pdf(uploaded_file, output_path)
-                
-                with open(output_path, 'rb') as f:
-                    file_data = f.read()
-                    
-                response = HttpResponse(file_data, content_type='application/pdf')
-                response['Content-Disposition'] = f'attachment; filename="{uploaded_file.name.replace(".xlsx", "").replace(".xls", "")}.pdf"'
-                
-                for path in temp_files_to_clean:
-                    if os.path.exists(path):
-                        os.remove(path)
-                return response
-            
-            else:
-                zip_filename = "hewor_converted_pdf_files.zip"
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp_zip:
-                    zip_path = tmp_zip.name
-                    temp_files_to_clean.append(zip_path)
-                
-                with zipfile.ZipFile(zip_path, 'w') as zipf:
-                    for uploaded_file in files:
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_out:
-                            output_path = tmp_out.name
-                            temp_files_to_clean.append(output_path)
-                        
-                        try:
-                            convert_single_excel_to_pdf(uploaded_file, output_path)
-                            zipf.write(output_path, arcname=f"{uploaded_file.name.replace('.xlsx', '').replace('.xls', '')}.pdf")
-                        except Exception as e:
-                             logger.error(f"Failed to convert {uploaded_file.name}: {e}")
-                
-                with open(zip_path, 'rb') as f:
-                    zip_data = f.read()
-                    
-                response = HttpResponse(zip_data, content_type='application/zip')
-                response['Content-Disposition'] = f'attachment; filename="{zip_filename}"'
-                
-                for path in temp_files_to_clean:
-                    if os.path.exists(path):
-                        os.remove(path)
-                return response
-
+            return per_file_tool_response(
+                files, 'excel_to_pdf', pdf_tasks.xlsx_to_pdf, (), '', temp_files_to_clean,
+                cache_params={}, input_suffix='.xlsx',
+            )
         except Exception as e:
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
+            logger.error(f"Excel conversion failed: {e}")
             messages.error(request, f"Error converting files: {str(e)}")
             return redirect('excel_to_pdf_tool')
+        finally:
+            cleanup_temp_files(temp_files_to_clean)
 
     return render(request, 'core/excel_to_pdf.html')
 
 def ppt_to_pdf_tool(request):
     """
     View to handle Free PowerPoint to PDF tool.
-    Extracts text content from slides and generates a PDF report.
-    Note: Does not preserve layout (requires LibreOffice for that).
+    The slide text goes into a Platypus story, on the tool pool; with
+    TOOL_PPTX_SLIDE_RENDERER every visible slide is drawn onto one PDF page
+    with its shapes, pictures, text and tables in place instead (see
+    core/pptx_layout.py). Several files come back as one ZIP.
     """
     if request.method == 'POST':
         files = request.FILES.getlist('ppt_files')
@@ -1834,110 +1773,19 @@ def ppt_to_pdf_tool(request):
             return redirect('ppt_to_pdf_tool')
 
         temp_files_to_clean = []
+        slides = getattr(settings, 'TOOL_PPTX_SLIDE_RENDERER', False)
         
         try:
-            def convert_single_ppt_to_pdf(ppt_file, output_pdf_path):
-                # Save input PPTX to temp file
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx') as tmp_ppt:
-                    for chunk in ppt_file.chunks():
-                        tmp_ppt.write(chunk)
-                    temp_ppt_path = tmp_ppt.name
-                    temp_files_to_clean.append(temp_ppt_path)
-
-                try:
-                    from pptx import Presentation
-                    from reportlab.lib.pagesizes import letter
-                    from reportlab.pdfgen import canvas
-                    from reportlab.lib import colors
-                    from reportlab.lib.styles import getSampleStyleSheet
-                    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-                    
-                    # Use Platypus for better text wrapping
-                    doc = SimpleDocTemplate(output_pdf_path, pagesize=letter)
-                    story = []
-                    styles = getSampleStyleSheet()
-                    
-                    prs = Presentation(temp_ppt_path)
-                    
-                    for i, slide in enumerate(prs.slides):
-                        # Slide Header
-                        story.append(Paragraph(f"<b>Slide {i+1}</b>", styles['Heading2']))
-                        story.append(Spacer(1, 12))
-                        
-                        # Extract Text
-                        slide_text = []
-                        # shapes are not always in reading order, but we try
-                        for shape in slide.shapes:
-                            if hasattr(shape, "has_text_frame") and shape.has_text_frame:
-                                for paragraph in shape.text_frame.paragraphs:
-                                    text = paragraph.text.strip()
-                                    if text:
-                                        story.append(Paragraph(text, styles['BodyText']))
-                                        story.append(Spacer(1, 6))
-                        
-                        story.append(PageBreak())
-                        
-                    doc.build(story)
-
-                except Exception as e:
-                    logger.error(f"PPT conversion failed: {e}")
-                    raise e
-
-            # Batch processing logic
-            if len(files) == 1:
-                uploaded_file = files[0]
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_out:
-                    output_path = tmp_out.name
-                    temp_files_to_clean.append(output_path)
-                
-                convert_single_ppt_to_pdf(uploaded_file, output_path)
-                
-                with open(output_path, 'rb') as f:
-                    file_data = f.read()
-                    
-                response = HttpResponse(file_data, content_type='application/pdf')
-                response['Content-Disposition'] = f'attachment; filename="{uploaded_file.name.replace(".pptx", "").replace(".ppt", "")}.pdf"'
-                
-                for path in temp_files_to_clean:
-                    if os.path.exists(path):
-                        os.remove(path)
-                return response
-            
-            else:
-                zip_filename = "hewor_converted_pdf_files.zip"
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp_zip:
-                    zip_path = tmp_zip.name
-                    temp_files_to_clean.append(zip_path)
-                
-                with zipfile.ZipFile(zip_path, 'w') as zipf:
-                    for uploaded_file in files:
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_out:
-                            output_path = tmp_out.name
-                            temp_files_to_clean.append(output_path)
-                        
-                        try:
-                            convert_single_ppt_to_pdf(uploaded_file, output_path)
-                            zipf.write(output_path, arcname=f"{uploaded_file.name.replace('.pptx', '').replace('.ppt', '')}.pdf")
-                        except Exception as e:
-                             logger.error(f"Failed to convert {uploaded_file.name}: {e}")
-                
-                with open(zip_path, 'rb') as f:
-                    zip_data = f.read()
-                    
-                response = HttpResponse(zip_data, content_type='application/zip')
-                response['Content-Disposition'] = f'attachment; filename="{zip_filename}"'
-                
-                for path in temp_files_to_clean:
-                    if os.path.exists(path):
-                        os.remove(path)
-                return response
-
+            return per_file_tool_response(
+                files, 'ppt_to_pdf', pdf_tasks.pptx_to_pdf if slides else pdf_tasks.pptx_text_to_pdf, (), '',
+                temp_files_to_clean, cache_params={'slides': slides}, input_suffix='.pptx',
+            )
         except Exception as e:
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
+            logger.error(f"PPT conversion failed: {e}")
             messages.error(request, f"Error converting files: {str(e)}")
             return redirect('ppt_to_pdf_tool')
+        finally:
+            cleanup_temp_files(temp_files_to_clean)
 
     return render(request, 'core/ppt_to_pdf.html')
 
@@ -1953,89 +1801,69 @@ def pdf_to_jpg_tool(request):
             messages.error(request, "Please upload a PDF file.")
             return redirect('pdf_to_jpg_tool')
 
+        try:
+            quality = min(95, max(30, int(request.POST.get('quality', settings.TOOL_JPEG_QUALITY))))
+        except ValueError:
+            quality = settings.TOOL_JPEG_QUALITY
+
         temp_files_to_clean = []
         
         try:
-            def convert_single_pdf_to_jpgs(pdf_file, output_zip_path):
-                # Save input PDF to temp file
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-                    for chunk in pdf_file.chunks():
-                        tmp_pdf.write(chunk)
-                    temp_pdf_path = tmp_pdf.name
-                    temp_files_to_clean.append(temp_pdf_path)
-
-                # Open PDF and convert pages
-                doc = fitz.open(temp_pdf_path)
-                base_name = pdf_file.name.replace('.pdf', '')
-                
-                with zipfile.ZipFile(output_zip_path, 'w') as zipf:
-                    for i, page in enumerate(doc):
-                        # clear resolution (zoom=2 means 144dpi approx, good for screen)
-                        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-                        
-                        # Save each page as JPG
-                        img_filename = f"{base_name}_page_{i+1}.jpg"
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_img:
-                            pix.save(tmp_img.name)
-                            temp_files_to_clean.append(tmp_img.name)
-                            
-                            # Add to zip
-                            zipf.write(tmp_img.name, arcname=img_filename)
-            
-            # Use a main ZIP for the download
             final_zip_filename = "hewor_converted_jpgs.zip"
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp_final_zip:
-                final_zip_path = tmp_final_zip.name
-                temp_files_to_clean.append(final_zip_path)
-            
-            # Since even a single PDF produces multiple JPGs, we always return a ZIP of JPGs (or ZIP of folders if batch)
-            # Simpler approach: Just put all images in one ZIP. If batch, prefix with filename.
-            
-            with zipfile.ZipFile(final_zip_path, 'w') as final_zip:
-                for uploaded_file in files:
-                    # Save input PDF to temp
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-                        for chunk in uploaded_file.chunks():
-                            tmp_pdf.write(chunk)
-                        temp_pdf_path = tmp_pdf.name
-                        temp_files_to_clean.append(temp_pdf_path)
-                    
-                    doc = fitz.open(temp_pdf_path)
-                    base_name = uploaded_file.name.replace('.pdf', '')
-                    
-                    for i, page in enumerate(doc):
-                         pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-                         img_filename = f"{base_name}_page_{i+1}.jpg"
-                         
-                         with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_img:
-                            pix.save(tmp_img.name)
-                            temp_files_to_clean.append(tmp_img.name)
-                            final_zip.write(tmp_img.name, arcname=img_filename)
-
-            with open(final_zip_path, 'rb') as f:
-                zip_data = f.read()
-                
-            response = HttpResponse(zip_data, content_type='application/zip')
-            response['Content-Disposition'] = f'attachment; filename="{final_zip_filename}"'
-            
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
-            return response
+            cache_key = result_cache.make_key(
+                'pdf_to_jpg', [result_cache.digest_upload(f) for f in files],
+                names=[f.name for f in files], quality=quality,
+            )
+            cached = cached_tool_response(cache_key, 'application/zip', final_zip_filename)
+            if cached:
+                return cached
+
+            # Workers encode JPEG bytes in memory, a few pages at a time and only
+            # about one range per worker ahead of the ZIP, so memory stays flat
+            # however many pages there are. Page counts and the render budget are
+            # checked here, while we can still redirect.
+            jobs = []
+            for uploaded_file in files:
+                input_path = uploads.upload_path(uploaded_file, '.pdf', temp_files_to_clean)
+                base_name = uploaded_file.name.replace('.pdf', '')
+                page_count = pdf_tasks.count_render_pages(input_path)
+                ranges = tool_pool.stream_page_ranges(
+                    pdf_tasks.render_page_images, input_path, page_count, quality=quality, checked=True,
+                )
+                jobs.append((uploaded_file.name, base_name, ranges))
+
+            # Since even a single PDF produces multiple JPGs, we always return a ZIP of JPGs.
+            # If batch, images are prefixed with their source filename.
+            manifest = BatchManifest('pdf_to_jpg', len(files))
+
+            def members():
+                for name, base_name, ranges in jobs:
+                    for (start, stop), future in ranges:
+                        try:
+                            images = tool_pool.result(future)
+                        except Exception as e:
+                            manifest.failed(name, e, f"pages {start + 1}-{stop}")
+                            continue
+                        for page_number, jpeg_bytes in enumerate(images, start=start + 1):
+                            arcname = f"{base_name}_page_{page_number}.jpg"
+                            manifest.ok(name, arcname)
+                            yield arcname, jpeg_bytes
+                yield from manifest.members()
+
+            return stream_zip_response(members(), final_zip_filename, temp_files_to_clean, cache_key, manifest)
 
         except Exception as e:
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
             messages.error(request, f"Error converting files: {str(e)}")
             return redirect('pdf_to_jpg_tool')
+        finally:
+            cleanup_temp_files(temp_files_to_clean)
 
     return render(request, 'core/pdf_to_jpg.html')
 
 def jpg_to_pdf_tool(request):
     """
     View to handle Free JPG to PDF tool.
-    Converts uploaded images to a single PDF.
+    Converts uploaded images to a single PDF; JPEGs are embedded without re-encoding.
     """
     if request.method == 'POST':
         files = request.FILES.getlist('jpg_files')
@@ -2047,171 +1875,79 @@ def jpg_to_pdf_tool(request):
         temp_files_to_clean = []
         
         try:
-            # Save all images first
-            image_paths = []
-            for img_file in files:
-                suffix = os.path.splitext(img_file.name)[1].lower()
-                if suffix not in ['.jpg', '.jpeg', '.png']:
-                    # Force valid suffix if missing or allow conversion later?
-                    # img2pdf requires jpg/jpeg naming or valid header
-                    suffix = '.jpg'
-                    
-                with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_img:
-                    for chunk in img_file.chunks():
-                        tmp_img.write(chunk)
-                    tmp_img.flush()
-                    image_paths.append(tmp_img.name)
-                    temp_files_to_clean.append(tmp_img.name)
-
-            # Define Output PDF
-            final_filename = "hewor_images_combined.pdf"
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-                output_pdf_path = tmp_pdf.name
-                temp_files_to_clean.append(output_pdf_path)
+            # Save all images first; the format is sniffed from the content, not the name
+            image_paths = [
+                uploads.upload_path(img_file, os.path.splitext(img_file.name)[1].lower(), temp_files_to_clean)
+                for img_file in files
+            ]
 
-            # TRY img2pdf first (best quality, direct embedding)
-            try:
-                import img2pdf
-                # img2pdf might fail on some PNGs (alpha channel), so fallback to PIL is safer for generic "Image to PDF".
-                # But let's try it if inputs are strictly JPEG.
-                # Actually, PIL is robust for user uploads that might be messy.
-                # Let's use PIL for maximum compatibility.
-                
-                from PIL import Image
-                
-                pil_images = []
-                for p in image_paths:
-                    img = Image.open(p)
-                    # Convert to RGB to avoid mode errors (e.g. RGBA -> PDF issue)
-                    if img.mode != 'RGB':
-                        img = img.convert('RGB')
-                    pil_images.append(img)
-                
-                if pil_images:
-                    base_image = pil_images[0]
-                    other_images = pil_images[1:] if len(pil_images) > 1 else []
-                    
-                    base_image.save(output_pdf_path, "PDF", resolution=100.0, save_all=True, append_images=other_images)
-                else:
-                    raise Exception("No valid images found")
-                    
-            except Exception as e:
-                # Fallback or error
-                logger.error(f"JPG to PDF failed: {e}")
-                raise e
+            # Assemble page by page on the tool pool, one image in memory at a time
+            final_filename = "hewor_images_combined.pdf"
+            output_pdf_path = new_temp_path('.pdf', temp_files_to_clean)
+            tool_pool.run(pdf_tasks.images_to_pdf, image_paths, output_pdf_path)
 
             # Serve File
-            with open(output_pdf_path, 'rb') as f:
-                pdf_data = f.read()
-                
-            response = HttpResponse(pdf_data, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{final_filename}"'
-            
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
-            return response
+            return FileResponse(
+                open(output_pdf_path, 'rb'), as_attachment=True,
+                filename=final_filename, content_type='application/pdf',
+            )
 
         except Exception as e:
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
+            logger.error(f"JPG to PDF failed: {e}")
             messages.error(request, f"Error converting files: {str(e)}")
             return redirect('jpg_to_pdf_tool')
+        finally:
+            cleanup_temp_files(temp_files_to_clean)
 
     return render(request, 'core/jpg_to_pdf.html')
 
 def sign_pdf_tool(request):
     """
     View to handle Free Sign PDF tool.
-    Allows user to upload a PDF and a signature (or draw one), and overlays it.
-    MVP: Places signature at bottom-right of the last page.
+    Allows user to upload PDFs and a signature (or draw one), and overlays it
+    on the selected pages (default: the last) at the given positions (default:
+    bottom right). Several PDFs come back as one ZIP.
     """
     if request.method == 'POST':
+        temp_files_to_clean = []
         # PDF File
         try:
-            pdf_file = request.FILES.get('pdf_file')
+            pdf_files = request.FILES.getlist('pdf_file')
             signature_data = request.POST.get('signature_data') # Base64 string from canvas
             
-            if not pdf_file or not signature_data:
+            if not pdf_files or not signature_data:
                 messages.error(request, "Please provide both a PDF and a signature.")
                 return redirect('sign_pdf_tool')
 
-            temp_files_to_clean = []
-            
-            # Save PDF
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-                for chunk in pdf_file.chunks():
-                    tmp_pdf.write(chunk)
-                temp_pdf_path = tmp_pdf.name
-                temp_files_to_clean.append(temp_pdf_path)
-            
-            # Save Signature Image (Base64 -> PNG)
+            pages_spec = request.POST.get('pages', '').strip()
+            try:
+                selection = page_selection.parse(pages_spec) if pages_spec else None
+                placements = pdf_tasks.parse_placements(request.POST.get('placements', ''))
+            except ValueError as e:
+                messages.error(request, str(e))
+                return redirect('sign_pdf_tool')
+
+            # Signature image (Base64 -> PNG bytes), embedded once per document
             import base64
-            from PIL import Image
-            import io
-            
-            format, imgstr = signature_data.split(';base64,') 
-            ext = format.split('/')[-1] 
-            
-            signature_bytes = base64.b64decode(imgstr)
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp_sig:
-               tmp_sig.write(signature_bytes)
-               temp_sig_path = tmp_sig.name
-               temp_files_to_clean.append(temp_sig_path)
-
-            # Output Path
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_out:
-                output_pdf_path = tmp_out.name
-                temp_files_to_clean.append(output_pdf_path)
-            
-            # Overlay Logic using PyMuPDF (fitz)
-            doc = fitz.open(temp_pdf_path)
-            
-            # Target Page: Last Page
-            page = doc[-1]
-            rect = page.rect
-            
-            # Defined Size for Signature (e.g., 200px width, aspect ratio maintained)
-            # Or simpler: Fixed box at bottom right
-            # PDF coords: (0,0) is top-left in PyMuPDF? No, it varies. PyMuPDF is top-left usually.
-            # Let's say we want it 50 units from bottom, 50 units from right.
-            
-            SIG_WIDTH = 150
-            SIG_HEIGHT = 80 # Approx
-            
-            # Calculate position: Bottom Right
-            x1 = rect.width - SIG_WIDTH - 50
-            y1 = rect.height - SIG_HEIGHT - 50
-            x2 = x1 + SIG_WIDTH
-            y2 = y1 + SIG_HEIGHT
-            
-            signature_rect = fitz.Rect(x1, y1, x2, y2)
-            
-            # Insert Image
-            page.insert_image(signature_rect, filename=temp_sig_path)
-            
-            doc.save(output_pdf_path)
-            
-            # Respond
-            with open(output_pdf_path, 'rb') as f:
-                pdf_data = f.read()
-            
-            response = HttpResponse(pdf_data, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{pdf_file.name.replace(".pdf", "")}_signed.pdf"'
-            
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
-            return response
+
+            try:
+                format, imgstr = signature_data.split(';base64,')
+                signature_bytes = base64.b64decode(imgstr)
+            except ValueError:  # includes binascii.Error
+                messages.error(request, "The signature could not be read. Please draw it again.")
+                return redirect('sign_pdf_tool')
+
+            # Appended as an incremental update when possible
+            return per_file_tool_response(
+                pdf_files, 'sign', pdf_tasks.sign_pdf, (signature_bytes, placements, selection),
+                '_signed', temp_files_to_clean,
+            )
 
         except Exception as e:
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
             messages.error(request, f"Error signing PDF: {str(e)}")
             return redirect('sign_pdf_tool')
+        finally:
+            cleanup_temp_files(temp_files_to_clean)
 
     return render(request, 'core/sign_pdf.html')
 
@@ -2219,20 +1955,15 @@ def html_to_pdf_tool(request):
     """
     View to handle Free HTML to PDF tool.
     Converts uploaded HTML files or URL to PDF.
-    Note: This is a simplified implementation using reportlab.
-    For complex HTML rendering, consider using a headless browser.
+    Laid out by MuPDF's HTML engine (headings, lists, tables and images are
+    kept); scripts and external stylesheets are not run or loaded.
     """
-    import requests
-    from bs4 import BeautifulSoup
-    from reportlab.lib.pagesizes import letter
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet
-    
     if request.method == 'POST':
         conversion_type = request.POST.get('conversion_type') # 'url' or 'file'
         
         temp_files_to_clean = []
         source_html = ""
+        images = {}
         filename_prefix = "converted"
         
         try:
@@ -2242,12 +1973,10 @@ def html_to_pdf_tool(request):
                     messages.error(request, "Please enter a valid URL.")
                     return redirect('html_to_pdf_tool')
                 
-                # Fetch URL content
+                # Fetch URL content (size- and time-bounded, cached)
                 try:
-                    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-                    response = requests.get(url, headers=headers, timeout=30)
-                    response.raise_for_status()
-                    source_html = response.text
+                    page = url_fetch.fetch(url)
+                    source_html, images = url_fetch.fetch_images(page.text(), page.url)
                     filename_prefix = url.split("//")[-1].replace("/", "_")[:20]
                 except Exception as e:
                     messages.error(request, f"Failed to fetch URL: {str(e)}")
@@ -2260,69 +1989,39 @@ def html_to_pdf_tool(request):
                     return redirect('html_to_pdf_tool')
                 
                 uploaded_file = files[0]
-                source_html = uploaded_file.read().decode('utf-8', errors='ignore')
+                with uploads.upload_buffer(uploaded_file) as content:
+                    source_html = str(content, 'utf-8', errors='ignore')
                 filename_prefix = uploaded_file.name.replace('.html', '').replace('.htm', '')
                 
             else:
                  messages.error(request, "Invalid request.")
                  return redirect('html_to_pdf_tool')
 
-            # Create PDF using reportlab (simple text extraction)
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-                output_path = tmp_pdf.name
-                temp_files_to_clean.append(output_path)
-            
-            # Extract text from HTML
-            soup = BeautifulSoup(source_html, 'html.parser')
-            text_content = soup.get_text(separator='\n', strip=True)
-            
-            # Create PDF
-            doc = SimpleDocTemplate(output_path, pagesize=letter)
-            story = []
-            styles = getSampleStyleSheet()
-            
-            # Split into paragraphs and add to story
-            for line in text_content.split('\n'):
-                if line.strip():
-                    try:
-                        p = Paragraph(line, styles['BodyText'])
-                        story.append(p)
-                        story.append(Spacer(1, 6))
-                    except:
-                        # Skip problematic lines
-                        continue
-                        
-            doc.build(story)
-                
-            # Serve File
-            with open(output_path, 'rb') as f:
-                pdf_data = f.read()
-            
-            response = HttpResponse(pdf_data, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{filename_prefix}.pdf"'
-            
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
-            return response
+            output_path = new_temp_path('.pdf', temp_files_to_clean)
+            tool_pool.run(pdf_tasks.html_to_pdf, source_html, output_path, images)
+
+            return FileResponse(
+                open(output_path, 'rb'), as_attachment=True,
+                filename=f"{filename_prefix}.pdf", content_type='application/pdf',
+            )
 
         except Exception as e:
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
             messages.error(request, f"Error converting: {str(e)}")
             return redirect('html_to_pdf_tool')
+        finally:
+            cleanup_temp_files(temp_files_to_clean)
 
     return render(request, 'core/html_to_pdf.html')
 
 def rotate_pdf_tool(request):
     """
     View to handle Free Rotate PDF tool.
-    Rotates all pages of a PDF by 90, 180, or 270 degrees.
+    Rotates all pages, or only the selected ones, by 90, 180, or 270 degrees.
     """
     if request.method == 'POST':
-        files = request.FILES.getlist('pdf_files') # Support multiple if needed, but UI usually single
+        files = request.FILES.getlist('pdf_files') # several files come back as one ZIP
         rotation = request.POST.get('rotation') # 90, 180, 270 (clockwise)
+        pages_str = request.POST.get('pages', '').strip() # blank = every page
         
         if not files or not rotation:
             messages.error(request, "Please provide a PDF and rotation angle.")
@@ -2335,132 +2034,89 @@ def rotate_pdf_tool(request):
         except:
              messages.error(request, "Invalid rotation angle.")
              return redirect('rotate_pdf_tool')
+
+        try:
+            selection = page_selection.parse(pages_str) if pages_str else None
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect('rotate_pdf_tool')
              
         temp_files_to_clean = []
         
         try:
-            # Handle Single File for now (simplest for rotation)
-            uploaded_file = files[0]
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-                for chunk in uploaded_file.chunks():
-                    tmp_pdf.write(chunk)
-                input_path = tmp_pdf.name
-                temp_files_to_clean.append(input_path)
-            
-            doc = fitz.open(input_path)
-            
-            for page in doc:
-                page.set_rotation(page.rotation + rotation_angle)
-            
-            filename_suffix = f"_rotated_{rotation_angle}"
-            output_filename = uploaded_file.name.replace('.pdf', '') + filename_suffix + ".pdf"
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_out:
-                output_path = tmp_out.name
-                temp_files_to_clean.append(output_path)
-            
-            doc.save(output_path)
-            
-            with open(output_path, 'rb') as f:
-                pdf_data = f.read()
-                
-            response = HttpResponse(pdf_data, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{output_filename}"'
-            
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
-            return response
+            return per_file_tool_response(
+                files, 'rotate_pdf', pdf_tasks.rotate_pages, (rotation_angle, selection),
+                f"_rotated_{rotation_angle}", temp_files_to_clean,
+                cache_params={'rotation': rotation_angle, 'pages': str(selection or '')},
+            )
             
         except Exception as e:
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
             messages.error(request, f"Error rotating PDF: {str(e)}")
             return redirect('rotate_pdf_tool')
+        finally:
+            cleanup_temp_files(temp_files_to_clean)
             
     return render(request, 'core/rotate_pdf.html')
 
 def add_watermark_tool(request):
     """
     View to handle Free Add Watermark tool.
-    Adds text watermark to all pages of a PDF.
+    Adds a text or image watermark to all pages of every uploaded PDF,
+    optionally rotated, translucent and tiled across the page.
     """
     if request.method == 'POST':
         files = request.FILES.getlist('pdf_files')
         watermark_text = request.POST.get('watermark_text', 'CONFIDENTIAL')
+        watermark_image = request.FILES.get('watermark_image')
+        tile = request.POST.get('tile') == 'on'
         
         if not files:
             messages.error(request, "Please upload a PDF file.")
             return redirect('add_watermark_tool')
 
+        if not watermark_image and not watermark_text.strip():
+            messages.error(request, "Please enter watermark text or choose an image.")
+            return redirect('add_watermark_tool')
+
+        try:
+            rotation = float(request.POST.get('rotation') or 45)
+            opacity = float(request.POST.get('opacity') or 0.3)
+            if not (-360 <= rotation <= 360 and 0 < opacity <= 1):
+                raise ValueError
+        except ValueError:
+            messages.error(request, "Invalid rotation or opacity.")
+            return redirect('add_watermark_tool')
+
         temp_files_to_clean = []
         
         try:
-            uploaded_file = files[0] # Single file support for now
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-                for chunk in uploaded_file.chunks():
-                    tmp_pdf.write(chunk)
-                input_path = tmp_pdf.name
-                temp_files_to_clean.append(input_path)
-            
-            doc = fitz.open(input_path)
-            
-            for page in doc:
-                # Calculate center
-                rect = page.rect
-                center = fitz.Point(rect.width / 2, rect.height / 2)
-                
-                # Insert Text
-                # fontname="helv", fontsize=50, rotate=45, color=(0.5, 0.5, 0.5), opacity=0.3
-                page.insert_text(
-                    center,
-                    watermark_text,
-                    fontname="helv",
-                    fontsize=50,
-                    rotate=0,
-                    color=(0.5, 0.5, 0.5)
+            image_path = None
+            cache_params = {'text': watermark_text, 'rotation': rotation, 'opacity': opacity, 'tile': tile}
+            if watermark_image:
+                cache_params = dict(cache_params, text='', image=result_cache.digest_upload(watermark_image))
+                image_path = uploads.upload_path(
+                    watermark_image, os.path.splitext(watermark_image.name)[1].lower(), temp_files_to_clean,
                 )
-                
-
 
-            output_filename = uploaded_file.name.replace('.pdf', '') + "_watermarked.pdf"
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_out:
-                output_path = tmp_out.name
-                temp_files_to_clean.append(output_path)
-            
-            doc.save(output_path)
-            
-            with open(output_path, 'rb') as f:
-                pdf_data = f.read()
-                
-            response = HttpResponse(pdf_data, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{output_filename}"'
-            
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
-            return response
+            return per_file_tool_response(
+                files, 'add_watermark', pdf_tasks.add_watermark,
+                (watermark_text, rotation, opacity, tile, image_path), "_watermarked",
+                temp_files_to_clean, cache_params=cache_params,
+            )
             
         except Exception as e:
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
             messages.error(request, f"Error creating watermark: {str(e)}")
             return redirect('add_watermark_tool')
+        finally:
+            cleanup_temp_files(temp_files_to_clean)
             
     return render(request, 'core/add_watermark.html')
 
 def protect_pdf_tool(request):
     """
     View to handle Free Protect PDF tool.
-    Encrypts PDF with a password using pikepdf.
+    Encrypts every uploaded PDF with a password using pikepdf.
     """
-    import pikepdf
-    
     if request.method == 'POST':
         files = request.FILES.getlist('pdf_files')
         password = request.POST.get('password')
@@ -2472,51 +2128,24 @@ def protect_pdf_tool(request):
         temp_files_to_clean = []
         
         try:
-            uploaded_file = files[0]
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-                for chunk in uploaded_file.chunks():
-                    tmp_pdf.write(chunk)
-                input_path = tmp_pdf.name
-                temp_files_to_clean.append(input_path)
-            
-            # Encrypt
-            output_filename = uploaded_file.name.replace('.pdf', '') + "_protected.pdf"
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_out:
-                output_path = tmp_out.name
-                temp_files_to_clean.append(output_path)
-            
-            with pikepdf.Pdf.open(input_path) as pdf:
-                pdf.save(output_path, encryption=pikepdf.Encryption(owner=password, user=password, R=6))
-            
-            with open(output_path, 'rb') as f:
-                pdf_data = f.read()
-                
-            response = HttpResponse(pdf_data, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{output_filename}"'
-            
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
-            return response
+            # Never cached: the password would be part of the key
+            return per_file_tool_response(
+                files, 'protect_pdf', pdf_tasks.protect_pdf, (password,), "_protected", temp_files_to_clean,
+            )
             
         except Exception as e:
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
             messages.error(request, f"Error protecting PDF: {str(e)}")
             return redirect('protect_pdf_tool')
+        finally:
+            cleanup_temp_files(temp_files_to_clean)
             
     return render(request, 'core/protect_pdf.html')
 
 def unlock_pdf_tool(request):
     """
     View to handle Free Unlock PDF tool.
-    Removes password from a PDF using pikepdf.
+    Removes the password from every uploaded PDF using pikepdf.
     """
-    import pikepdf
-    
     if request.method == 'POST':
         files = request.FILES.getlist('pdf_files')
         password = request.POST.get('password', '')
@@ -2528,52 +2157,26 @@ def unlock_pdf_tool(request):
         temp_files_to_clean = []
         
         try:
-            uploaded_file = files[0]
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-                for chunk in uploaded_file.chunks():
-                    tmp_pdf.write(chunk)
-                input_path = tmp_pdf.name
-                temp_files_to_clean.append(input_path)
-            
-            output_filename = uploaded_file.name.replace('.pdf', '') + "_unlocked.pdf"
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_out:
-                output_path = tmp_out.name
-                temp_files_to_clean.append(output_path)
-            
-            try:
-                # Try opening. If password needed and not provided, it will raise PasswordError
-                with pikepdf.Pdf.open(input_path, password=password) as pdf:
-                    pdf.save(output_path)
-            except pikepdf.PasswordError:
-                messages.error(request, "Incorrect password or password required.")
-                return redirect('unlock_pdf_tool')
-            
-            with open(output_path, 'rb') as f:
-                pdf_data = f.read()
-                
-            response = HttpResponse(pdf_data, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{output_filename}"'
-            
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
-            return response
+            # In a batch, files that won't open with this password are listed as failed in the manifest
+            return per_file_tool_response(
+                files, 'unlock_pdf', pdf_tasks.unlock_pdf, (password,), "_unlocked", temp_files_to_clean,
+            )
             
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect('unlock_pdf_tool')
         except Exception as e:
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
             messages.error(request, f"Error unlocking PDF: {str(e)}")
             return redirect('unlock_pdf_tool')
+        finally:
+            cleanup_temp_files(temp_files_to_clean)
             
     return render(request, 'core/unlock_pdf.html')
 
 def add_page_numbers_tool(request):
     """
     View to handle Free Add Page Numbers tool.
-    Adds 'Page X of Y' to the bottom of all pages.
+    Adds 'Page X of Y' to the bottom of all pages of every uploaded PDF.
     """
     if request.method == 'POST':
         files = request.FILES.getlist('pdf_files')
@@ -2586,57 +2189,16 @@ def add_page_numbers_tool(request):
         temp_files_to_clean = []
         
         try:
-            uploaded_file = files[0]
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-                for chunk in uploaded_file.chunks():
-                    tmp_pdf.write(chunk)
-                input_path = tmp_pdf.name
-                temp_files_to_clean.append(input_path)
-            
-            doc = fitz.open(input_path)
-            total_pages = len(doc)
-            
-            for i, page in enumerate(doc):
-                page_num = i + 1
-                text = f"Page {page_num} of {total_pages}"
-                
-                rect = page.rect
-                # Default: Bottom Center
-                # y = rect.height - 20
-                # x = rect.width / 2
-                
-                point = fitz.Point(rect.width / 2, rect.height - 20)
-                
-                # Textbox approach for better centering:
-                footer_rect = fitz.Rect(0, rect.height - 40, rect.width, rect.height - 5)
-                page.insert_textbox(footer_rect, text, fontsize=10, fontname="helv", align=1)
-
-            output_filename = uploaded_file.name.replace('.pdf', '') + "_numbered.pdf"
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_out:
-                output_path = tmp_out.name
-                temp_files_to_clean.append(output_path)
-            
-            doc.save(output_path)
-            
-            with open(output_path, 'rb') as f:
-                pdf_data = f.read()
-                
-            response = HttpResponse(pdf_data, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{output_filename}"'
-            
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
-            return response
+            return per_file_tool_response(
+                files, 'add_page_numbers', pdf_tasks.add_page_numbers, (), "_numbered",
+                temp_files_to_clean, cache_params={},
+            )
             
         except Exception as e:
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
             messages.error(request, f"Error adding page numbers: {str(e)}")
             return redirect('add_page_numbers_tool')
+        finally:
+            cleanup_temp_files(temp_files_to_clean)
             
     return render(request, 'core/add_page_numbers.html')
 
@@ -2653,73 +2215,26 @@ def remove_pages_tool(request):
             messages.error(request, "Please upload a PDF and specify pages to remove.")
             return redirect('remove_pages_tool')
 
+        # Input format: "1, 3-5, 7", "10-", "even", ... -> remove these pages
+        try:
+            selection = page_selection.parse(pages_to_remove_str)
+        except ValueError as e:
+            messages.error(request, f"{e} Use '1, 3-5'.")
+            return redirect('remove_pages_tool')
+
         temp_files_to_clean = []
         
         try:
-            uploaded_file = files[0]
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-                for chunk in uploaded_file.chunks():
-                    tmp_pdf.write(chunk)
-                input_path = tmp_pdf.name
-                temp_files_to_clean.append(input_path)
-            
-            doc = fitz.open(input_path)
-            total_pages = len(doc)
-            
-            # Parse Page Numbers
-            # Input format: "1, 3-5, 7" -> remove these 1-based indexes
-            pages_to_delete = set()
-            try:
-                parts = [p.strip() for p in pages_to_remove_str.split(',')]
-                for part in parts:
-                    if '-' in part:
-                        start, end = part.split('-')
-                        start, end = int(start), int(end)
-                        for p in range(start, end + 1):
-                            if 1 <= p <= total_pages:
-                                pages_to_delete.add(p - 1) # 0-indexed
-                    else:
-                        p = int(part)
-                        if 1 <= p <= total_pages:
-                            pages_to_delete.add(p - 1)
-            except ValueError:
-                 messages.error(request, "Invalid page number format. Use '1, 3-5'.")
-                 return redirect('remove_pages_tool')
-            
-            if len(pages_to_delete) == total_pages:
-                 messages.error(request, "Cannot remove all pages.")
-                 return redirect('remove_pages_tool')
-            
-            # Create new PDF with ONLY kept pages
-            # Removing pages in fitz: doc.delete_pages(list)
-            doc.delete_pages(list(pages_to_delete))
-            
-            output_filename = uploaded_file.name.replace('.pdf', '') + "_removed.pdf"
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_out:
-                output_path = tmp_out.name
-                temp_files_to_clean.append(output_path)
-            
-            doc.save(output_path)
-            
-            with open(output_path, 'rb') as f:
-                pdf_data = f.read()
-                
-            response = HttpResponse(pdf_data, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{output_filename}"'
-            
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
-            return response
+            return per_file_tool_response(
+                files, 'remove_pages', pdf_tasks.remove_pages, (selection,), "_removed",
+                temp_files_to_clean, cache_params={'pages': str(selection)},
+            )
             
         except Exception as e:
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
             messages.error(request, f"Error removing pages: {str(e)}")
             return redirect('remove_pages_tool')
+        finally:
+            cleanup_temp_files(temp_files_to_clean)
             
     return render(request, 'core/remove_pages.html')
 
@@ -2736,71 +2251,26 @@ def extract_pages_tool(request):
             messages.error(request, "Please upload a PDF and specify pages to extract.")
             return redirect('extract_pages_tool')
 
+        # Pages are kept in the order written ("5-1" reverses, "1, 1" duplicates)
+        try:
+            selection = page_selection.parse(pages_to_extract_str)
+        except ValueError as e:
+            messages.error(request, f"{e} Use '1, 3-5'.")
+            return redirect('extract_pages_tool')
+
         temp_files_to_clean = []
         
         try:
-            uploaded_file = files[0]
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-                for chunk in uploaded_file.chunks():
-                    tmp_pdf.write(chunk)
-                input_path = tmp_pdf.name
-                temp_files_to_clean.append(input_path)
-            
-            doc = fitz.open(input_path)
-            total_pages = len(doc)
-            
-            # Parse Page Numbers
-            pages_to_keep = [] # Ordered list for select
-            try:
-                parts = [p.strip() for p in pages_to_extract_str.split(',')]
-                for part in parts:
-                    if '-' in part:
-                        start, end = part.split('-')
-                        start, end = int(start), int(end)
-                        for p in range(start, end + 1):
-                            if 1 <= p <= total_pages:
-                                pages_to_keep.append(p - 1)
-                    else:
-                        p = int(part)
-                        if 1 <= p <= total_pages:
-                            pages_to_keep.append(p - 1)
-            except ValueError:
-                 messages.error(request, "Invalid page number format. Use '1, 3-5'.")
-                 return redirect('extract_pages_tool')
-            
-            if not pages_to_keep:
-                 messages.error(request, "No valid pages selected.")
-                 return redirect('extract_pages_tool')
-            
-            # Select pages (keep only these)
-            doc.select(pages_to_keep)
-            
-            output_filename = uploaded_file.name.replace('.pdf', '') + "_extracted.pdf"
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_out:
-                output_path = tmp_out.name
-                temp_files_to_clean.append(output_path)
-            
-            doc.save(output_path)
-            
-            with open(output_path, 'rb') as f:
-                pdf_data = f.read()
-                
-            response = HttpResponse(pdf_data, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{output_filename}"'
-            
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
-            return response
+            return per_file_tool_response(
+                files, 'extract_pages', pdf_tasks.extract_pages, (selection,), "_extracted",
+                temp_files_to_clean, cache_params={'pages': str(selection)},
+            )
             
         except Exception as e:
-            for path in temp_files_to_clean:
-                if os.path.exists(path):
-                    os.remove(path)
             messages.error(request, f"Error extracting pages: {str(e)}")
             return redirect('extract_pages_tool')
+        finally:
+            cleanup_temp_files(temp_files_to_clean)
             
     return render(request, 'core/extract_pages.html')
 
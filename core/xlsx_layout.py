@@ -0,0 +1,356 @@
+"""
+Excel (XLSX) to PDF for large spreadsheets.
+
+Workbooks are opened with openpyxl in read-only mode, which parses rows only
+as they are requested, and every page goes out through
+`core.pdf_writer.PdfWriter` as soon as it is full, so memory stays flat however
+many rows a sheet has. Each sheet prints as landscape table pages with its
+first row repeated as the header on every page.
+
+Column widths are measured on the header and the first SAMPLE_ROWS rows, and
+columns to the right of the last one used there are not printed. Columns that
+don't fit across one page continue on further pages, reading the sheet once
+more per group of columns; text too long for its column is cut with an
+ellipsis.
+
+Text is set in Helvetica where WinAnsi can encode it. Any other character is
+drawn from the font MuPDF falls back to for it (Noto for most scripts, Droid
+Sans Fallback for CJK), embedded once per output as a Type0 font with a
+ToUnicode map, so it prints and can still be searched and copied. As in
+`core.pptx_layout` there is no shaping, so right-to-left and complex scripts
+come out in logical order.
+"""
+import datetime
+from itertools import chain, islice
+
+from . import budgets
+from .pdf_writer import PdfWriter, pdf_number
+
+PAGE_WIDTH, PAGE_HEIGHT = 842, 595  # A4 landscape
+MARGIN = 28
+TITLE_HEIGHT = 18
+FONT_SIZE = 8
+ROW_HEIGHT = 12
+PADDING = 3
+SAMPLE_ROWS = 200
+MIN_COLUMN_WIDTH = 30
+MAX_COLUMN_WIDTH = 220
+MAX_PAGES = 20000
+
+ROWS_PER_PAGE = int((PAGE_HEIGHT - 2 * MARGIN - TITLE_HEIGHT) // ROW_HEIGHT) - 1  # less the header
+
+_BASE_FONTS = {False: 'helv', True: 'hebo'}
+_base_fonts = {}  # bold -> fitz.Font
+_widths = {}  # bold -> {char: advance}, WinAnsi characters first, others as they are met
+_glyphs = {}  # (bold, char) -> (fallback font name, glyph id), for characters outside WinAnsi
+_fallback_fonts = {}  # font name -> MuPDF font
+_widest = 1.1  # per point of font size, replaced by the real figure on first use
+
+
+def _char_widths(bold=False):
+    """Helvetica advance widths (per point of font size) of the WinAnsi characters."""
+    global _widest
+    if bold not in _widths:
+        import fitz  # PyMuPDF
+        font = _base_fonts[bold] = fitz.Font(_BASE_FONTS[bold])
+        widths = {}
+        for code in range(32, 256):
+            try:
+                char = bytes([code]).decode('cp1252')
+            except UnicodeDecodeError:
+                continue
+            widths[char] = font.glyph_advance(ord(char))
+        _widths[bold] = widths
+        _widest = max(max(table.values()) for table in _widths.values())
+    return _widths[bold]
+
+
+def _glyph(char, bold):
+    """(font name, glyph id) MuPDF draws `char` with when Helvetica lacks it."""
+    global _widest
+    key = (bold, char)
+    if key not in _glyphs:
+        import fitz  # PyMuPDF
+        m = fitz.mupdf
+        widths = _char_widths(bold)
+        glyph, font = m.fz_encode_character_with_fallback(_base_fonts[bold].this, ord(char), 0, 0)
+        name = m.fz_font_name(font)
+        _fallback_fonts.setdefault(name, font)
+        _glyphs[key] = (name, glyph)
+        widths[char] = m.fz_advance_glyph(font, glyph, 0)
+        _widest = max(_widest, widths[char])
+    return _glyphs[key]
+
+
+def _char_width(char, bold):
+    widths = _char_widths(bold)
+    if char not in widths:
+        _glyph(char, bold)
+    return widths[char]
+
+
+def text_width(text, bold=False):
+    widths = _char_widths(bold)
+    try:
+        return sum(map(widths.__getitem__, text)) * FONT_SIZE
+    except KeyError:
+        return sum(_char_width(char, bold) for char in text) * FONT_SIZE
+
+
+def _fit(text, width, bold=False):
+    """`text` and its width, cut with an ellipsis if it is wider than `width`."""
+    measured = text_width(text, bold)
+    if measured <= width:
+        return text, measured
+    budget = width / FONT_SIZE - _char_width('…', bold)
+    used = 0
+    for index, char in enumerate(text):
+        used += _char_width(char, bold)
+        if used > budget:
+            text = text[:index] + '…'
+            break
+    return text, text_width(text, bold)
+
+
+def cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float):
+        return f'{value:.10g}'
+    if isinstance(value, datetime.datetime):
+        if value.time() == datetime.time(0):
+            return value.date().isoformat()
+        return value.isoformat(sep=' ')
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    # Line breaks and tabs inside a cell print as spaces
+    return ' '.join(str(value).split())
+
+
+def _pdf_string(encoded):
+    """A literal string of WinAnsi-encoded bytes."""
+    text = encoded.decode('latin-1')
+    return '(' + text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') + ')'
+
+
+class _Fonts:
+    """
+    The fonts of one output: Helvetica and Helvetica-Bold (/F1, /F2), and a
+    Type0 font (/U1, /U2, ...) for each fallback font the text needs. MuPDF
+    builds those in a scratch document, with their widths and ToUnicode map,
+    and they are copied out from there the first time they are used.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        regular = writer.add_object('<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+        bold = writer.add_object('<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>')
+        self.refs = {'F1': regular, 'F2': bold}
+        self.fallback = {}  # MuPDF font name -> resource name
+        self.scratch = None
+
+    def resources(self):
+        return '/Font << ' + ' '.join(f'/{name} {ref} 0 R' for name, ref in self.refs.items()) + ' >>'
+
+    def show(self, text, bold, size):
+        """
+        Operators that show `text` at the current text position, with the
+        base font for `bold` at `size` selected before and after.
+        """
+        try:
+            return f'{_pdf_string(text.encode("cp1252"))} Tj'
+        except UnicodeEncodeError:
+            pass
+        base = 'F2' if bold else 'F1'
+        widths = _char_widths(bold)
+        runs = []  # [resource name, pieces]
+        for char in text:
+            if (bold, char) in _glyphs or char not in widths:
+                font_name, glyph = _glyph(char, bold)
+                name, piece = self.font(font_name), f'<{glyph:04X}>'
+            else:
+                name, piece = base, _pdf_string(char.encode('cp1252'))
+            if runs and runs[-1][0] == name:
+                runs[-1][1].append(piece)
+            else:
+                runs.append([name, [piece]])
+        ops = [f'/{name} {size} Tf [{"".join(pieces)}] TJ' for name, pieces in runs]
+        if runs[-1][0] != base:
+            ops.append(f'/{base} {size} Tf')
+        return ' '.join(ops)
+
+    def font(self, font_name):
+        """The resource name of fallback font `font_name`, written out on first use."""
+        if font_name not in self.fallback:
+            import fitz  # PyMuPDF
+            m = fitz.mupdf
+            if self.scratch is None:
+                self.scratch = fitz.open()
+            pdf = m.pdf_document_from_fz_document(self.scratch.this)
+            xref = m.pdf_to_num(m.pdf_add_cid_font(pdf, _fallback_fonts[font_name]))
+            name = self.fallback[font_name] = f'U{len(self.fallback) + 1}'
+            self.refs[name] = self.writer.copy_object(self.scratch, xref)
+        return self.fallback[font_name]
+
+    def close(self):
+        if self.scratch is not None:
+            self.scratch.close()
+
+
+def _column_letter(index):
+    from openpyxl.utils import get_column_letter
+    return get_column_letter(index + 1)
+
+
+def _column_groups(widths):
+    """Split column indices into runs that fit across the page."""
+    available = PAGE_WIDTH - 2 * MARGIN
+    groups, current, used = [], [], 0
+    for index, width in enumerate(widths):
+        if current and used + width > available:
+            groups.append(current)
+            current, used = [], 0
+        current.append(index)
+        used += width
+    if current:
+        groups.append(current)
+    return groups
+
+
+class _SheetPrinter:
+    def __init__(self, writer, fonts, title, widths, columns, header):
+        self.writer = writer
+        self.fonts = fonts
+        self.title = title
+        self.widths = widths
+        self.columns = columns
+        self.header = header
+        self.page_number = 0
+
+    def page(self, rows):
+        """Write one page: the title, the header row and up to ROWS_PER_PAGE rows."""
+        if len(self.writer.page_refs) >= MAX_PAGES:
+            raise ValueError(f"The workbook is too large to convert (over {MAX_PAGES} pages).")
+        budgets.check_pages(len(self.writer.page_refs) + 1)
+        self.page_number += 1
+        top = PAGE_HEIGHT - MARGIN - TITLE_HEIGHT
+        lefts = [MARGIN]
+        for index in self.columns:
+            lefts.append(lefts[-1] + self.widths[index])
+        right = lefts[-1]
+        bottom = top - (len(rows) + 1) * ROW_HEIGHT
+
+        ops = [
+            # Header background
+            f'0.9 g {pdf_number(MARGIN)} {pdf_number(top - ROW_HEIGHT)} {pdf_number(right - MARGIN)} {ROW_HEIGHT} re f 0 g',
+            f'BT /F2 10 Tf 1 0 0 1 {MARGIN} {pdf_number(top + 6)} Tm '
+            f'{self.fonts.show(f"{self.title} - page {self.page_number}", True, 10)} ET',
+            'BT',
+        ]
+        for row_index, row in enumerate([self.header] + rows):
+            baseline = top - (row_index + 1) * ROW_HEIGHT + 3.5
+            bold = row_index == 0
+            ops.append(f'/F{2 if bold else 1} {FONT_SIZE} Tf')
+            for position, index in enumerate(self.columns):
+                value = row[index] if index < len(row) else None
+                text = cell_text(value)
+                if not text:
+                    continue
+                available = self.widths[index] - 2 * PADDING
+                numeric = row_index and isinstance(value, (int, float)) and not isinstance(value, bool)
+                if numeric:
+                    text, width = _fit(text, available)
+                    x = lefts[position + 1] - PADDING - width
+                else:
+                    # Short left-aligned text needs no measuring
+                    if len(text) * _widest * FONT_SIZE > available:
+                        text, _ = _fit(text, available, bold=bold)
+                    x = lefts[position] + PADDING
+                ops.append(f'1 0 0 1 {pdf_number(x)} {pdf_number(baseline)} Tm {self.fonts.show(text, bold, FONT_SIZE)}')
+        ops.append('ET')
+
+        # Grid
+        ops.append('0.5 G 0.4 w')
+        for row_index in range(len(rows) + 2):
+            y = pdf_number(top - row_index * ROW_HEIGHT)
+            ops.append(f'{MARGIN} {y} m {pdf_number(right)} {y} l')
+        for x in lefts:
+            ops.append(f'{pdf_number(x)} {pdf_number(top)} m {pdf_number(x)} {pdf_number(bottom)} l')
+        ops.append('S')
+        self.writer.add_page(PAGE_WIDTH, PAGE_HEIGHT, '\n'.join(ops), self.fonts.resources())
+
+    def print_rows(self, rows):
+        """Print `rows` page by page; returns how many there were."""
+        page, count = [], 0
+        for row in rows:
+            page.append(row)
+            count += 1
+            if len(page) == ROWS_PER_PAGE:
+                self.page(page)
+                page = []
+        if page or self.page_number == 0:
+            self.page(page)
+        return count
+
+
+def _print_sheet(writer, fonts, sheet):
+    rows = sheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return 0
+    sample = list(islice(rows, SAMPLE_ROWS))
+    used = [
+        index + 1 for row in [header] + sample for index, value in enumerate(row) if cell_text(value)
+    ]
+    if not used:
+        return 0
+    column_count = max(used)
+
+    widths = [MIN_COLUMN_WIDTH] * column_count
+    for index, value in enumerate(header[:column_count]):
+        widths[index] = max(MIN_COLUMN_WIDTH, text_width(cell_text(value), bold=True) + 2 * PADDING)
+    for row in sample:
+        for index, value in enumerate(row[:column_count]):
+            widths[index] = max(widths[index], text_width(cell_text(value)) + 2 * PADDING)
+    widths = [min(width, MAX_COLUMN_WIDTH) for width in widths]
+
+    groups = _column_groups(widths)
+    row_count = 0
+    for group_index, columns in enumerate(groups):
+        title = sheet.title
+        if len(groups) > 1:
+            title += f' (columns {_column_letter(columns[0])}-{_column_letter(columns[-1])})'
+        printer = _SheetPrinter(writer, fonts, title, widths, columns, header)
+        if group_index == 0:
+            body = chain(sample, rows)
+        else:
+            # Read the sheet again for the next columns rather than keep it
+            body = islice(sheet.iter_rows(values_only=True), 1, None)
+        row_count = printer.print_rows(body)
+    return row_count
+
+
+def convert(input_path, output_path):
+    """
+    Convert the workbook at `input_path` to a PDF at `output_path`. Returns the
+    number of data rows printed (header rows excluded, each row counted once).
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(input_path, read_only=True, data_only=True)
+    try:
+        with open(output_path, 'wb') as fp:
+            writer = PdfWriter(fp)
+            fonts = _Fonts(writer)
+            try:
+                rows = sum(_print_sheet(writer, fonts, sheet) for sheet in workbook.worksheets)
+            finally:
+                fonts.close()
+            if not writer.page_refs:
+                writer.add_page(PAGE_WIDTH, PAGE_HEIGHT, '', fonts.resources())  # nothing to print
+            writer.close()
+    finally:
+        workbook.close()
+    return rows
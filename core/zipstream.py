@@ -0,0 +1,124 @@
+"""
+Streaming ZIP archives for the batch tools and order downloads.
+
+`zipfile` can write to an unseekable stream (it falls back to data
+descriptors), so the archive is written into a small sink that is drained after
+every chunk: local headers and member data go out to the client while the next
+member is still being produced, and memory stays flat however large the
+archive gets. Members that are already compressed (PDF, JPEG, Office files,
+...) are stored rather than deflated a second time.
+"""
+import io
+import os
+import time
+import zipfile
+
+from django.http import StreamingHttpResponse
+
+CHUNK_SIZE = 64 * 1024
+
+# Formats that are compressed internally; deflating them again costs CPU for nothing
+STORED_EXTENSIONS = {
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp',
+    '.zip', '.docx', '.xlsx', '.pptx', '.mp3', '.mp4',
+}
+
+
+def compress_type_for(arcname):
+    if os.path.splitext(arcname)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+class _Sink(io.RawIOBase):
+    """Write-only, unseekable buffer that hands its contents over on `drain`."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStream:
+    """
+    Iterable of archive bytes built from `members`, an iterable of
+    (arcname, source) pairs where source is either bytes or a file path.
+    Members are pulled lazily, so a generator can produce them as it goes.
+
+    `spool_path`, if given, also receives a copy of the archive, and
+    `on_complete()` runs once the whole archive has been produced (e.g. to cache
+    the spool). `on_close()` always runs when the response is closed, whether
+    or not the archive was sent in full.
+    """
+
+    def __init__(self, members, spool_path=None, on_complete=None, on_close=None):
+        self.members = members
+        self.spool_path = spool_path
+        self.on_complete = on_complete
+        self.on_close = on_close
+        self._closed = False
+
+    def __iter__(self):
+        spool = open(self.spool_path, 'wb') if self.spool_path else None
+        try:
+            for chunk in self._generate():
+                if not chunk:
+                    continue
+                if spool:
+                    spool.write(chunk)
+                yield chunk
+        finally:
+            if spool:
+                spool.close()
+        if self.on_complete:
+            self.on_complete()
+
+    def _generate(self):
+        sink = _Sink()
+        with zipfile.ZipFile(sink, 'w') as zf:
+            for arcname, source in self.members:
+                compress_type = compress_type_for(arcname)
+                if isinstance(source, (bytes, bytearray)):
+                    zinfo = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+                    zinfo.compress_type = compress_type
+                    zf.writestr(zinfo, source)
+                else:
+                    zinfo = zipfile.ZipInfo.from_file(source, arcname)
+                    zinfo.compress_type = compress_type
+                    with open(source, 'rb') as src, zf.open(zinfo, 'w') as dest:
+                        while True:
+                            chunk = src.read(CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            dest.write(chunk)
+                            yield sink.drain()
+                yield sink.drain()
+        # Central directory
+        yield sink.drain()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            if self.on_close:
+                self.on_close()
+
+
+def streaming_response(stream, filename):
+    response = StreamingHttpResponse(stream, content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
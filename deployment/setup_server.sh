@@ -82,6 +82,12 @@ sudo systemctl daemon-reload
 sudo systemctl start gunicorn
 sudo systemctl enable gunicorn
 
+# Background worker for long PDF to Word/PowerPoint/Excel jobs
+sudo cp deployment/tool_jobs.service /etc/systemd/system/
+sudo systemctl daemon-reload
+sudo systemctl start tool_jobs
+sudo systemctl enable tool_jobs
+
 # 8. Configure Nginx
 echo "--> Configuring Nginx..."
 sudo cp deployment/nginx_hewor.conf /etc/nginx/sites-available/hewor
@@ -97,6 +97,7 @@ MIDDLEWARE = [
     "whitenoise.middleware.WhiteNoiseMiddleware",  # Enabled for production static files
     "django.middleware.gzip.GZipMiddleware",  # PERFORMANCE: Enable GZIP compression
     "django.middleware.http.ConditionalGetMiddleware",  # PERFORMANCE: Enable 304 responses
+    "core.admission.ToolAdmissionMiddleware",  # Before anything that reads the request body
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -118,6 +119,7 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "core.context_processors.google_analytics",
+                "core.context_processors.tool_jobs",
             ],
         },
     },
@@ -395,3 +397,83 @@ CACHES = {
 
 # WhiteNoise optimizations
 WHITENOISE_MAX_AGE = 31536000
+
+# --- FREE TOOLS ENGINE ---
+# CPU-heavy tool work runs in a shared process pool (see core/tool_pool.py).
+# 0 workers runs everything inline on the request thread.
+TOOL_POOL_WORKERS = int(os.environ.get('TOOL_POOL_WORKERS', min(4, os.cpu_count() or 1)))
+# Replace a pool child after this many jobs to cap MuPDF memory growth
+TOOL_POOL_MAX_TASKS_PER_CHILD = int(os.environ.get('TOOL_POOL_MAX_TASKS_PER_CHILD', '50'))
+# Smallest page range handed to one worker when a document is rendered in parallel
+TOOL_POOL_MIN_PAGES_PER_TASK = int(os.environ.get('TOOL_POOL_MIN_PAGES_PER_TASK', '8'))
+# Set when a `run_tool_jobs` worker runs (the Procfile's worker process); only
+# then do the tools offer background job mode
+TOOL_JOB_WORKER = os.environ.get('TOOL_JOB_WORKER', 'False') == 'True'
+# Finished background tool jobs (results included) are purged after this many hours
+TOOL_JOB_TTL_HOURS = int(os.environ.get('TOOL_JOB_TTL_HOURS', '24'))
+# Merges above this total size (or 4x the batch size in files) append parts in
+# batches through the output file instead of holding the whole result in memory
+TOOL_MERGE_BOUNDED_THRESHOLD_MB = int(os.environ.get('TOOL_MERGE_BOUNDED_THRESHOLD_MB', '50'))
+TOOL_MERGE_BATCH_SIZE = int(os.environ.get('TOOL_MERGE_BATCH_SIZE', '25'))
+# PDF to Word: pdf2docx parses documents of at least TOOL_WORD_MP_MIN_PAGES pages
+# in TOOL_WORD_PROCESSES processes
+TOOL_WORD_PROCESSES = int(os.environ.get('TOOL_WORD_PROCESSES', min(4, os.cpu_count() or 1)))
+TOOL_WORD_MP_MIN_PAGES = int(os.environ.get('TOOL_WORD_MP_MIN_PAGES', '20'))
+# PowerPoint to PDF: draw whole slides (core/pptx_layout.py) instead of the
+# text-only Platypus story. The slide renderer is slower (benchmark_tools --only ppt)
+TOOL_PPTX_SLIDE_RENDERER = os.environ.get('TOOL_PPTX_SLIDE_RENDERER', 'False') == 'True'
+# Default JPEG quality for page images (PDF to JPG)
+TOOL_JPEG_QUALITY = int(os.environ.get('TOOL_JPEG_QUALITY', '85'))
+
+# Content-addressed cache of tool outputs (see core/result_cache.py). 0 bytes disables it.
+import tempfile
+TOOL_CACHE_DIR = os.environ.get('TOOL_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'hewor_tool_cache'))
+TOOL_CACHE_MAX_BYTES = int(os.environ.get('TOOL_CACHE_MAX_MB', '1024')) * 1024 * 1024
+TOOL_CACHE_TTL_SECONDS = int(os.environ.get('TOOL_CACHE_TTL_HOURS', '24')) * 3600
+
+# URL fetching for HTML to PDF (see core/url_fetch.py): one pooled session, a
+# size cap and a total deadline per page, and an in-memory cache of fetched pages
+TOOL_FETCH_POOL_SIZE = int(os.environ.get('TOOL_FETCH_POOL_SIZE', '10'))
+TOOL_FETCH_MAX_BYTES = int(os.environ.get('TOOL_FETCH_MAX_MB', '5')) * 1024 * 1024
+TOOL_FETCH_DEADLINE_SECONDS = float(os.environ.get('TOOL_FETCH_DEADLINE_SECONDS', '15'))
+TOOL_FETCH_CONNECT_TIMEOUT = float(os.environ.get('TOOL_FETCH_CONNECT_TIMEOUT', '5'))
+TOOL_FETCH_FRESH_SECONDS = int(os.environ.get('TOOL_FETCH_FRESH_SECONDS', '300'))
+TOOL_FETCH_CACHE_MAX_BYTES = int(os.environ.get('TOOL_FETCH_CACHE_MAX_MB', '64')) * 1024 * 1024
+# Images fetched per converted page, all within one deadline
+TOOL_FETCH_MAX_IMAGES = int(os.environ.get('TOOL_FETCH_MAX_IMAGES', '20'))
+
+# Admission control for tool POSTs (see core/admission.py). Each tool runs at
+# most TOOL_ADMISSION_CONCURRENCY requests within TOOL_ADMISSION_MEMORY_MB, a
+# request weighing TOOL_ADMISSION_BASE_MB plus its upload times
+# TOOL_ADMISSION_UPLOAD_FACTOR. Others wait in a short queue, then get a 429.
+TOOL_ADMISSION_ENABLED = os.environ.get('TOOL_ADMISSION_ENABLED', 'True') == 'True'
+TOOL_ADMISSION_CONCURRENCY = int(os.environ.get('TOOL_ADMISSION_CONCURRENCY', '2'))
+TOOL_ADMISSION_MEMORY_MB = int(os.environ.get('TOOL_ADMISSION_MEMORY_MB', '512'))
+TOOL_ADMISSION_TOTAL_MEMORY_MB = int(os.environ.get('TOOL_ADMISSION_TOTAL_MEMORY_MB', '1024'))
+TOOL_ADMISSION_BASE_MB = int(os.environ.get('TOOL_ADMISSION_BASE_MB', '16'))
+TOOL_ADMISSION_UPLOAD_FACTOR = float(os.environ.get('TOOL_ADMISSION_UPLOAD_FACTOR', '3'))
+# Per-tool overrides of 'concurrency' and 'memory_mb', by URL name
+TOOL_ADMISSION_LIMITS = {
+    'merge_pdf_tool': {'concurrency': 1},
+    'pdf_to_word_tool': {'concurrency': 1},
+    'compress_pdf_tool': {'concurrency': 1},
+}
+TOOL_ADMISSION_QUEUE_SIZE = int(os.environ.get('TOOL_ADMISSION_QUEUE_SIZE', '4'))
+TOOL_ADMISSION_WAIT_SECONDS = float(os.environ.get('TOOL_ADMISSION_WAIT_SECONDS', '10'))
+# Tool requests running or waiting at once, across all tools. Keep it below
+# gunicorn's --threads (8) so pages, dashboards and chat always get a thread.
+TOOL_ADMISSION_MAX_THREADS = int(os.environ.get('TOOL_ADMISSION_MAX_THREADS', '5'))
+
+# Per-job resource budgets (see core/budgets.py): a tool request or background
+# job that goes over any of them is stopped with an error and counted in the
+# tool metrics. A pool worker still busy TOOL_BUDGET_KILL_GRACE_SECONDS after
+# its deadline is killed. Keep TOOL_BUDGET_SECONDS below gunicorn's --timeout.
+TOOL_BUDGET_MAX_PAGES = int(os.environ.get('TOOL_BUDGET_MAX_PAGES', '10000'))
+TOOL_BUDGET_MAX_RENDER_PIXELS = int(os.environ.get('TOOL_BUDGET_MAX_RENDER_MEGAPIXELS', '2000')) * 1000 * 1000
+TOOL_BUDGET_MAX_IMAGE_PIXELS = int(os.environ.get('TOOL_BUDGET_MAX_IMAGE_MEGAPIXELS', '150')) * 1000 * 1000
+TOOL_BUDGET_SECONDS = int(os.environ.get('TOOL_BUDGET_SECONDS', '300'))
+TOOL_BUDGET_KILL_GRACE_SECONDS = int(os.environ.get('TOOL_BUDGET_KILL_GRACE_SECONDS', '10'))
+TOOL_JOB_BUDGET_SECONDS = int(os.environ.get('TOOL_JOB_BUDGET_SECONDS', '3600'))
+# A job still 'running' this long after its budget ran out lost its worker
+# (OOM kill, restart) and is marked failed
+TOOL_JOB_STALE_GRACE_SECONDS = int(os.environ.get('TOOL_JOB_STALE_GRACE_SECONDS', '300'))